@@ -59,7 +59,15 @@ __pdoc__ = {
     "motorpy.models.drivers.tests": False,
     "motorpy.models.fleets.tests": False,
     "motorpy.models.policy.tests": False,
-    "motorpy.models.policy.tests": False
+    "motorpy.models.policy.tests": False,
+    "motorpy.policies.tests": False,
+    "motorpy.export.tests": False,
+    "motorpy.mirror.tests": False,
+    "motorpy.search.tests": False,
+    "motorpy.fleets.tests": False,
+    "motorpy.drivers.tests": False,
+    "motorpy.vehicles.tests": False,
+    "motorpy.batch.tests": False
 }
 
 # core class for motorpy
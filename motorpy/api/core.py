@@ -36,11 +36,14 @@ class APIHandlerNoAuth:
                  org_id: str,
                  region: str = None,
                  url: str = None,
-                 timeout: float = 10.0) -> None:
+                 timeout: float = 10.0,
+                 trusted: bool = False) -> None:
         self.org_id = org_id
         self.region = region
         self.url = url
         self.timeout = timeout
+        # build models from list responses without validation
+        self.trusted = trusted
 
         # should be set in async context
         self.session: aiohttp.ClientSession = None
@@ -68,6 +71,12 @@ class APIHandlerNoAuth:
 
         # check this on recursion
         self._org_data_refreshing = False
+
+        # responses of create calls by idempotency key, see `motorpy.api.idempotency`
+        self.idempotency_journal = None
+
+        # bumped when a fleet roster changes, see `motorpy.models.fleets.roster_changed`
+        self.roster_version = 0
     
     async def _set_session(self):
         # session for all requests
@@ -165,7 +174,8 @@ class APIHandler(APIHandlerNoAuth):
                  auth: Auth,
                  region: str = None,
                  url: str = None,
-                 timeout: float = 10.0) -> None:
+                 timeout: float = 10.0,
+                 trusted: bool = False) -> None:
         """
         APIHandler makes requests to the API and handles authentication.
 
@@ -174,6 +184,7 @@ class APIHandler(APIHandlerNoAuth):
             auth (Auth): the authentication object.
             region (str, optional): the region. Defaults to None.
             url (str, optional): URL override if region is not supplied. Defaults to None.
+            trusted (bool, optional): build models from list responses without validation. Defaults to False.
 
         Raises:
             ValueError: URL or Region is not supplied.
@@ -185,7 +196,7 @@ class APIHandler(APIHandlerNoAuth):
         self.url = url
         self.timeout = timeout
 
-        super().__init__(org_id, region, url, timeout)
+        super().__init__(org_id, region, url, timeout, trusted)
 
     async def _make_request(self, method: str, url: str, **kwargs) -> Tuple[Optional[Union[dict, list]], int]:
         if self.auth.requires_refresh():
@@ -339,13 +350,24 @@ class APIHandler(APIHandlerNoAuth):
         else:
             raise APIError(f"Telematics API Error", status_code=status, url=_url)
 
-    async def batch_fetch(self,
-                          endpoint: str,
-                          params: dict = None,
-                          headers: dict = None,
-                          limit: int = 50,
-                          offset: int = 0) -> Generator[List[dict], None, None]:
-        """Fetch a batch of data from the API."""
+    async def batch_fetch_pages(self,
+                                endpoint: str,
+                                params: dict = None,
+                                headers: dict = None,
+                                limit: int = 50,
+                                offset: int = 0) -> Generator[List[dict], None, None]:
+        """Fetch data from the API page by page.
+
+        Args:
+            endpoint (str): the endpoint to fetch.
+            params (dict, optional): query parameters. Defaults to None.
+            headers (dict, optional): request headers. Defaults to None.
+            limit (int, optional): the page size. Defaults to 50.
+            offset (int, optional): the offset to start at. Defaults to 0.
+
+        Yields:
+            List[dict]: the raw records of each page.
+        """
         params = params or {}
         headers = headers or {}
 
@@ -363,11 +385,21 @@ class APIHandler(APIHandlerNoAuth):
             if not body:
                 break
 
-            for v in body:
-                yield v
+            yield body
 
             if len(body) < limit:
                 break
 
             offset += limit
             params['offset'] = offset
+
+    async def batch_fetch(self,
+                          endpoint: str,
+                          params: dict = None,
+                          headers: dict = None,
+                          limit: int = 50,
+                          offset: int = 0) -> Generator[dict, None, None]:
+        """Fetch a batch of data from the API."""
+        async for page in self.batch_fetch_pages(endpoint, params=params, headers=headers, limit=limit, offset=offset):
+            for v in page:
+                yield v
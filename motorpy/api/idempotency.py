@@ -0,0 +1,229 @@
+"""
+Idempotency keys for create calls.
+
+A create call (eg. `create_driver`, `Driver.charge`) made with an `idempotency_key` sends the key in the
+`Idempotency-Key` header and records the response in the journal of the API handler.
+Calling again with the same key returns the recorded response instead of creating a duplicate,
+so a call that timed out can be retried, and a bulk run can be resumed, without redoing the work that succeeded:
+
+```python
+motor = Motor("org-id", auth=auth, region="eu-1", idempotency_journal="creates.db")
+key = derive_key("onboarding", "jane@example.com")
+driver = await motor.create_driver(driver, send_invite=True, idempotency_key=key)
+```
+
+Keys should identify the work, not the attempt: use `derive_key` on a stable business key (eg. an email or a CSV row),
+or store the keys of `new_key` with the job.
+Only successful responses are recorded, a failed call is sent again on retry.
+Concurrent calls with the same key share one request.
+A key is bound to the method and endpoint it was first used with, reusing it for another request raises a ValueError.
+"""
+import asyncio
+import json
+import sqlite3
+import uuid
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# keys derived with derive_key are stable across processes
+_NAMESPACE = uuid.UUID("6f1c5a2e-3d4b-4c8e-9a7f-2b1d0e9c8a76")
+
+
+def new_key() -> str:
+    "A new random idempotency key."
+    return str(uuid.uuid4())
+
+
+def derive_key(*parts: Any) -> str:
+    """An idempotency key derived from a business key, the same parts always give the same key.
+
+    Args:
+        *parts (Any): the parts of the key, eg. ("charge", driver_id, invoice_id).
+
+    Returns:
+        str: the key.
+    """
+    if not parts:
+        raise ValueError("At least one part is required to derive a key")
+    return str(uuid.uuid5(_NAMESPACE, "\x1f".join(map(str, parts))))
+
+
+class IdempotencyJournal:
+    """
+    The responses of create calls by idempotency key, stored in SQLite.
+
+    Use a file path to keep the journal between runs, the default in-memory journal lasts as long as the handler.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        """
+        Args:
+            path (str, optional): the SQLite database path. Defaults to ":memory:".
+        """
+        self.path = path
+        self.db = sqlite3.connect(path)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency ("
+                "key TEXT PRIMARY KEY, method TEXT, endpoint TEXT, body TEXT, "
+                "created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+            )
+        # requests in flight by key, with their method and endpoint
+        self._pending: Dict[str, Tuple[str, str, asyncio.Future]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return self.db.execute("SELECT 1 FROM idempotency WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get the recorded response body of a key.
+
+        Args:
+            key (str): the idempotency key.
+            default (Any, optional): returned if the key is not recorded. Defaults to None.
+
+        Returns:
+            Any: the response body.
+        """
+        row = self.db.execute("SELECT body FROM idempotency WHERE key = ?", (key,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def get_request(self, key: str) -> Optional[Tuple[str, str]]:
+        """Get the method and endpoint a key was recorded for.
+
+        Args:
+            key (str): the idempotency key.
+
+        Returns:
+            Optional[Tuple[str, str]]: the method and endpoint, None if the key is not recorded.
+        """
+        row = self.db.execute("SELECT method, endpoint FROM idempotency WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def record(self, key: str, method: str, endpoint: str, body: Any) -> None:
+        """Record the response body of a key.
+
+        Args:
+            key (str): the idempotency key.
+            method (str): the HTTP method.
+            endpoint (str): the endpoint.
+            body (Any): the response body.
+        """
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO idempotency (key, method, endpoint, body) VALUES (?, ?, ?, ?)",
+                (key, method, endpoint, json.dumps(body, default=str))
+            )
+
+    def forget(self, key: str) -> None:
+        """Remove a key, eg. when the created record was rolled back or deleted.
+
+        Args:
+            key (str): the idempotency key.
+        """
+        with self.db:
+            self.db.execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        "Close the database."
+        self.db.close()
+
+
+def get_journal(api: Any) -> IdempotencyJournal:
+    """Get the journal of an API handler, an in-memory journal is created on first use.
+
+    Args:
+        api (APIHandler): the API handler.
+
+    Returns:
+        IdempotencyJournal: the journal.
+    """
+    journal = getattr(api, "idempotency_journal", None)
+    if journal is None:
+        journal = api.idempotency_journal = IdempotencyJournal()
+    return journal
+
+
+def open_journal(journal: Union[str, IdempotencyJournal, None]) -> Optional[IdempotencyJournal]:
+    "A journal from a path, or the journal itself."
+    if journal is None or isinstance(journal, IdempotencyJournal):
+        return journal
+    return IdempotencyJournal(journal)
+
+
+async def idempotent_request(api: Any,
+                             method: str,
+                             endpoint: str,
+                             key: Optional[str] = None,
+                             params: Optional[dict] = None,
+                             data: Optional[dict] = None,
+                             headers: Optional[dict] = None) -> Optional[Union[dict, list]]:
+    """Make a request once per idempotency key.
+
+    Args:
+        api (APIHandler): the API handler.
+        method (str): the HTTP method.
+        endpoint (str): URL path to the API endpoint.
+        key (Optional[str], optional): the idempotency key, the request is always made if None. Defaults to None.
+        params (dict, optional): query params. Defaults to None.
+        data (dict, optional): body. Defaults to None.
+        headers (dict, optional): headers. Defaults to None.
+
+    Raises:
+        APIError: an API error occurred.
+        ValueError: the key was used for a request with another method or endpoint.
+
+    Returns:
+        Optional[Union[dict, list]]: the response body, or the recorded body of an earlier request with the key.
+    """
+    if key is None:
+        return await api.request(method, endpoint, params=params, data=data, headers=headers)
+
+    journal = get_journal(api)
+    used = journal.get_request(key)
+    if used is not None:
+        _check_request(key, used, method, endpoint)
+        return journal.get(key)
+    if key in journal._pending:
+        pending_method, pending_endpoint, future = journal._pending[key]
+        _check_request(key, (pending_method, pending_endpoint), method, endpoint)
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    journal._pending[key] = (method, endpoint, future)
+    try:
+        body = await api.request(method, endpoint, params=params, data=data,
+                                 headers={**(headers or {}), IDEMPOTENCY_HEADER: key})
+    except BaseException as e:
+        future.set_exception(e)
+        # retrieved by the waiting calls, if any
+        future.exception()
+        raise
+    else:
+        journal.record(key, method, endpoint, body)
+        future.set_result(body)
+        return body
+    finally:
+        del journal._pending[key]
+
+
+def _check_request(key: str, used: Tuple[str, str], method: str, endpoint: str) -> None:
+    "Raise if a key is reused for another request."
+    if (used[0].upper(), used[1].strip("/")) != (method.upper(), endpoint.strip("/")):
+        raise ValueError(f"Invalid idempotency key: {key} - already used for {used[0]} {used[1]}")
+
+
+def forget_key(api: Any, key: Optional[str]) -> None:
+    """Remove a key from the journal of an API handler, if it has one.
+
+    Args:
+        api (APIHandler): the API handler.
+        key (Optional[str]): the idempotency key.
+    """
+    journal = getattr(api, "idempotency_journal", None)
+    if key is not None and journal is not None:
+        journal.forget(key)
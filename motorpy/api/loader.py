@@ -0,0 +1,128 @@
+"""
+Batched loading.
+
+`BatchLoader` collects the keys requested in the same event loop tick and resolves them with a single batch call,
+mapping the results back to each awaiting caller (similar to the DataLoader pattern).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchFunction = Callable[[List[K]], Awaitable[Dict[K, Any]]]
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    Load values by key in batches.
+
+    ```python
+    loader = BatchLoader(fetch_drivers)
+    a, b = await asyncio.gather(loader.load("d-1"), loader.load("d-2"))  # one call to fetch_drivers(["d-1", "d-2"])
+    ```
+    """
+
+    def __init__(self,
+                 batch_fn: BatchFunction,
+                 max_batch_size: int = 100,
+                 cache: bool = True) -> None:
+        """
+        Args:
+            batch_fn (BatchFunction): called with the unique keys of a batch, returns the value of each key.
+                Missing keys resolve to None, exceptions in the result are raised to the callers of that key.
+            max_batch_size (int, optional): the maximum number of keys per call. Defaults to 100.
+            cache (bool, optional): whether to keep the results, so a key is only loaded once. Defaults to True.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        # loaded values, when caching
+        self._values: Dict[K, Any] = {}
+        # keys being loaded
+        self._futures: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+
+    async def load(self, key: K) -> Optional[V]:
+        """Load the value of a key.
+
+        Args:
+            key (K): the key.
+
+        Returns:
+            Optional[V]: the value, None if the batch did not return it.
+        """
+        if key in self._values:
+            return self._values[key]
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._queue:
+                # dispatch after the callers of this tick have queued their keys
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        """Load the values of multiple keys.
+
+        Args:
+            keys (List[K]): the keys.
+
+        Returns:
+            List[Optional[V]]: the values, in the same order.
+        """
+        return list(await asyncio.gather(*(self.load(k) for k in keys)))
+
+    def prime(self, key: K, value: V) -> None:
+        """Set the value of a key without loading it.
+
+        Args:
+            key (K): the key.
+            value (V): the value.
+        """
+        self._values[key] = value
+
+    def clear(self, key: Optional[K] = None) -> None:
+        """Forget a loaded value, or all values.
+
+        Args:
+            key (Optional[K], optional): the key. Defaults to None (all keys).
+        """
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        for i in range(0, len(keys), self.max_batch_size):
+            asyncio.ensure_future(self._run(keys[i:i + self.max_batch_size]))
+
+    async def _run(self, keys: List[K]) -> None:
+        futures = {key: self._futures[key] for key in keys}
+        try:
+            try:
+                results = await self.batch_fn(keys)
+            except Exception as e:
+                results = {k: e for k in keys}
+            for key in keys:
+                future = self._futures.pop(key)
+                value = results.get(key)
+                if isinstance(value, BaseException):
+                    # failures are not cached, the next load retries
+                    future.set_exception(value)
+                else:
+                    if self.cache:
+                        self._values[key] = value
+                    future.set_result(value)
+        finally:
+            # eg. the batch was cancelled: fail the loads still waiting and forget them, so the next load retries
+            for key, future in futures.items():
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+                if not future.done():
+                    future.cancel()
@@ -75,17 +75,34 @@ if __name__ == "__main__":
 """
 import asyncio
 import sys
-from typing import Union, Optional
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Union, Optional
+import motorpy.models as models
 import motorpy.drivers as drivers
 import motorpy.vehicles as vehicles
 import motorpy.fleets as fleets
+import motorpy.policies as policies
 from motorpy.auth import Auth
 from motorpy.api import APIHandler
 from motorpy.api.core import APIHandlerNoAuth
 from motorpy.api.org import OrgSettings
+from motorpy.api.loader import BatchLoader
+from motorpy.api.idempotency import IdempotencyJournal, open_journal
+from motorpy.batch import UnitOfWork, WriteBehindQueue
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY
 
 NAME = "motorpy"
 
+# list endpoint and model of each batch loader resource
+LOADER_RESOURCES = {
+    "drivers": ("drivers", models.Driver),
+    "vehicles": ("registered-vehicles", models.Vehicle),
+    "fleets": ("fleets", models.Fleet),
+}
+
+# the maximum number of IDs per list request of a loader
+LOADER_PAGE_SIZE = 50
+
 # known event loop issue
 # https://github.com/encode/httpx/issues/914
 if sys.version_info[0] == 3 and sys.version_info[1] >= 8 and sys.platform.startswith('win'):
@@ -102,13 +119,27 @@ class Motor(drivers.Drivers,
         auth (Auth): the authentication object.
         region (str, optional): the region. Defaults to None.
         url (str, optional): URL override if region is not supplied. Defaults to None.
+        trusted (bool, optional): skip pydantic validation when building models from list responses.
+            API data is trusted and only datetimes, enums and nested models are converted. Defaults to False.
+        id_filters (Dict[str, str], optional): the query parameter that lists several records by ID, per resource ("drivers", "vehicles" or "fleets").
+            It is used by `load_driver`, `load_vehicle` and `load_fleet` to fetch a batch of IDs with a single list request.
+            Resources without a filter are fetched with one (concurrent, deduplicated) request per ID. Defaults to None.
+        idempotency_journal (Union[str, IdempotencyJournal], optional): the journal of create calls made with an idempotency key,
+            or a SQLite path to keep it between runs, see `motorpy.api.idempotency`. Defaults to None (in memory).
+        cache_loads (bool, optional): keep the records loaded by `load_driver`, `load_vehicle` and `load_fleet` for the life
+            of the motor, so each is only fetched once. Otherwise only the loads of the same event loop tick share a request.
+            Defaults to False.
     """
 
     def __init__(self,
                  org_id: str,
                  auth: Optional[Auth] = None,
                  region: Optional[str] = None,
-                 url: Optional[str] = None) -> None:
+                 url: Optional[str] = None,
+                 trusted: bool = False,
+                 id_filters: Optional[Dict[str, str]] = None,
+                 idempotency_journal: Union[str, IdempotencyJournal, None] = None,
+                 cache_loads: bool = False) -> None:
         self.org_id = org_id
         self.auth = auth
         self.region = region
@@ -117,15 +148,33 @@ class Motor(drivers.Drivers,
         # all requests are routed through here
         # this is scoped to a single org id
         if self.auth is not None:
-            self.api = APIHandler(org_id, auth, region, url)
+            self.api = APIHandler(org_id, auth, region, url, trusted=trusted)
         else:
-            self.api = APIHandlerNoAuth(org_id, region, url)
+            self.api = APIHandlerNoAuth(org_id, region, url, trusted=trusted)
+        self.api.idempotency_journal = open_journal(idempotency_journal)
 
         drivers.Drivers.__init__(self, self.api)
         vehicles.Vehicles.__init__(self, self.api)
         fleets.Fleets.__init__(self, self.api)
+        # bulk policy operations, eg. motor.policies.bulk_approve(ids)
+        self.policies = policies.Policies(self.api)
+
+        self.id_filters = id_filters or {}
+        unknown = set(self.id_filters) - set(LOADER_RESOURCES)
+        if unknown:
+            raise ValueError(f"Invalid id_filters resources: {unknown} - can be one of {set(LOADER_RESOURCES)}")
+        # batch loaders by resource, see load_driver etc.
+        self.loaders: Dict[str, BatchLoader] = {
+            "drivers": BatchLoader(partial(self._load_batch, "drivers", self.get_driver), cache=cache_loads),
+            "vehicles": BatchLoader(partial(self._load_batch, "vehicles", self.get_vehicle), cache=cache_loads),
+            "fleets": BatchLoader(partial(self._load_batch, "fleets", self.get_fleet), cache=cache_loads),
+        }
+        # see write_behind
+        self.write_queue: Optional[WriteBehindQueue] = None
 
     async def close(self):
+        if self.write_queue is not None:
+            await self.write_queue.close()
         await self.api.close_session()
 
     async def __aenter__(self):
@@ -134,6 +183,109 @@ class Motor(drivers.Drivers,
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
+    async def _load_batch(self, resource: str, get_one: Callable[[str], Awaitable[Any]], ids: List[str]) -> Dict[str, Any]:
+        "Fetch a batch of records by ID for a loader."
+        id_filter = self.id_filters.get(resource)
+        if id_filter:
+            endpoint, model = LOADER_RESOURCES[resource]
+            results = {}
+
+            async def fetch(chunk: List[str]) -> None:
+                # the API may return fewer records per page than requested, the missing IDs are asked for again
+                # until a request returns none of them
+                remaining = chunk
+                while remaining:
+                    requested = set(remaining)
+                    async for raw in self.api.batch_fetch(endpoint, params={id_filter: ",".join(remaining)}, limit=len(remaining)):
+                        if raw.get("id") in requested:
+                            results[raw["id"]] = model.from_api(self.api, raw)
+                    missing = [i for i in remaining if i not in results]
+                    if len(missing) == len(remaining):
+                        break
+                    remaining = missing
+
+            await asyncio.gather(*(fetch(ids[i:i + LOADER_PAGE_SIZE]) for i in range(0, len(ids), LOADER_PAGE_SIZE)))
+            return results
+        fetched = await asyncio.gather(*(get_one(i) for i in ids), return_exceptions=True)
+        return dict(zip(ids, fetched))
+
+    async def load_driver(self, driver_id: str) -> Optional[models.Driver]:
+        """Get a driver, batched with the other drivers loaded in the same event loop tick.
+        Loaded drivers are only cached when the motor was created with `cache_loads=True`,
+        use `motor.loaders["drivers"].clear()` to reload them.
+
+        Args:
+            driver_id (str): the UUID of the driver.
+
+        Returns:
+            Optional[models.Driver]: the driver model, None if it was not found in a list request.
+        """
+        return await self.loaders["drivers"].load(driver_id)
+
+    async def load_vehicle(self, vehicle_id: str) -> Optional[models.Vehicle]:
+        """Get a registered vehicle, batched with the other vehicles loaded in the same event loop tick.
+        Loaded vehicles are only cached when the motor was created with `cache_loads=True`,
+        use `motor.loaders["vehicles"].clear()` to reload them.
+
+        Args:
+            vehicle_id (str): the UUID of the vehicle.
+
+        Returns:
+            Optional[models.Vehicle]: the vehicle model, None if it was not found in a list request.
+        """
+        return await self.loaders["vehicles"].load(vehicle_id)
+
+    async def load_fleet(self, fleet_id: str) -> Optional[models.Fleet]:
+        """Get a fleet, batched with the other fleets loaded in the same event loop tick.
+        Loaded fleets are only cached when the motor was created with `cache_loads=True`,
+        use `motor.loaders["fleets"].clear()` to reload them.
+
+        Args:
+            fleet_id (str): the UUID of the fleet.
+
+        Returns:
+            Optional[models.Fleet]: the fleet model, None if it was not found in a list request.
+        """
+        return await self.loaders["fleets"].load(fleet_id)
+
+    def batch(self, concurrency: int = DEFAULT_CONCURRENCY) -> UnitOfWork:
+        """Start a unit of work, the updates, deletes and creates it collects are made together when it exits.
+
+        ```python
+        async with motor.batch() as uow:
+            await uow.update(driver, first_name="Jane")
+        print(uow.result.counts())
+        ```
+
+        Args:
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+
+        Returns:
+            UnitOfWork: the unit of work, see `motorpy.batch.unit`.
+        """
+        return UnitOfWork(concurrency=concurrency)
+
+    def write_behind(self, **options) -> WriteBehindQueue:
+        """Get the write-behind queue of this motor, it is created on first use.
+        Updates put on the queue are saved in the background, the pending updates are saved on `close`.
+
+        ```python
+        queue = motor.write_behind(flush_interval=0.5, on_error=lambda item, model: print(item.error))
+        await queue.put(driver, points=120)
+        ```
+
+        Args:
+            **options: the `WriteBehindQueue` options, only used when the queue is created.
+
+        Returns:
+            WriteBehindQueue: the queue, see `motorpy.batch.queue`.
+        """
+        if self.write_queue is None:
+            self.write_queue = WriteBehindQueue(**options)
+        elif options:
+            raise ValueError("The write-behind queue already exists, options can only be set when it is created")
+        return self.write_queue
+
     async def org_settings(self) -> 'OrgSettings':
         """Get the organization settings.
 
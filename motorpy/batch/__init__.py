@@ -0,0 +1,2 @@
+from .unit import UnitOfWork, record_key
+from .queue import WriteBehindQueue
@@ -0,0 +1,195 @@
+"""
+Write-behind update queue.
+
+A `WriteBehindQueue` accepts model updates without waiting for the API. The updates are applied to the model at once
+and the record is saved later in the background, together with the other pending records:
+
+```python
+queue = motor.write_behind(batch_size=200, flush_interval=0.5, on_error=print)
+for driver, points in scores:
+    await queue.put(driver, points=points)
+await motor.close()  # flushes the remaining updates
+```
+
+- successive updates to the same record are merged, the record is saved once with the changed fields
+- the queue is flushed when `batch_size` records are pending, or `flush_interval` seconds after the last flush
+- `put` waits while `max_pending` records are pending (backpressure), updates to pending records never wait
+- `on_flush` is called with the result of each flush and its lag (the seconds from the oldest update of the flush
+  until its records were saved), `on_error` with each record that could not be saved
+
+A record that could not be saved is not retried, `on_error` can put it again.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from motorpy.models.bulk import BulkItemResult, BulkResult
+from motorpy.models.custom import PrivateAPIHandler
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY
+from .unit import UnitOfWork, record_key
+
+
+# callbacks may be sync or async
+FlushCallback = Callable[[BulkResult, float], Union[None, Awaitable[None]]]
+ErrorCallback = Callable[[BulkItemResult, PrivateAPIHandler], Union[None, Awaitable[None]]]
+
+
+async def _call(callback: Optional[Callable], *args) -> None:
+    if callback is None:
+        return
+    res = callback(*args)
+    if asyncio.iscoroutine(res):
+        await res
+
+
+class WriteBehindQueue:
+    """
+    Saves updated models in the background, merging the updates of each record.
+    """
+
+    def __init__(self,
+                 batch_size: int = 100,
+                 flush_interval: float = 1.0,
+                 max_pending: int = 1000,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 on_flush: Optional[FlushCallback] = None,
+                 on_error: Optional[ErrorCallback] = None) -> None:
+        """
+        Args:
+            batch_size (int, optional): flush when this many records are pending. Defaults to 100.
+            flush_interval (float, optional): the maximum seconds between flushes. Defaults to 1.0.
+            max_pending (int, optional): `put` waits while this many records are pending. Defaults to 1000.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+            on_flush (FlushCallback, optional): called with the result and the lag of each flush. Defaults to None.
+            on_error (ErrorCallback, optional): called with the result and the model of each record that failed. Defaults to None.
+        """
+        if batch_size < 1 or max_pending < batch_size:
+            raise ValueError("batch_size must be at least 1 and max_pending at least batch_size")
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+        self.on_flush = on_flush
+        self.on_error = on_error
+
+        # record key -> (models, time of the first pending update)
+        self._pending: Dict[str, Tuple[List[PrivateAPIHandler], float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closed = False
+
+        # stats
+        self.flushes = 0
+        self.saved = 0
+        self.errors = 0
+        self.last_lag: Optional[float] = None
+
+    @property
+    def pending(self) -> int:
+        "The number of records waiting to be saved."
+        return len(self._pending)
+
+    @property
+    def lag(self) -> float:
+        "The seconds since the oldest pending update, 0 if nothing is pending."
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - min(t for _, t in self._pending.values())
+
+    def _start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._space = asyncio.Condition()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def put(self, model: PrivateAPIHandler, **kwargs) -> None:
+        """Update fields on a model and save it in the background.
+
+        Args:
+            model (PrivateAPIHandler): the model.
+            **kwargs: the model fields to update.
+
+        Raises:
+            RuntimeError: the queue is closed.
+        """
+        if self._closed:
+            raise RuntimeError("The write-behind queue is closed")
+        self._start()
+        key = record_key(model)
+        if key not in self._pending and len(self._pending) >= self.max_pending:
+            self._wake.set()
+            async with self._space:
+                await self._space.wait_for(lambda: len(self._pending) < self.max_pending or key in self._pending)
+
+        await model.update(**kwargs)
+        models, _ = self._pending.setdefault(key, ([], time.monotonic()))
+        # in the order of the last update, see `UnitOfWork.save`
+        models[:] = [m for m in models if m is not model]
+        models.append(model)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending:
+                try:
+                    await self.flush()
+                except Exception:
+                    # a failing callback does not stop the background flushes
+                    pass
+
+    async def flush(self) -> BulkResult:
+        """Save the pending records now.
+
+        Returns:
+            BulkResult: the result of each record.
+        """
+        if self._flush_lock is None:
+            return BulkResult()
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            async with self._space:
+                self._space.notify_all()
+            if not batch:
+                return BulkResult()
+
+            oldest = min(t for _, t in batch.values())
+            uow = UnitOfWork(concurrency=self.concurrency)
+            for models, _ in batch.values():
+                for model in models:
+                    uow.save(model)
+            result = await uow.flush()
+            self.last_lag = time.monotonic() - oldest
+
+            self.flushes += 1
+            self.saved += len(result.succeeded)
+            self.errors += len(result.failed)
+            for item in result.failed:
+                await _call(self.on_error, item, batch[item.key][0][-1])
+            await _call(self.on_flush, result, self.last_lag)
+            return result
+
+    async def close(self) -> None:
+        "Stop the background flushes and save the pending records."
+        self._closed = True
+        if self._task is None:
+            return
+        self._wake.set()
+        await self._task
+        await self.flush()
+
+    async def __aenter__(self) -> 'WriteBehindQueue':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
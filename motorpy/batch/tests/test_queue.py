@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from ...base import Motor
+from ...models import Driver
+from ...tests.fakes import FakeAPI
+from ..queue import WriteBehindQueue
+
+
+def patches(api):
+    return api.log("endpoint", "data")
+
+
+def driver(api, driver_id):
+    return Driver.from_api(api, {"id": driver_id, "firstName": "Ann", "points": 0})
+
+
+class TestWriteBehindQueue:
+
+    def test_merges_updates(self):
+        motor = Motor("org", region="eu-1")
+        api = motor.api = FakeAPI(delay=0.005)
+        flushes = []
+
+        async def main():
+            flushed = asyncio.Event()
+
+            def on_flush(result, lag):
+                flushes.append((result, lag))
+                flushed.set()
+
+            queue = motor.write_behind(flush_interval=0.01, on_flush=on_flush)
+            d = driver(api, "d-1")
+            for points in range(1, 6):
+                await queue.put(d, points=points)
+            await queue.put(d, first_name="Anne")
+            # accepted without waiting for the API
+            assert patches(api) == []
+            # flushed in the background
+            await asyncio.wait_for(flushed.wait(), timeout=5)
+            assert patches(api) == [("/drivers/d-1", {"points": 5, "firstName": "Anne"})]
+            await queue.put(d, points=6)
+            await motor.close()
+
+        asyncio.run(main())
+        assert patches(api)[-1] == ("/drivers/d-1", {"points": 6})
+        assert len(flushes) == 2
+        assert all(lag > 0 for _, lag in flushes)
+        assert motor.write_queue.saved == 2
+
+    def test_batch_size_and_backpressure(self):
+        api = FakeAPI(delay=0.005)
+
+        async def main():
+            queue = WriteBehindQueue(batch_size=2, max_pending=3, flush_interval=10)
+            for n in range(10):
+                await queue.put(driver(api, f"d-{n}"), points=1)
+                assert queue.pending <= 3
+            await queue.close()
+            return queue
+
+        queue = asyncio.run(main())
+        assert len(patches(api)) == 10
+        assert queue.flushes >= 4
+        with pytest.raises(RuntimeError):
+            asyncio.run(queue.put(driver(api, "d-1"), points=2))
+
+    def test_errors(self):
+        api = FakeAPI(delay=0.005, fail={"/drivers/d-1"})
+        errors = []
+
+        async def main():
+            async with WriteBehindQueue(on_error=lambda item, model: errors.append((item.status_code, model.id))) as queue:
+                await queue.put(driver(api, "d-1"), points=1)
+                await queue.put(driver(api, "d-2"), points=1)
+            return queue
+
+        queue = asyncio.run(main())
+        assert errors == [(500, "d-1")]
+        assert (queue.saved, queue.errors) == (1, 1)
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from ...base import Motor
+from ...models import Driver, Fleet, Policy
+from ...models.policy.tests.const import FULL
+from ...tests.fakes import FakeAPI
+
+
+def make_api(fail=()):
+    return FakeAPI(respond=lambda call: {**(call.data or {}), "id": "new", "display": "New"}, fail=fail, delay=0.001)
+
+
+def driver(api, driver_id):
+    return Driver.from_api(api, {"id": driver_id, "firstName": "Ann", "lastName": "One", "points": 1})
+
+
+class TestUnitOfWork:
+
+    def test_flush_coalesces(self):
+        motor = Motor("org", region="eu-1")
+        api = motor.api = make_api()
+        drivers = [driver(api, f"d-{n}") for n in range(6)]
+        other = driver(api, "d-0")
+
+        async def main():
+            async with motor.batch(concurrency=2) as uow:
+                for d in drivers:
+                    await uow.update(d, points=5)
+                await uow.update(drivers[0], first_name="Anne")
+                # another instance of the same record
+                await uow.update(other, last_name="Two")
+                # unchanged
+                await uow.update(drivers[1], points=5)
+                uow.save(driver(api, "d-9"))
+                uow.delete(drivers[2])
+                uow.create(lambda: motor.create_fleet(Fleet(display="New")), key="fleet")
+                assert api.calls == []
+            return uow
+
+        uow = asyncio.run(main())
+        patches = {c.endpoint: c.data for c in api.calls if c.method == "PATCH"}
+        assert patches["/drivers/d-0"] == {"points": 5, "firstName": "Anne", "lastName": "Two"}
+        assert patches["/drivers/d-1"] == {"points": 5}
+        assert "/drivers/d-2" not in patches
+        assert ("DELETE", "/drivers/d-2") in api.log("method", "endpoint")
+        assert len(api.calls) == 1 + 5 + 1
+        assert api.max_running == 2
+
+        result = uow.result
+        assert result.ok
+        assert result.counts() == {"ok": 7, "error": 0, "skipped": 1}
+        assert result.skipped[0].key == "Driver:d-9"
+        assert {i.key: i.action for i in result.items}["fleet"] == "create"
+        # the saved state is the new baseline
+        assert other.get_changes() == {}
+
+    def test_instances_merged(self):
+        api = make_api()
+        first, second = Policy.from_api(api, FULL), Policy.from_api(api, FULL)
+        d1, d2 = driver(api, "d-1"), driver(api, "d-1")
+
+        async def main():
+            async with Motor("org", region="eu-1").batch() as uow:
+                first.rates.rates_active = False
+                uow.save(first)
+                second.rates.rates_value = 1.5
+                uow.save(second)
+                await uow.update(d1, points=5)
+                await uow.update(d2, points=7)
+                await uow.update(d1, points=9)
+
+        asyncio.run(main())
+        patches = {c.endpoint: c.data for c in api.calls}
+        # nested objects are merged, the last update wins
+        assert patches["/policy/DRV-123"] == {"rates": {"enabled": False, "value": 1.5}}
+        assert patches["/drivers/d-1"] == {"points": 9}
+        assert first.get_changes() == second.get_changes() == {}
+
+    def test_save_excludes(self):
+        api = make_api()
+        first, second, third = driver(api, "d-1"), driver(api, "d-1"), driver(api, "d-2")
+
+        async def main():
+            async with Motor("org", region="eu-1").batch() as uow:
+                await uow.update(first, vehicles_raw=[{"id": "drv-1"}])
+                await uow.update(second, points=5)
+                # only fields that are never saved
+                await uow.update(third, vehicles_raw=[{"id": "drv-2"}])
+            return uow.result
+
+        result = asyncio.run(main())
+        assert api.log("method", "endpoint", "data") == [("PATCH", "/drivers/d-1", {"points": 5})]
+        assert [i.key for i in result.skipped] == ["Driver:d-2"]
+
+    def test_changes_during_flush_pending(self):
+        api = make_api()
+        first, second = driver(api, "d-1"), driver(api, "d-1")
+
+        async def main():
+            uow = Motor("org", region="eu-1").batch()
+            await uow.update(first, points=5)
+            await uow.update(second, first_name="Anne")
+            flush = asyncio.ensure_future(uow.flush())
+            await asyncio.sleep(0)
+            # made while the request is in flight
+            await second.update(last_name="Two")
+            await flush
+
+        asyncio.run(main())
+        assert api.log("method", "endpoint", "data") == [("PATCH", "/drivers/d-1", {"points": 5, "firstName": "Anne"})]
+        assert first.get_changes() == {}
+        assert second.get_changes() == {"lastName": "Two"}
+
+    def test_failures_are_reported(self):
+        motor = Motor("org", region="eu-1")
+        api = motor.api = make_api(fail={"/drivers/d-1"})
+
+        async def main():
+            async with motor.batch() as uow:
+                for n in range(3):
+                    await uow.update(driver(api, f"d-{n}"), points=2)
+            return uow.result
+
+        result = asyncio.run(main())
+        assert [(i.key, i.status_code) for i in result.failed] == [("Driver:d-1", 500)]
+        assert len(result.succeeded) == 2
+
+    def test_discard_on_error(self):
+        motor = Motor("org", region="eu-1")
+        api = motor.api = make_api()
+
+        async def main():
+            async with motor.batch() as uow:
+                await uow.update(driver(api, "d-1"), points=2)
+                raise RuntimeError("stop")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(main())
+        assert api.calls == []
+
+    def test_save_after_delete(self):
+        uow = Motor("org", region="eu-1").batch()
+        d = driver(None, "d-1")
+        uow.delete(d)
+        with pytest.raises(ValueError):
+            uow.save(d)
+        with pytest.raises(ValueError):
+            uow.save(Driver())
@@ -0,0 +1,203 @@
+"""
+Unit of work.
+
+A `UnitOfWork` collects the writes of a workflow and makes them together when it is flushed,
+instead of one awaited request per `save()`:
+
+```python
+async with motor.batch(concurrency=20) as uow:
+    for driver in drivers:
+        await uow.update(driver, points=driver.points + 10)
+    uow.delete(old_vehicle)
+    uow.create(lambda: motor.create_fleet(models.Fleet(display="New")))
+
+print(uow.result.counts())
+```
+
+- updates to the same record are coalesced into one PATCH with only the changed fields (see `PrivateAPIHandler.snapshot`),
+  also when the record was updated through different model instances: their changes are merged key by key
+  (nested objects included), and where they change the same key the instance saved or updated last wins
+- records without changes are skipped
+- a record that is deleted is not updated
+- the calls run concurrently when the context exits (or on `flush`), a failed call does not stop the others
+
+If the body of the `async with` raises, the pending writes are discarded.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from motorpy.models.bulk import BulkItemResult, BulkResult, BulkStatus, Operation, run_bulk
+from motorpy.models.custom import PrivateAPIHandler, merge_state
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY
+
+
+def record_key(model: PrivateAPIHandler) -> str:
+    """The key of the record of a model, models of the same record have the same key.
+
+    Args:
+        model (PrivateAPIHandler): the model.
+
+    Raises:
+        ValueError: the model has no ID.
+
+    Returns:
+        str: the key, eg. "Driver:<id>".
+    """
+    record_id = getattr(model, "id", None)
+    if not record_id:
+        raise ValueError(f"{model.__class__.__name__} must have an id to be saved or deleted in a batch")
+    return f"{model.__class__.__name__}:{record_id}"
+
+
+def pending_fields(model: PrivateAPIHandler) -> dict:
+    "The API formatted fields to save for a model, the fields its save never sends are left out."
+    changes = model.get_changes(exclude=model._save_exclude)
+    if changes is not None:
+        return changes
+    return model.dict(
+        by_alias=True,
+        exclude=model._save_exclude.union({'api', 'id', 'created_at'}),
+        exclude_defaults=True,
+        exclude_unset=True
+    )
+
+
+class UnitOfWork:
+    """
+    Collects creates, updates and deletes, and makes them concurrently on flush.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        """
+        Args:
+            concurrency (int, optional): the maximum number of requests at once on flush. Defaults to 10.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        # the result of the last flush
+        self.result: Optional[BulkResult] = None
+        # record key -> the models to save, in the order they were last saved or updated
+        self._saves: Dict[str, List[PrivateAPIHandler]] = {}
+        self._deletes: Dict[str, PrivateAPIHandler] = {}
+        self._creates: List[Operation] = []
+
+    @property
+    def pending(self) -> int:
+        "The number of pending writes (one per record)."
+        return len(self._saves) + len(self._deletes) + len(self._creates)
+
+    def save(self, model: PrivateAPIHandler) -> PrivateAPIHandler:
+        """Save a model on flush.
+
+        Args:
+            model (PrivateAPIHandler): the model, eg. a driver that was changed.
+
+        Raises:
+            ValueError: the record is pending deletion.
+
+        Returns:
+            PrivateAPIHandler: the model.
+        """
+        key = record_key(model)
+        if key in self._deletes:
+            raise ValueError(f"{key} is pending deletion")
+        models = self._saves.setdefault(key, [])
+        # the latest save of an instance wins over the other instances
+        models[:] = [m for m in models if m is not model]
+        models.append(model)
+        return model
+
+    async def update(self, model: PrivateAPIHandler, **kwargs) -> PrivateAPIHandler:
+        """Update fields on a model and save it on flush.
+
+        Args:
+            model (PrivateAPIHandler): the model.
+            **kwargs: the model fields to update.
+
+        Returns:
+            PrivateAPIHandler: the model.
+        """
+        await model.update(**kwargs)
+        return self.save(model)
+
+    def delete(self, model: PrivateAPIHandler) -> None:
+        """Delete a record on flush, pending updates of the record are dropped.
+
+        Args:
+            model (PrivateAPIHandler): the model.
+        """
+        key = record_key(model)
+        self._saves.pop(key, None)
+        self._deletes[key] = model
+
+    def create(self, call: Callable[[], Awaitable[Any]], key: Optional[str] = None) -> None:
+        """Make a create call on flush, eg. `lambda: motor.create_driver(driver, send_invite=True)`.
+
+        Args:
+            call (Callable[[], Awaitable[Any]]): makes the call, the created model is the result of the item.
+            key (str, optional): identifies the item in the result. Defaults to "create:<n>".
+        """
+        self._creates.append((key or f"create:{len(self._creates)}", "create", call))
+
+    def discard(self) -> None:
+        "Drop the pending writes."
+        self._saves.clear()
+        self._deletes.clear()
+        self._creates.clear()
+
+    def _save_operation(self, key: str, models: List[PrivateAPIHandler]) -> Optional[Operation]:
+        if len(models) == 1:
+            model = models[0]
+            if model._loaded_state() is not None and not pending_fields(model):
+                return None
+            return key, "update", model.save
+
+        # several instances of the record, their changes are merged (the latest wins)
+        changes = [pending_fields(model) for model in models]
+        fields = {}
+        for model_changes in changes:
+            merge_state(fields, model_changes)
+        if not fields:
+            return None
+
+        async def save() -> Any:
+            res = await models[-1].save(fields=fields)
+            # only the sent changes are saved, later changes (eg. made during the request) are still pending
+            for model, model_changes in zip(models, changes):
+                loaded = model._loaded_state()
+                if loaded is not None:
+                    merge_state(loaded, model_changes)
+            return res
+
+        return key, "update", save
+
+    async def flush(self) -> BulkResult:
+        """Make the pending writes concurrently.
+
+        Returns:
+            BulkResult: the result of each record, keyed by "<model>:<id>" (or the create key).
+                Records without changes are skipped.
+        """
+        operations: List[Operation] = list(self._creates)
+        skipped = []
+        for key, models in self._saves.items():
+            operation = self._save_operation(key, models)
+            if operation is None:
+                skipped.append(BulkItemResult(key=key, action="update", status=BulkStatus.skipped, attempts=0))
+            else:
+                operations.append(operation)
+        operations.extend((key, "delete", model.delete) for key, model in self._deletes.items())
+        self.discard()
+
+        result = BulkResult(items=skipped)
+        self.result = await run_bulk(operations, concurrency=self.concurrency, result=result)
+        return self.result
+
+    async def __aenter__(self) -> 'UnitOfWork':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is not None:
+            self.discard()
+            return
+        await self.flush()
@@ -0,0 +1,258 @@
+"""
+Bulk driver import.
+
+`import_drivers` streams the rows of a CSV file, validates them into `Driver` models in worker threads
+(or processes) and creates the drivers with a bounded number of concurrent requests:
+
+```python
+summary = await motor.import_drivers("drivers.csv", results_path="results.csv", concurrency=20, send_invite=True)
+```
+
+The CSV columns are the API keys (eg. firstName, dob) or the model field names (eg. first_name, date_of_birth).
+An optional "password" column sets the password of each driver.
+
+Rows with the email or external ID of an existing driver (see `existing`), or of an earlier row, are skipped as duplicates.
+The result of each row is written to the results file: row, status, id, email, externalId, error.
+
+Rows are processed in chunks, the next chunk is validated while the current one is being created.
+
+With an `idempotency_prefix`, each driver is created with an idempotency key derived from the prefix and their email,
+so an import that stopped part way can be run again without creating the same drivers twice
+(keep the journal between runs with `Motor(..., idempotency_journal="path.db")`, see `motorpy.api.idempotency`).
+"""
+import asyncio
+import csv
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, ValidationError
+
+import motorpy.models as models
+from motorpy.api.idempotency import derive_key
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY, gather_limited
+
+
+RESULT_COLUMNS = ("row", "status", "id", "email", "externalId", "error")
+
+# required to create a driver
+REQUIRED = ("first_name", "last_name", "email")
+
+
+class ImportStatus(str, Enum):
+    created = "created"
+    duplicate = "duplicate"
+    invalid = "invalid"
+    error = "error"
+
+
+class ImportSummary(BaseModel):
+    "The counts of a bulk import."
+    rows: int = 0
+    created: int = 0
+    duplicate: int = 0
+    invalid: int = 0
+    error: int = 0
+    seconds: float = 0.0
+
+
+class RowResult(BaseModel):
+    "The result of one row."
+    row: int
+    status: ImportStatus
+    id: Optional[str] = None
+    email: Optional[str] = None
+    external_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _email_key(email: Optional[str]) -> Optional[str]:
+    return email.strip().lower() if email else None
+
+
+def parse_row(row: Dict[str, str]) -> Tuple[Optional[models.Driver], Optional[str], Optional[str]]:
+    """Validate a CSV row into a driver model. Runs in a worker.
+
+    Args:
+        row (Dict[str, str]): the row, empty values are ignored.
+
+    Returns:
+        Tuple[Optional[Driver], Optional[str], Optional[str]]: the driver, the password and the validation error.
+    """
+    data = {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip()}
+    password = data.pop("password", None)
+    try:
+        driver = models.Driver(**data)
+    except ValidationError as e:
+        return None, None, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    missing = [f for f in REQUIRED if not getattr(driver, f)]
+    if missing:
+        return None, None, f"Missing required fields: {', '.join(missing)}"
+    return driver, password, None
+
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    """Stream the rows of a CSV file.
+
+    Args:
+        path (str): the file path.
+
+    Yields:
+        Dict[str, str]: the rows.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+
+class DriverIndex:
+    "The emails and external IDs of known drivers, to detect duplicates."
+
+    def __init__(self, drivers: Iterable[Any] = ()) -> None:
+        """
+        Args:
+            drivers (Iterable[Any], optional): drivers or driver records. Defaults to ().
+        """
+        self.emails = set()
+        self.external_ids = set()
+        for d in drivers:
+            self.add(getattr(d, "email", None), getattr(d, "external_id", None))
+
+    def add(self, email: Optional[str], external_id: Optional[str]) -> None:
+        if email:
+            self.emails.add(_email_key(email))
+        if external_id:
+            self.external_ids.add(external_id)
+
+    def duplicate(self, email: Optional[str], external_id: Optional[str]) -> Optional[str]:
+        "The reason a driver is a duplicate, None if it is not."
+        if email and _email_key(email) in self.emails:
+            return f"Duplicate email: {email}"
+        if external_id and external_id in self.external_ids:
+            return f"Duplicate externalId: {external_id}"
+        return None
+
+
+def _chunks(rows: Iterable[Dict[str, str]], size: int) -> Iterator[List[Dict[str, str]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validate(executor: Executor, chunk: List[Dict[str, str]]) -> asyncio.Future:
+    loop = asyncio.get_running_loop()
+    return asyncio.gather(*(loop.run_in_executor(executor, parse_row, row) for row in chunk))
+
+
+async def import_drivers(drivers: Any,
+                         rows: Union[str, Iterable[Dict[str, str]]],
+                         results_path: Optional[str] = None,
+                         concurrency: int = DEFAULT_CONCURRENCY,
+                         workers: int = 4,
+                         processes: bool = False,
+                         chunk_size: int = 500,
+                         existing: Iterable[Any] = (),
+                         send_invite: bool = False,
+                         send_webhook: bool = True,
+                         idempotency_prefix: Optional[str] = None) -> ImportSummary:
+    """Create drivers from CSV rows.
+
+    Args:
+        drivers (Drivers): the object creating the drivers, eg. a `Motor`.
+        rows (Union[str, Iterable[Dict[str, str]]]): a CSV file path, or the rows.
+        results_path (str, optional): the CSV file the result of each row is written to. Defaults to None.
+        concurrency (int, optional): the maximum number of create requests at once. Defaults to 10.
+        workers (int, optional): the number of validation workers. Defaults to 4.
+        processes (bool, optional): whether to validate in processes instead of threads. Defaults to False.
+        chunk_size (int, optional): the number of rows validated at once. Defaults to 500.
+        existing (Iterable[Any], optional): known drivers, eg. `mirror.models("drivers")`, to skip duplicates. Defaults to ().
+        send_invite (bool, optional): whether to send an invite email, for rows without a password. Defaults to False.
+        send_webhook (bool, optional): whether to send a webhook. Defaults to True.
+        idempotency_prefix (str, optional): creates each driver with a key derived from the prefix and their email,
+            to resume an import. Defaults to None.
+
+    Returns:
+        ImportSummary: the counts.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    rows = read_rows(rows) if isinstance(rows, str) else rows
+    index = existing if isinstance(existing, DriverIndex) else DriverIndex(existing)
+    summary = ImportSummary()
+    started = time.perf_counter()
+
+    results_file = open(results_path, "w", newline="", encoding="utf-8") if results_path else None
+    writer = csv.writer(results_file) if results_file else None
+    if writer:
+        writer.writerow(RESULT_COLUMNS)
+
+    async def create(row: int, driver: models.Driver, password: Optional[str]) -> RowResult:
+        try:
+            created = await drivers.create_driver(
+                driver,
+                password=password,
+                send_invite=send_invite and password is None,
+                send_webhook=send_webhook,
+                idempotency_key=None if idempotency_prefix is None else derive_key(
+                    idempotency_prefix, _email_key(driver.email))
+            )
+        except Exception as e:
+            return RowResult(row=row, status=ImportStatus.error, email=driver.email,
+                             external_id=driver.external_id, error=str(e) or e.__class__.__name__)
+        return RowResult(row=row, status=ImportStatus.created, id=created.id, email=driver.email,
+                         external_id=driver.external_id)
+
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    try:
+        with pool_cls(max_workers=workers) as executor:
+            chunks = _chunks(rows, chunk_size)
+            first = next(chunks, None)
+            pending = (first, _validate(executor, first)) if first else None
+            while pending:
+                chunk, validating = pending
+                parsed = await validating
+                # validate the next chunk while this one is created
+                following = next(chunks, None)
+                pending = (following, _validate(executor, following)) if following else None
+
+                results: List[Optional[RowResult]] = [None] * len(chunk)
+                creates = []
+                for n, (driver, password, error) in enumerate(parsed):
+                    row = summary.rows + n + 1
+                    if error is not None:
+                        raw = chunk[n]
+                        results[n] = RowResult(row=row, status=ImportStatus.invalid, error=error,
+                                               email=raw.get("email"), external_id=raw.get("externalId") or raw.get("external_id"))
+                        continue
+                    reason = index.duplicate(driver.email, driver.external_id)
+                    if reason is not None:
+                        results[n] = RowResult(row=row, status=ImportStatus.duplicate, email=driver.email,
+                                               external_id=driver.external_id, error=reason)
+                        continue
+                    # later rows with the same email or external ID are duplicates
+                    index.add(driver.email, driver.external_id)
+                    creates.append((n, create(row, driver, password)))
+
+                created = await gather_limited((c for _, c in creates), limit=concurrency)
+                for (n, _), result in zip(creates, created):
+                    results[n] = result
+
+                for result in results:
+                    setattr(summary, result.status.value, getattr(summary, result.status.value) + 1)
+                    if writer:
+                        writer.writerow([result.row, result.status.value, result.id or "", result.email or "",
+                                         result.external_id or "", result.error or ""])
+                summary.rows += len(chunk)
+                if results_file:
+                    results_file.flush()
+    finally:
+        if results_file:
+            results_file.close()
+
+    summary.seconds = time.perf_counter() - started
+    return summary
@@ -1,9 +1,18 @@
 import motorpy.models as models
 from motorpy.api import APIHandler
 from datetime import date
-from typing import Union, Generator
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union, Generator
 import motorpy.search as search
+from motorpy.models.records import record_type
+from motorpy.export import export_listing
+from motorpy.models.prefetch import DEFAULT_CONCURRENCY, iter_prefetched
+from motorpy.models.drivers.aggregate import DRIVER_360_PARTS, PartResult, PartStatus
+from motorpy.api.idempotency import idempotent_request
+from .bulk import ImportSummary, import_drivers
 import asyncio
+import time
+
+DriverRecord = record_type(models.Driver)
 
 
 class Drivers:
@@ -65,7 +74,94 @@ class Drivers:
 
         model.api = self.api
 
-        return model
+        return model.snapshot()
+
+    async def get_driver_360(self,
+                             driver_id: str,
+                             parts: List[str] = None,
+                             timeout: float = 5.0,
+                             timeouts: Dict[str, float] = None,
+                             max_charges: int = 20) -> models.Driver360:
+        """Get a driver with their vehicles (DRVs), fleets, policies, billing accounts and recent charges.
+
+        All parts are fetched concurrently, each with its own timeout.
+        A part that fails or times out is left empty and reported in `parts` of the result, the other parts are still returned.
+        The vehicles, fleets and policies are also attached to the driver, see `motorpy.models.prefetch`.
+
+        Args:
+            driver_id (str): the UUID of the driver.
+            parts (List[str], optional): the parts to fetch, defaults to all of
+                "vehicles", "fleets", "policies", "billing_accounts" and "charges".
+            timeout (float, optional): the timeout of each part, in seconds. Defaults to 5.0.
+            timeouts (Dict[str, float], optional): timeouts by part name (including "driver"), overriding `timeout`. Defaults to None.
+            max_charges (int, optional): the number of recent charges. Defaults to 20.
+
+        Raises:
+            APIError: the driver could not be fetched.
+            asyncio.TimeoutError: the driver was not fetched in time.
+
+        Returns:
+            models.Driver360: the aggregate.
+        """
+        parts = list(DRIVER_360_PARTS) if parts is None else list(dict.fromkeys(parts))
+        for part in parts:
+            if part not in DRIVER_360_PARTS:
+                raise ValueError(f"Invalid part: {part} - can be one of {set(DRIVER_360_PARTS)}")
+        timeouts = {**{p: timeout for p in ("driver", *DRIVER_360_PARTS)}, **(timeouts or {})}
+
+        started = time.perf_counter()
+        driver_task = asyncio.ensure_future(self.get_driver(driver_id))
+        # the other parts only need the driver ID
+        owner = models.Driver(id=driver_id, api=self.api)
+
+        async def fleets() -> List[models.Fleet]:
+            # the fleet memberships are on the driver record
+            driver = await asyncio.shield(driver_task)
+            return await driver.list_fleets()
+
+        fetchers: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "driver": lambda: asyncio.shield(driver_task),
+            "vehicles": owner.list_vehicles,
+            "fleets": fleets,
+            "policies": lambda: _collect(owner.list_policies()),
+            "billing_accounts": owner.list_billing_accounts,
+            "charges": lambda: _collect(owner.list_charges(max_records=max_charges)),
+        }
+
+        async def run(part: str) -> Tuple[Any, PartResult, Optional[BaseException]]:
+            part_started = time.perf_counter()
+            try:
+                value = await asyncio.wait_for(fetchers[part](), timeouts[part])
+                return value, PartResult(status=PartStatus.ok, seconds=time.perf_counter() - part_started), None
+            except asyncio.TimeoutError as e:
+                return None, PartResult(status=PartStatus.timeout, error=f"Timed out after {timeouts[part]}s",
+                                        seconds=time.perf_counter() - part_started), e
+            except Exception as e:
+                return None, PartResult(status=PartStatus.error, error=str(e),
+                                        seconds=time.perf_counter() - part_started), e
+
+        results = dict(zip(["driver", *parts], await asyncio.gather(*(run(p) for p in ["driver", *parts]))))
+
+        driver, _, error = results.pop("driver")
+        if error is not None:
+            driver_task.cancel()
+            raise error
+
+        values: Dict[str, Any] = {p: [] for p in DRIVER_360_PARTS}
+        statuses = {p: PartResult(status=PartStatus.skipped) for p in DRIVER_360_PARTS}
+        for part, (value, status, _) in results.items():
+            statuses[part] = status
+            if status.status == PartStatus.ok:
+                values[part] = value
+                if part in ("vehicles", "fleets", "policies"):
+                    driver._prefetched[part] = value
+
+        return models.Driver360.construct(
+            driver=driver,
+            parts=statuses,
+            seconds=time.perf_counter() - started,
+            **values
+        )
 
     async def list_drivers(self,
                            dob: Union[date, search.Search] = None,
@@ -74,7 +170,31 @@ class Drivers:
                            last_name: Union[str, search.Search] = None,
                            external_id: Union[str, search.Search] = None,
                            is_active: bool = None,
-                           max_records: int = None) -> Generator[models.Driver, None, None]:
+                           max_records: int = None,
+                           records: bool = False,
+                           prefetch: List[str] = None,
+                           concurrency: int = DEFAULT_CONCURRENCY) -> Generator[Union[models.Driver, DriverRecord], None, None]:
+        """List drivers.
+
+        Args:
+            dob (Union[date, search.Search], optional): the date of birth. Defaults to None.
+            email (Union[str, search.Search], optional): the email. Defaults to None.
+            first_name (Union[str, search.Search], optional): the first name. Defaults to None.
+            last_name (Union[str, search.Search], optional): the last name. Defaults to None.
+            external_id (Union[str, search.Search], optional): the external ID. Defaults to None.
+            is_active (bool, optional): whether to list active drivers. Defaults to None.
+            max_records (int, optional): the maximum number of drivers. Defaults to None.
+            records (bool, optional): whether to yield compact read-only records instead of models, see `motorpy.models.records`. Defaults to False.
+            prefetch (List[str], optional): related collections to fetch per page and attach to the drivers,
+                any of "vehicles", "policies" and "fleets", see `motorpy.models.prefetch`. Defaults to None.
+            concurrency (int, optional): the maximum number of prefetch requests at once. Defaults to 10.
+
+        Returns:
+            Generator[Union[models.Driver, DriverRecord]]: the drivers.
+        """
+        if prefetch and records:
+            raise ValueError("prefetch is not supported with records")
+
         params = {}
 
         if dob is not None:
@@ -90,23 +210,53 @@ class Drivers:
         if is_active is not None:
             params['isActive'] = 't' if is_active else 'f'
 
+        if prefetch:
+            async for driver in iter_prefetched(self.api, "drivers", models.Driver, prefetch, params=params,
+                                                max_records=max_records, concurrency=concurrency):
+                yield driver
+            return
+
         count = 0
         async for driver in self.api.batch_fetch("drivers",
                                                  params=params):
             if max_records is not None:
                 if count >= max_records:
                     break
-            model: models.Driver = models.Driver(**driver)
-            model.api = self.api
-            yield model
+            if records:
+                yield DriverRecord.from_api(driver, api=self.api)
+            else:
+                yield models.Driver.from_api(self.api, driver)
             count += 1
             await asyncio.sleep(0.0)
 
+    async def export_drivers(self,
+                             path: str,
+                             format: str = "parquet",
+                             params: dict = None,
+                             page_size: int = 500,
+                             max_records: int = None) -> int:
+        """Export drivers to a columnar file, see `motorpy.export.columnar`.
+        Pages are written as they are fetched, without creating models.
+
+        Args:
+            path (str): the file path.
+            format (str, optional): one of "parquet", "arrow" or "npz". Defaults to "parquet".
+            params (dict, optional): API query parameters, eg. `{"isActive": "t"}`. Defaults to None.
+            page_size (int, optional): records per request and per batch written. Defaults to 500.
+            max_records (int, optional): the maximum number of drivers to write. Defaults to None.
+
+        Returns:
+            int: the number of drivers written.
+        """
+        return await export_listing(self.api, "drivers", models.Driver, path, format=format,
+                                    params=params, page_size=page_size, max_records=max_records)
+
     async def create_driver(self,
                             driver: models.Driver,
                             password: str = None,
                             send_invite: bool = False,
-                            send_webhook: bool = True) -> models.Driver:
+                            send_webhook: bool = True,
+                            idempotency_key: str = None) -> models.Driver:
         """Create a new driver.
         If you would like to perform actions as this driver, you may need to login as the driver with a new motor and auth object.
 
@@ -117,6 +267,8 @@ class Drivers:
             password (str): the password for the driver, if invite is False. Defaults to None.
             send_invite (bool, optional): whether to send an invite email (password must be None if True). Defaults to False.
             send_webhook (bool, optional): whether to send a webhook. Defaults to True.
+            idempotency_key (str, optional): retries with the same key return the driver created by the first call,
+                see `motorpy.api.idempotency`. Defaults to None.
 
         Returns:
             models.Driver: the new driver model.
@@ -135,13 +287,62 @@ class Drivers:
         if password is not None:
             data['password'] = password
 
-        driver_resp = await self.api.request(
+        driver_resp = await idempotent_request(
+            self.api,
             "POST",
             "drivers",
+            key=idempotency_key,
             data=data,
             params={
                 "webhook": "t" if send_webhook else "f",
                 "invite": "t" if send_invite else "f"
             }
         )
-        return models.Driver(api=self.api, **driver_resp)
+        return models.Driver(api=self.api, **driver_resp).snapshot()
+
+    async def import_drivers(self,
+                             rows: Union[str, Iterable[Dict[str, str]]],
+                             results_path: str = None,
+                             concurrency: int = DEFAULT_CONCURRENCY,
+                             workers: int = 4,
+                             processes: bool = False,
+                             chunk_size: int = 500,
+                             existing: Iterable[Any] = (),
+                             send_invite: bool = False,
+                             send_webhook: bool = True,
+                             idempotency_prefix: str = None) -> ImportSummary:
+        """Create drivers from a CSV file, see `motorpy.drivers.bulk`.
+
+        Args:
+            rows (Union[str, Iterable[Dict[str, str]]]): a CSV file path, or the rows.
+            results_path (str, optional): the CSV file the result of each row is written to. Defaults to None.
+            concurrency (int, optional): the maximum number of create requests at once. Defaults to 10.
+            workers (int, optional): the number of validation workers. Defaults to 4.
+            processes (bool, optional): whether to validate in processes instead of threads. Defaults to False.
+            chunk_size (int, optional): the number of rows validated at once. Defaults to 500.
+            existing (Iterable[Any], optional): known drivers, to skip duplicates. Defaults to ().
+            send_invite (bool, optional): whether to send an invite email, for rows without a password. Defaults to False.
+            send_webhook (bool, optional): whether to send a webhook. Defaults to True.
+            idempotency_prefix (str, optional): creates each driver with a key derived from the prefix and their email,
+                to resume an import. Defaults to None.
+
+        Returns:
+            ImportSummary: the counts.
+        """
+        return await import_drivers(
+            self,
+            rows,
+            results_path=results_path,
+            concurrency=concurrency,
+            workers=workers,
+            processes=processes,
+            chunk_size=chunk_size,
+            existing=existing,
+            send_invite=send_invite,
+            send_webhook=send_webhook,
+            idempotency_prefix=idempotency_prefix
+        )
+
+
+async def _collect(items: Generator) -> list:
+    return [i async for i in items]
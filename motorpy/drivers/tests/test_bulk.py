@@ -0,0 +1,94 @@
+import asyncio
+import csv
+from datetime import date
+
+from ...api.exceptions import APIError
+from ...base import Motor
+from ...models import Driver
+from ...tests.fakes import FakeAPI
+from ..bulk import DriverIndex, parse_row
+
+
+HEADER = ["firstName", "last_name", "email", "externalId", "dob", "password"]
+ROWS = [
+    ["Ann", "One", "ann@example.com", "e-1", "1990-01-01", "pw"],
+    ["Bob", "Two", "bob@example.com", "", "", "pw"],
+    # duplicate email of an earlier row
+    ["Ann", "Again", "ANN@example.com", "", "", "pw"],
+    # duplicate of an existing driver
+    ["Cat", "Three", "cat@example.com", "", "", "pw"],
+    # invalid date of birth
+    ["Dan", "Four", "dan@example.com", "", "not-a-date", "pw"],
+    # missing last name
+    ["Eve", "", "eve@example.com", "", "", "pw"],
+    # rejected by the API
+    ["Fay", "Five", "fail@example.com", "", "", "pw"],
+]
+
+
+class DriversAPI(FakeAPI):
+
+    def __init__(self):
+        super().__init__(delay=0.01)
+        self.created = []
+
+    def respond(self, call):
+        assert (call.method, call.endpoint) == ("POST", "drivers")
+        if call.data["email"] == "fail@example.com":
+            raise APIError("API responded with 409", status_code=409)
+        self.created.append(call.data)
+        return {**call.data, "id": f"d-{len(self.created)}"}
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+class TestImportDrivers:
+
+    def test_parse_row(self):
+        driver, password, error = parse_row({"firstName": "Ann", "last_name": " One ", "email": "a@b.com", "password": "pw", "dob": ""})
+        assert error is None
+        assert (driver.first_name, driver.last_name, driver.date_of_birth, password) == ("Ann", "One", None, "pw")
+        assert parse_row({"firstName": "Ann", "email": "a@b.com"})[2] == "Missing required fields: last_name"
+
+    def test_import(self, tmp_path):
+        source, results = tmp_path / "drivers.csv", tmp_path / "results.csv"
+        write_csv(source, ROWS)
+        motor = Motor("org", region="eu-1")
+        motor.api = DriversAPI()
+
+        summary = asyncio.run(motor.import_drivers(
+            str(source),
+            results_path=str(results),
+            chunk_size=3,
+            existing=[Driver(email="Cat@example.com")]
+        ))
+        assert (summary.rows, summary.created, summary.duplicate, summary.invalid, summary.error) == (7, 2, 2, 2, 1)
+        assert [d["email"] for d in motor.api.created] == ["ann@example.com", "bob@example.com"]
+        assert motor.api.created[0] == {"firstName": "Ann", "lastName": "One", "email": "ann@example.com",
+                                        "externalId": "e-1", "dob": date(1990, 1, 1), "password": "pw"}
+
+        with open(results, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [r["status"] for r in rows] == ["created", "created", "duplicate", "duplicate", "invalid", "invalid", "error"]
+        assert rows[0]["id"] == "d-1"
+        assert rows[2]["error"] == "Duplicate email: ANN@example.com"
+        assert "API responded with 409" in rows[6]["error"]
+
+    def test_concurrency(self):
+        rows = [{"firstName": "A", "lastName": "B", "email": f"{n}@example.com", "password": "pw"} for n in range(40)]
+        motor = Motor("org", region="eu-1")
+        motor.api = DriversAPI()
+        summary = asyncio.run(motor.import_drivers(rows, concurrency=5, processes=True, workers=2, chunk_size=20))
+        assert summary.created == 40
+        assert motor.api.max_running == 5
+
+    def test_index(self):
+        index = DriverIndex([Driver(email="A@example.com", external_id="x")])
+        assert index.duplicate("a@example.com", None) == "Duplicate email: a@example.com"
+        assert index.duplicate(None, "x") == "Duplicate externalId: x"
+        assert index.duplicate("b@example.com", "y") is None
@@ -0,0 +1,29 @@
+from .columnar import (
+    Column,
+    ColumnarSchema,
+    ColumnarWriter,
+    ParquetWriter,
+    ArrowIPCWriter,
+    NPZWriter,
+    read_npz,
+    get_writer,
+    export_pages,
+    export_listing,
+)
+from .snapshot import (
+    SnapshotWriter,
+    model_to_raw,
+    read_header,
+    iter_raw,
+    load_snapshot,
+    dump_snapshot,
+    dump_listing,
+)
+from .diff import (
+    ChangeKind,
+    RecordChange,
+    DiffSummary,
+    record_hash,
+    diff_records,
+    diff_snapshots,
+)
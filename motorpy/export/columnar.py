@@ -0,0 +1,443 @@
+"""
+Columnar exports.
+
+Listings are written page by page from the raw API responses (see `APIHandler.batch_fetch_pages`),
+so no models are created and memory is bounded by the page size.
+
+The schema is derived from a pydantic model:
+
+- scalar fields become columns named after the field
+- nested models are flattened, eg. `risk.dynamic.weighting`
+- lists, dicts and other values are stored as JSON strings
+
+Writers:
+
+- `ParquetWriter` and `ArrowIPCWriter` require `pyarrow`
+- `NPZWriter` requires `numpy`, each page is stored as `<column>/<page>` and the missing values of int and bool
+  columns as `<column>/<page>.mask` (use `read_npz` to load the columns)
+"""
+import json
+import zipfile
+from datetime import date, datetime, timezone
+from enum import Enum
+from io import BytesIO
+from typing import AbstractSet, Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic.datetime_parse import parse_date, parse_datetime
+from pydantic.fields import SHAPE_SINGLETON
+
+
+# column kinds
+STRING = "string"
+INT = "int"
+FLOAT = "float"
+BOOL = "bool"
+DATETIME = "datetime"
+DATE = "date"
+JSON = "json"
+
+# fields that are never exported
+DEFAULT_EXCLUDE = frozenset({"api", "api_path"})
+
+
+def _json(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, default=str)
+
+
+def _str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return str(value.value)
+    return str(value)
+
+
+def _int(value: Any) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def _float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _bool(value: Any) -> Optional[bool]:
+    return None if value is None else bool(value)
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    return None if value is None else parse_datetime(value)
+
+
+def _date(value: Any) -> Optional[date]:
+    return None if value is None else parse_date(value)
+
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    STRING: _str,
+    INT: _int,
+    FLOAT: _float,
+    BOOL: _bool,
+    DATETIME: _datetime,
+    DATE: _date,
+    JSON: _json,
+}
+
+
+def _kind(type_: Any) -> Optional[str]:
+    "The column kind of a scalar type, None for nested models."
+    if not isinstance(type_, type):
+        return JSON
+    if issubclass(type_, BaseModel):
+        return None
+    # bool is a subclass of int, datetime of date
+    for cls, kind in ((bool, BOOL), (Enum, STRING), (str, STRING), (int, INT), (float, FLOAT),
+                      (datetime, DATETIME), (date, DATE)):
+        if issubclass(type_, cls):
+            return kind
+    return JSON
+
+
+class Column:
+    "A column of a columnar schema."
+    __slots__ = ("name", "path", "kind", "convert")
+
+    def __init__(self, name: str, path: Tuple[str, ...], kind: str) -> None:
+        """
+        Args:
+            name (str): the column name.
+            path (Tuple[str, ...]): the keys (API aliases) of the value in the raw record.
+            kind (str): the column kind, eg. `STRING` or `DATETIME`.
+        """
+        if kind not in _CONVERTERS:
+            raise ValueError(f"Invalid column kind: {kind} - can be one of {set(_CONVERTERS)}")
+        self.name = name
+        self.path = path
+        self.kind = kind
+        self.convert = _CONVERTERS[kind]
+
+    def extract(self, record: dict) -> Any:
+        """Get the converted value of this column from a raw record.
+
+        Args:
+            record (dict): the raw API record.
+
+        Returns:
+            Any: the value, None if it is missing.
+        """
+        value = record
+        for key in self.path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+            if value is None:
+                return None
+        return self.convert(value)
+
+    def __repr__(self) -> str:
+        return f"Column({self.name}, {self.kind})"
+
+
+class ColumnarSchema:
+    "A fixed columnar schema for raw API records."
+
+    def __init__(self, columns: List[Column]) -> None:
+        self.columns = columns
+
+    @classmethod
+    def from_model(cls,
+                   model_cls: Type[BaseModel],
+                   exclude: AbstractSet[str] = DEFAULT_EXCLUDE,
+                   max_depth: int = 3) -> 'ColumnarSchema':
+        """Derive a schema from a pydantic model.
+
+        Args:
+            model_cls (Type[BaseModel]): the model class.
+            exclude (AbstractSet[str], optional): field names to leave out (at any level). Defaults to `DEFAULT_EXCLUDE`.
+            max_depth (int, optional): how deep nested models are flattened, deeper models are stored as JSON. Defaults to 3.
+
+        Returns:
+            ColumnarSchema: the schema.
+        """
+        columns: List[Column] = []
+
+        def add(model: Type[BaseModel], prefix: str, path: Tuple[str, ...], depth: int) -> None:
+            for name, field in model.__fields__.items():
+                if name in exclude:
+                    continue
+                col_name = f"{prefix}{name}"
+                col_path = path + (field.alias or name,)
+                kind = _kind(field.type_) if field.shape == SHAPE_SINGLETON else JSON
+                if kind is None:
+                    if depth < max_depth:
+                        add(field.type_, f"{col_name}.", col_path, depth + 1)
+                        continue
+                    kind = JSON
+                columns.append(Column(col_name, col_path, kind))
+
+        add(model_cls, "", (), 0)
+        return cls(columns)
+
+    @property
+    def names(self) -> List[str]:
+        "The column names."
+        return [c.name for c in self.columns]
+
+    def to_columns(self, records: List[dict]) -> Dict[str, list]:
+        """Convert raw records to columns.
+
+        Args:
+            records (List[dict]): the raw API records.
+
+        Returns:
+            Dict[str, list]: the values of each column.
+        """
+        return {c.name: [c.extract(r) for r in records] for c in self.columns}
+
+    def to_arrow(self) -> Any:
+        """The equivalent `pyarrow.Schema`.
+
+        Returns:
+            pyarrow.Schema: the schema.
+        """
+        import pyarrow as pa
+
+        types = {
+            STRING: pa.string(),
+            INT: pa.int64(),
+            FLOAT: pa.float64(),
+            BOOL: pa.bool_(),
+            DATETIME: pa.timestamp("us", tz="UTC"),
+            DATE: pa.date32(),
+            JSON: pa.string(),
+        }
+        return pa.schema([pa.field(c.name, types[c.kind]) for c in self.columns])
+
+
+class ColumnarWriter:
+    "Base class for incremental columnar writers. Writers can be used as context managers."
+
+    def __init__(self, path: str, schema: ColumnarSchema) -> None:
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+
+    def write(self, columns: Dict[str, list]) -> None:
+        """Write a batch of columns.
+
+        Args:
+            columns (Dict[str, list]): the values of each column, see `ColumnarSchema.to_columns`.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        "Finish the file."
+        raise NotImplementedError
+
+    def __enter__(self) -> 'ColumnarWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class _ArrowWriter(ColumnarWriter):
+
+    def __init__(self, path: str, schema: ColumnarSchema) -> None:
+        super().__init__(path, schema)
+        self._arrow_schema = schema.to_arrow()
+        self._writer = self._open()
+
+    def _open(self) -> Any:
+        raise NotImplementedError
+
+    def write(self, columns: Dict[str, list]) -> None:
+        import pyarrow as pa
+
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(columns[f.name], type=f.type) for f in self._arrow_schema],
+            schema=self._arrow_schema
+        )
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class ParquetWriter(_ArrowWriter):
+    "Write a Parquet file, each batch becomes a row group."
+
+    def _open(self) -> Any:
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.path, self._arrow_schema)
+
+
+class ArrowIPCWriter(_ArrowWriter):
+    "Write an Arrow IPC (feather v2) file."
+
+    def _open(self) -> Any:
+        import pyarrow as pa
+        return pa.ipc.new_file(self.path, self._arrow_schema)
+
+
+class NPZWriter(ColumnarWriter):
+    """
+    Write a NumPy `.npz` archive.
+
+    Int columns are stored as int64 and bool columns as bool, each with a mask of the missing values (zero or False
+    in the values). Float columns are stored as float64 (NaN for missing values), datetimes as `datetime64[us]` in UTC,
+    dates as `datetime64[D]` and strings as unicode arrays (empty for missing values).
+    """
+
+    # the kinds stored with a mask, and the value of their missing values
+    MASKED = {INT: ("int64", 0), BOOL: ("bool", False)}
+
+    def __init__(self, path: str, schema: ColumnarSchema) -> None:
+        super().__init__(path, schema)
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._batches = 0
+
+    def _array(self, kind: str, values: list) -> Any:
+        import numpy as np
+
+        if kind in self.MASKED:
+            dtype, missing = self.MASKED[kind]
+            return np.array([missing if v is None else v for v in values], dtype=dtype)
+        if kind == FLOAT:
+            return np.array([np.nan if v is None else v for v in values], dtype="float64")
+        if kind == DATETIME:
+            return np.array([
+                None if v is None else (v.astimezone(timezone.utc).replace(tzinfo=None) if v.tzinfo else v)
+                for v in values
+            ], dtype="datetime64[us]")
+        if kind == DATE:
+            return np.array(values, dtype="datetime64[D]")
+        return np.array(["" if v is None else v for v in values], dtype="str")
+
+    def write(self, columns: Dict[str, list]) -> None:
+        import numpy as np
+
+        for c in self.schema.columns:
+            values = columns[c.name]
+            self._save(f"{c.name}/{self._batches:06d}", self._array(c.kind, values))
+            if c.kind in self.MASKED:
+                self._save(f"{c.name}/{self._batches:06d}.mask", np.array([v is None for v in values], dtype="bool"))
+        self._batches += 1
+        self.rows += len(columns[self.schema.columns[0].name]) if self.schema.columns else 0
+
+    def _save(self, key: str, array: Any) -> None:
+        import numpy as np
+
+        buf = BytesIO()
+        np.save(buf, array, allow_pickle=False)
+        self._zip.writestr(f"{key}.npy", buf.getvalue())
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+def read_npz(path: str) -> Dict[str, Any]:
+    """Read an archive written by `NPZWriter`, concatenating the pages of each column.
+
+    Int and bool columns are returned as masked arrays, masked where the value is missing.
+
+    Args:
+        path (str): the file path.
+
+    Returns:
+        Dict[str, numpy.ndarray]: the arrays by column name.
+    """
+    import numpy as np
+
+    pages: Dict[str, list] = {}
+    masks: Dict[str, list] = {}
+    with np.load(path, allow_pickle=False) as data:
+        for key in sorted(data.files):
+            name, page = key.rsplit("/", 1)
+            (masks if page.endswith(".mask") else pages).setdefault(name, []).append(data[key])
+    return {
+        name: np.ma.masked_array(np.concatenate(arrays), mask=np.concatenate(masks[name]))
+        if name in masks else np.concatenate(arrays)
+        for name, arrays in pages.items()
+    }
+
+
+FORMATS: Dict[str, Type[ColumnarWriter]] = {
+    "parquet": ParquetWriter,
+    "arrow": ArrowIPCWriter,
+    "npz": NPZWriter,
+}
+
+
+def get_writer(path: str, schema: ColumnarSchema, format: str = "parquet") -> ColumnarWriter:
+    """Open a writer for a format.
+
+    Args:
+        path (str): the file path.
+        schema (ColumnarSchema): the schema.
+        format (str, optional): one of "parquet", "arrow" or "npz". Defaults to "parquet".
+
+    Returns:
+        ColumnarWriter: the writer.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Invalid format: {format} - can be one of {set(FORMATS)}")
+    return FORMATS[format](path, schema)
+
+
+async def export_pages(pages: AsyncIterator[List[dict]],
+                       writer: ColumnarWriter,
+                       max_records: Optional[int] = None) -> int:
+    """Write pages of raw records as they are fetched.
+
+    Args:
+        pages (AsyncIterator[List[dict]]): the pages, eg. `api.batch_fetch_pages(...)`.
+        writer (ColumnarWriter): the writer, it is closed when done.
+        max_records (int, optional): the maximum number of records to write. Defaults to None.
+
+    Returns:
+        int: the number of records written.
+    """
+    with writer:
+        async for page in pages:
+            if max_records is not None:
+                page = page[:max_records - writer.rows]
+            if page:
+                writer.write(writer.schema.to_columns(page))
+            if max_records is not None and writer.rows >= max_records:
+                break
+    return writer.rows
+
+
+async def export_listing(api: Any,
+                         endpoint: str,
+                         model_cls: Type[BaseModel],
+                         path: str,
+                         format: str = "parquet",
+                         params: Optional[dict] = None,
+                         page_size: int = 500,
+                         max_records: Optional[int] = None) -> int:
+    """Export an API listing to a columnar file.
+
+    Args:
+        api (APIHandler): the API handler.
+        endpoint (str): the listing endpoint, eg. "drivers".
+        model_cls (Type[BaseModel]): the model the schema is derived from.
+        path (str): the file path.
+        format (str, optional): one of "parquet", "arrow" or "npz". Defaults to "parquet".
+        params (dict, optional): query parameters. Defaults to None.
+        page_size (int, optional): records per request and per batch written. Defaults to 500.
+        max_records (int, optional): the maximum number of records to write. Defaults to None.
+
+    Returns:
+        int: the number of records written.
+    """
+    writer = get_writer(path, ColumnarSchema.from_model(model_cls), format=format)
+    return await export_pages(
+        api.batch_fetch_pages(endpoint, params=params, limit=page_size),
+        writer,
+        max_records=max_records
+    )
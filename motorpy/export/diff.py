@@ -0,0 +1,236 @@
+"""
+Snapshot diffs.
+
+Compares two collections of records (eg. two nightly snapshots, see `motorpy.export.snapshot`)
+and reports added, removed and changed records, with the changed fields.
+
+Records are compared by a stable content hash (`record_hash`), so unchanged records are never compared field by field.
+For policies, each nested section (rates, premium, duration, etc.) is hashed separately and changed sections are reported.
+
+Both sides are streamed into hash partitions on disk (by record ID) and compared one partition at a time,
+so the run time is near linear and memory is bounded by the largest partition.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from enum import Enum
+from typing import Any, Dict, Generator, Iterable, List, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+from .snapshot import iter_raw, model_to_raw, read_header
+
+
+class ChangeKind(str, Enum):
+    added = "added"
+    removed = "removed"
+    changed = "changed"
+
+
+class RecordChange(BaseModel):
+    "A difference between two snapshots."
+    id: str
+    kind: ChangeKind
+    fields: List[str] = Field(
+        default_factory=list,
+        description="The changed fields (dotted for nested values, eg. duration.end), for changed records."
+    )
+    sections: List[str] = Field(
+        default_factory=list,
+        description="The changed sections, when sections are hashed (eg. policies)."
+    )
+    old: Optional[dict] = None
+    new: Optional[dict] = None
+
+
+class DiffSummary(BaseModel):
+    "Counts of the differences between two snapshots."
+    added: int = 0
+    removed: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def record_hash(record: dict) -> str:
+    """A stable content hash of a raw record, independent of key order.
+
+    Args:
+        record (dict): the raw record.
+
+    Returns:
+        str: the hex digest.
+    """
+    return hashlib.blake2b(_canonical(record), digest_size=16).hexdigest()
+
+
+def section_hashes(record: dict, sections: Iterable[str]) -> Dict[str, str]:
+    """The content hash of each section (nested value) of a raw record.
+
+    Args:
+        record (dict): the raw record.
+        sections (Iterable[str]): the section keys.
+
+    Returns:
+        Dict[str, str]: the hash by section, missing sections are left out.
+    """
+    return {s: record_hash(record[s]) for s in sections if s in record}
+
+
+def policy_sections() -> Set[str]:
+    "The API keys of the nested policy sections."
+    from motorpy.models.policy.nested import Policy, POLICY_SECTIONS
+    return {Policy.__fields__[name].alias for name in POLICY_SECTIONS}
+
+
+def changed_fields(old: Any, new: Any, prefix: str = "") -> List[str]:
+    """The paths of the values that differ between two raw records, nested dicts are compared key by key.
+
+    Args:
+        old (Any): the old value.
+        new (Any): the new value.
+        prefix (str, optional): the path of the values. Defaults to "".
+
+    Returns:
+        List[str]: the dotted paths, sorted.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths = []
+        for key in sorted(set(old) | set(new), key=str):
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key not in old or key not in new:
+                paths.append(path)
+            elif old[key] != new[key]:
+                paths.extend(changed_fields(old[key], new[key], path))
+        return paths
+    return [prefix] if old != new else []
+
+
+def _raw(record: Union[BaseModel, dict]) -> dict:
+    return model_to_raw(record) if isinstance(record, BaseModel) else record
+
+
+class _Partitions:
+    "Raw records spread over files by the hash of their ID."
+
+    def __init__(self, directory: str, name: str, count: int) -> None:
+        self.paths = [os.path.join(directory, f"{name}-{i}.ndjson") for i in range(count)]
+        self._files = [open(p, "w", encoding="utf-8") for p in self.paths]
+
+    def write(self, records: Iterable[Union[BaseModel, dict]], key: str) -> None:
+        count = len(self._files)
+        for record in records:
+            record = _raw(record)
+            record_id = str(record.get(key))
+            line = json.dumps([record_id, record_hash(record), record], separators=(",", ":"), default=str)
+            self._files[zlib.crc32(record_id.encode("utf-8")) % count].write(line + "\n")
+        for f in self._files:
+            f.close()
+
+    def read(self, index: int) -> Generator[Tuple[str, str, dict], None, None]:
+        with open(self.paths[index], encoding="utf-8") as f:
+            for line in f:
+                yield tuple(json.loads(line))
+
+
+def diff_records(old: Iterable[Union[BaseModel, dict]],
+                 new: Iterable[Union[BaseModel, dict]],
+                 key: str = "id",
+                 sections: Optional[Iterable[str]] = None,
+                 partitions: int = 16,
+                 include_records: bool = False,
+                 summary: Optional[DiffSummary] = None) -> Generator[RecordChange, None, None]:
+    """Stream the differences between two collections of records.
+
+    Args:
+        old (Iterable[Union[BaseModel, dict]]): the old models or raw records.
+        new (Iterable[Union[BaseModel, dict]]): the new models or raw records.
+        key (str, optional): the key of the record ID. Defaults to "id".
+        sections (Optional[Iterable[str]], optional): nested sections to hash separately, eg. `policy_sections()`. Defaults to None.
+        partitions (int, optional): the number of hash partitions. Defaults to 16.
+        include_records (bool, optional): whether to include the old and new raw records in the changes. Defaults to False.
+        summary (Optional[DiffSummary], optional): a summary to update with the counts. Defaults to None.
+
+    Yields:
+        RecordChange: the changes, ordered by partition.
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+    sections = set(sections or ())
+    summary = summary if summary is not None else DiffSummary()
+
+    with tempfile.TemporaryDirectory(prefix="motorpy-diff-") as directory:
+        old_parts = _Partitions(directory, "old", partitions)
+        old_parts.write(old, key)
+        new_parts = _Partitions(directory, "new", partitions)
+        new_parts.write(new, key)
+
+        for i in range(partitions):
+            previous: Dict[str, Tuple[str, dict]] = {
+                record_id: (digest, record) for record_id, digest, record in old_parts.read(i)
+            }
+            for record_id, digest, record in new_parts.read(i):
+                before = previous.pop(record_id, None)
+                if before is None:
+                    summary.added += 1
+                    yield RecordChange(id=record_id, kind=ChangeKind.added, new=record if include_records else None)
+                elif before[0] == digest:
+                    summary.unchanged += 1
+                else:
+                    summary.changed += 1
+                    old_sections = section_hashes(before[1], sections)
+                    new_sections = section_hashes(record, sections)
+                    yield RecordChange(
+                        id=record_id,
+                        kind=ChangeKind.changed,
+                        fields=changed_fields(before[1], record),
+                        sections=sorted(
+                            s for s in set(old_sections) | set(new_sections)
+                            if old_sections.get(s) != new_sections.get(s)
+                        ),
+                        old=before[1] if include_records else None,
+                        new=record if include_records else None
+                    )
+            for record_id, (_, record) in previous.items():
+                summary.removed += 1
+                yield RecordChange(id=record_id, kind=ChangeKind.removed, old=record if include_records else None)
+
+
+def diff_snapshots(old_path: str,
+                   new_path: str,
+                   key: str = "id",
+                   partitions: int = 16,
+                   include_records: bool = False,
+                   summary: Optional[DiffSummary] = None) -> Generator[RecordChange, None, None]:
+    """Stream the differences between two snapshot files.
+    Policy snapshots are diffed per nested section as well.
+
+    Args:
+        old_path (str): the old snapshot.
+        new_path (str): the new snapshot.
+        key (str, optional): the key of the record ID. Defaults to "id".
+        partitions (int, optional): the number of hash partitions. Defaults to 16.
+        include_records (bool, optional): whether to include the old and new raw records in the changes. Defaults to False.
+        summary (Optional[DiffSummary], optional): a summary to update with the counts. Defaults to None.
+
+    Yields:
+        RecordChange: the changes.
+    """
+    old_model = read_header(old_path)["model"]
+    new_model = read_header(new_path)["model"]
+    if old_model != new_model:
+        raise ValueError(f"Cannot diff a {old_model} snapshot with a {new_model} snapshot")
+    yield from diff_records(
+        iter_raw(old_path),
+        iter_raw(new_path),
+        key=key,
+        sections=policy_sections() if old_model == "Policy" else None,
+        partitions=partitions,
+        include_records=include_records,
+        summary=summary
+    )
@@ -0,0 +1,294 @@
+"""
+Model snapshots.
+
+A snapshot is a stream of records in API format, preceded by a header:
+
+```
+{"format": "motorpy-snapshot", "version": 1, "encoding": "ndjson", "model": "Driver", "createdAt": "..."}
+{"id": "...", "firstName": "...", ...}
+...
+```
+
+Two encodings are supported:
+
+- "ndjson": one JSON object per line
+- "msgpack": a stream of msgpack maps, requires `msgpack`
+
+Files ending in `.gz` are gzip compressed.
+
+Loading is streaming and uses the trusted construction path (`motorpy.models.trusted`),
+as the records were already validated when they were fetched.
+
+```python
+await dump_listing(motor.api, "drivers", Driver, "drivers.ndjson.gz")
+dump_snapshot("org.ndjson", [await motor.org_settings()], OrgSettings)
+
+# warm start
+drivers = list(load_snapshot("drivers.ndjson.gz", api=motor.api))
+motor.api.org_data = next(load_snapshot("org.ndjson"))
+```
+"""
+import gzip
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Dict, Generator, Iterable, Optional, Type, Union
+
+from pydantic import BaseModel
+
+from motorpy.api.org import OrgSettings
+from motorpy.models.trusted import construct_trusted
+
+
+FORMAT = "motorpy-snapshot"
+VERSION = 1
+
+ENCODINGS = {"ndjson", "msgpack"}
+
+# fields that are never written
+_HIDDEN = frozenset({"api", "api_path"})
+
+
+def _raw(value: Any) -> Any:
+    "Convert a value to its API (JSON compatible) format."
+    if isinstance(value, BaseModel):
+        return model_to_raw(value)
+    if isinstance(value, dict):
+        return {k: _raw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_raw(v) for v in value]
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def model_to_raw(model: BaseModel) -> dict:
+    """Convert a model to its API format, keyed by alias.
+    Only set fields are included, so loading the record gives the same `__fields_set__`.
+
+    Args:
+        model (BaseModel): the model.
+
+    Returns:
+        dict: the record.
+    """
+    pending = getattr(model, "_lazy_sections", None) or {}
+    values = model.__dict__
+    result = {}
+    for name, field in model.__fields__.items():
+        if name in _HIDDEN or name not in model.__fields_set__:
+            continue
+        if name in values:
+            result[field.alias or name] = _raw(values[name])
+        elif name in pending:
+            # a lazy policy section that was never read, it is still in API format
+            result[field.alias or name] = _raw(pending[name])
+    return result
+
+
+def _model_class(name: str) -> Type[BaseModel]:
+    import motorpy.models as models
+
+    if name == OrgSettings.__name__:
+        return OrgSettings
+    model_cls = getattr(models, name, None)
+    if not (isinstance(model_cls, type) and issubclass(model_cls, BaseModel)):
+        raise ValueError(f"Unknown snapshot model: {name}")
+    return model_cls
+
+
+def _open(path: str, mode: str) -> Any:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class SnapshotWriter:
+    "Write a snapshot incrementally. Writers can be used as context managers."
+
+    def __init__(self,
+                 path: str,
+                 model_cls: Type[BaseModel],
+                 encoding: str = "ndjson") -> None:
+        """
+        Args:
+            path (str): the file path, gzip compressed if it ends in `.gz`.
+            model_cls (Type[BaseModel]): the model class of the records.
+            encoding (str, optional): "ndjson" or "msgpack". Defaults to "ndjson".
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Invalid encoding: {encoding} - can be one of {ENCODINGS}")
+        self.path = path
+        self.model_cls = model_cls
+        self.encoding = encoding
+        self.count = 0
+
+        if encoding == "msgpack":
+            import msgpack
+            self._pack = msgpack.Packer().pack
+        else:
+            self._pack = self._pack_json
+
+        self._file = _open(path, "wb")
+        self._file.write(self._pack({
+            "format": FORMAT,
+            "version": VERSION,
+            "encoding": encoding,
+            "model": model_cls.__name__,
+            "createdAt": datetime.utcnow().isoformat(),
+        }))
+
+    @staticmethod
+    def _pack_json(record: dict) -> bytes:
+        return json.dumps(record, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+    def write(self, record: Union[BaseModel, dict]) -> None:
+        """Write a record.
+
+        Args:
+            record (Union[BaseModel, dict]): a model, or a raw API record.
+        """
+        if isinstance(record, BaseModel):
+            record = model_to_raw(record)
+        self._file.write(self._pack(record))
+        self.count += 1
+
+    def write_many(self, records: Iterable[Union[BaseModel, dict]]) -> None:
+        """Write multiple records.
+
+        Args:
+            records (Iterable[Union[BaseModel, dict]]): models or raw API records.
+        """
+        for record in records:
+            self.write(record)
+
+    def close(self) -> None:
+        "Finish the file."
+        self._file.close()
+
+    def __enter__(self) -> 'SnapshotWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _iter_raw(path: str) -> Generator[dict, None, None]:
+    with _open(path, "rb") as f:
+        first = f.read(1)
+        f.seek(0)
+        if first == b"{":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            import msgpack
+            yield from msgpack.Unpacker(f, raw=False)
+
+
+def _check_header(header: Any, path: str) -> dict:
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise ValueError(f"Not a motorpy snapshot: {path}")
+    if header.get("version", 0) > VERSION:
+        raise ValueError(f"Unsupported snapshot version {header['version']} (max {VERSION}): {path}")
+    return header
+
+
+def read_header(path: str) -> dict:
+    """Read the header of a snapshot.
+
+    Args:
+        path (str): the file path.
+
+    Returns:
+        dict: the header.
+    """
+    records = _iter_raw(path)
+    try:
+        return _check_header(next(records, None), path)
+    finally:
+        records.close()
+
+
+def iter_raw(path: str) -> Generator[dict, None, None]:
+    """Stream the raw API records of a snapshot.
+
+    Args:
+        path (str): the file path.
+
+    Yields:
+        dict: the records.
+    """
+    records = _iter_raw(path)
+    _check_header(next(records, None), path)
+    yield from records
+
+
+def load_snapshot(path: str,
+                  api: Any = None,
+                  model_cls: Optional[Type[BaseModel]] = None) -> Generator[BaseModel, None, None]:
+    """Stream the models of a snapshot, without validation.
+
+    Args:
+        path (str): the file path.
+        api (APIHandler, optional): the API handler to attach to API models. Defaults to None.
+        model_cls (Type[BaseModel], optional): the model class, defaults to the model named in the header.
+
+    Yields:
+        BaseModel: the models.
+    """
+    records = _iter_raw(path)
+    header = _check_header(next(records, None), path)
+    model_cls = model_cls or _model_class(header["model"])
+    values: Dict[str, Any] = {"api": api} if api is not None and "api" in model_cls.__fields__ else {}
+    for record in records:
+        yield construct_trusted(model_cls, record, **values)
+
+
+def dump_snapshot(path: str,
+                  records: Iterable[Union[BaseModel, dict]],
+                  model_cls: Type[BaseModel],
+                  encoding: str = "ndjson") -> int:
+    """Write a snapshot of models or raw API records.
+
+    Args:
+        path (str): the file path, gzip compressed if it ends in `.gz`.
+        records (Iterable[Union[BaseModel, dict]]): the models or raw API records.
+        model_cls (Type[BaseModel]): the model class of the records.
+        encoding (str, optional): "ndjson" or "msgpack". Defaults to "ndjson".
+
+    Returns:
+        int: the number of records written.
+    """
+    with SnapshotWriter(path, model_cls, encoding=encoding) as writer:
+        writer.write_many(records)
+    return writer.count
+
+
+async def dump_listing(api: Any,
+                       endpoint: str,
+                       model_cls: Type[BaseModel],
+                       path: str,
+                       encoding: str = "ndjson",
+                       params: Optional[dict] = None,
+                       page_size: int = 500) -> int:
+    """Write a snapshot of an API listing, page by page and without creating models.
+
+    Args:
+        api (APIHandler): the API handler.
+        endpoint (str): the listing endpoint, eg. "drivers".
+        model_cls (Type[BaseModel]): the model class of the records.
+        path (str): the file path, gzip compressed if it ends in `.gz`.
+        encoding (str, optional): "ndjson" or "msgpack". Defaults to "ndjson".
+        params (dict, optional): query parameters. Defaults to None.
+        page_size (int, optional): records per request. Defaults to 500.
+
+    Returns:
+        int: the number of records written.
+    """
+    with SnapshotWriter(path, model_cls, encoding=encoding) as writer:
+        async for page in api.batch_fetch_pages(endpoint, params=params, limit=page_size):
+            writer.write_many(page)
+    return writer.count
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from datetime import datetime, date, timezone
+
+from motorpy.models import Driver, Policy
+from motorpy.models.policy.tests.const import FULL
+from ..columnar import ColumnarSchema, ColumnarWriter, export_pages, get_writer, DATETIME, DATE, JSON, FLOAT
+
+DRIVERS = [
+    {"id": "d-1", "firstName": "Joe", "dob": "1990-02-01", "createdAt": "2022-01-01T10:00:00Z",
+     "risk": {"dynamic": {"apply": True, "process": "std", "weighting": 0.5}}},
+    {"id": "d-2", "firstName": "Ann", "vehicles_raw": [{"id": "v-1"}]},
+]
+
+
+class MemoryWriter(ColumnarWriter):
+
+    def __init__(self, schema: ColumnarSchema) -> None:
+        super().__init__(None, schema)
+        self.batches = []
+        self.closed = False
+
+    def write(self, columns):
+        self.batches.append(columns)
+        self.rows += len(next(iter(columns.values())))
+
+    def close(self):
+        self.closed = True
+
+
+async def pages(*pages):
+    for p in pages:
+        yield p
+
+
+class TestSchema:
+
+    def test_from_model(self):
+        schema = ColumnarSchema.from_model(Driver)
+        kinds = {c.name: c.kind for c in schema.columns}
+        assert "api" not in kinds
+        assert kinds["date_of_birth"] == DATE
+        assert kinds["created_at"] == DATETIME
+        assert kinds["risk.dynamic.weighting"] == FLOAT
+        assert kinds["vehicles_raw"] == JSON
+
+    def test_to_columns(self):
+        columns = ColumnarSchema.from_model(Driver).to_columns(DRIVERS)
+        assert columns["first_name"] == ["Joe", "Ann"]
+        assert columns["date_of_birth"] == [date(1990, 2, 1), None]
+        assert columns["created_at"] == [datetime(2022, 1, 1, 10, tzinfo=timezone.utc), None]
+        assert columns["risk.dynamic.weighting"] == [0.5, None]
+        assert columns["vehicles_raw"] == [None, '[{"id": "v-1"}]']
+
+    def test_nested_policy(self):
+        columns = ColumnarSchema.from_model(Policy).to_columns([FULL])
+        assert columns["config.currency"] == ["EUR"]
+        assert columns["sum_insured"] == [100.0]
+
+
+class TestExport:
+
+    def test_export_pages(self):
+        writer = MemoryWriter(ColumnarSchema.from_model(Driver))
+        assert asyncio.run(export_pages(pages(DRIVERS, DRIVERS), writer, max_records=3)) == 3
+        assert [len(b["id"]) for b in writer.batches] == [2, 1]
+        assert writer.closed
+
+    def test_invalid_format(self):
+        with pytest.raises(ValueError):
+            get_writer("out.csv", ColumnarSchema.from_model(Driver), format="csv")
+
+    @pytest.mark.parametrize("format", ["parquet", "arrow"])
+    def test_arrow_formats(self, tmp_path, format):
+        pa = pytest.importorskip("pyarrow")
+        path = str(tmp_path / f"drivers.{format}")
+        writer = get_writer(path, ColumnarSchema.from_model(Driver), format=format)
+        asyncio.run(export_pages(pages(DRIVERS, DRIVERS), writer))
+        if format == "parquet":
+            import pyarrow.parquet as pq
+            table = pq.read_table(path)
+        else:
+            table = pa.ipc.open_file(path).read_all()
+        assert table.num_rows == 4
+        assert table.column("first_name").to_pylist() == ["Joe", "Ann"] * 2
+
+    def test_npz(self, tmp_path):
+        np = pytest.importorskip("numpy")
+        from ..columnar import read_npz
+        path = str(tmp_path / "drivers.npz")
+        writer = get_writer(path, ColumnarSchema.from_model(Driver), format="npz")
+        asyncio.run(export_pages(pages(DRIVERS, DRIVERS), writer))
+        arrays = read_npz(path)
+        assert list(arrays["first_name"]) == ["Joe", "Ann"] * 2
+        assert np.isnan(arrays["risk.dynamic.weighting"][1])
+
+    def test_npz_ints(self, tmp_path):
+        pytest.importorskip("numpy")
+        from ..columnar import read_npz
+        path = str(tmp_path / "drivers.npz")
+        big = 2 ** 53 + 1
+        records = [{"id": "d-1", "totalPoints": big, "isActive": True}, {"id": "d-2"}]
+        writer = get_writer(path, ColumnarSchema.from_model(Driver), format="npz")
+        asyncio.run(export_pages(pages(records), writer))
+        arrays = read_npz(path)
+        points = arrays["total_points"]
+        assert points.dtype == "int64"
+        assert points[0] == big
+        assert list(points.mask) == [False, True]
+        assert arrays["is_active"].dtype == "bool"
+        assert list(arrays["is_active"].mask) == [False, True]
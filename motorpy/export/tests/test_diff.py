@@ -0,0 +1,53 @@
+import pytest
+
+from motorpy.models import Driver, Policy
+from motorpy.tests.test_trusted import DRIVER
+from ..diff import ChangeKind, DiffSummary, diff_records, diff_snapshots, record_hash, changed_fields, policy_sections
+from ..snapshot import dump_snapshot
+
+
+class TestDiff:
+
+    def test_record_hash_is_stable(self):
+        assert record_hash({"a": 1, "b": {"c": 2}}) == record_hash({"b": {"c": 2}, "a": 1})
+        assert record_hash({"a": 1}) != record_hash({"a": 2})
+
+    def test_changed_fields(self):
+        old = {"id": "1", "name": "a", "duration": {"start": "x", "end": "y"}}
+        new = {"id": "1", "name": "b", "duration": {"start": "x", "end": "z"}, "extra": 1}
+        assert changed_fields(old, new) == ["duration.end", "extra", "name"]
+
+    def test_diff_records(self):
+        old = [{"id": str(i), "value": i} for i in range(100)]
+        new = [{"id": str(i), "value": i + (i == 5)} for i in range(1, 101)]
+        summary = DiffSummary()
+        changes = {c.id: c for c in diff_records(old, new, partitions=4, summary=summary)}
+
+        assert changes["0"].kind == ChangeKind.removed
+        assert changes["100"].kind == ChangeKind.added
+        assert changes["5"].kind == ChangeKind.changed
+        assert changes["5"].fields == ["value"]
+        assert len(changes) == 3
+        assert summary == DiffSummary(added=1, removed=1, changed=1, unchanged=98)
+
+    def test_policy_sections(self, tmp_path):
+        old_path, new_path = str(tmp_path / "old.ndjson"), str(tmp_path / "new.ndjson")
+        base = {"id": "p-1", "duration": {"start": "2022-01-01T00:00:00", "gracePeriodMins": 0}, "rates": {"value": 1.0}}
+        dump_snapshot(old_path, [Policy(**base)], Policy)
+        dump_snapshot(new_path, [Policy(**{**base, "rates": {"value": 2.0}})], Policy)
+
+        assert "rates" in policy_sections()
+        changes = list(diff_snapshots(old_path, new_path, include_records=True))
+        assert len(changes) == 1
+        assert changes[0].sections == ["rates"]
+        assert changes[0].fields == ["rates.value"]
+        assert changes[0].old["rates"]["value"] == 1.0
+
+    def test_models_and_mismatched_snapshots(self, tmp_path):
+        assert list(diff_records([Driver(**DRIVER)], [Driver(**DRIVER)])) == []
+
+        old_path, new_path = str(tmp_path / "old.ndjson"), str(tmp_path / "new.ndjson")
+        dump_snapshot(old_path, [DRIVER], Driver)
+        dump_snapshot(new_path, [], Policy)
+        with pytest.raises(ValueError):
+            list(diff_snapshots(old_path, new_path))
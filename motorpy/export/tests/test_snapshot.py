@@ -0,0 +1,72 @@
+import asyncio
+import json
+import pytest
+
+from motorpy.models import Driver, Policy
+from motorpy.models.policy.tests.const import FULL
+from motorpy.tests.test_trusted import DRIVER
+from ..snapshot import dump_snapshot, dump_listing, load_snapshot, read_header, iter_raw, model_to_raw, VERSION
+
+
+class PagedAPI:
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def batch_fetch_pages(self, endpoint, params=None, limit=50):
+        for p in self.pages:
+            yield p
+
+
+class TestSnapshot:
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "drivers.ndjson.gz")
+        drivers = [Driver(**DRIVER), Driver(**{**DRIVER, "id": "d-2"})]
+        assert dump_snapshot(path, drivers, Driver) == 2
+
+        header = read_header(path)
+        assert header["version"] == VERSION
+        assert header["model"] == "Driver"
+
+        api = object()
+        loaded = list(load_snapshot(path, api=api))
+        assert [d.id for d in loaded] == ["d-1", "d-2"]
+        assert loaded[0].api is api
+        assert loaded[0].created_at == drivers[0].created_at
+        assert loaded[0].risk == drivers[0].risk
+        assert loaded[0].dict() == drivers[0].dict()
+
+    def test_lazy_policy_sections(self, tmp_path):
+        path = str(tmp_path / "policies.ndjson")
+        data = {k: v for k, v in FULL.items() if k not in ("driver", "cancellation")}
+        eager = Policy(**data)
+        assert set(model_to_raw(Policy.parse_lazy(**data))) == set(model_to_raw(eager))
+
+        dump_snapshot(path, [Policy.parse_lazy(**data)], Policy)
+        loaded = next(load_snapshot(path))
+        assert loaded.__fields_set__ == eager.__fields_set__
+        assert loaded.duration == eager.duration
+        assert loaded.config == eager.config
+
+    def test_dump_listing(self, tmp_path):
+        path = str(tmp_path / "drivers.ndjson")
+        api = PagedAPI([[DRIVER], [{**DRIVER, "id": "d-2"}]])
+        assert asyncio.run(dump_listing(api, "drivers", Driver, path)) == 2
+        assert [r["id"] for r in iter_raw(path)] == ["d-1", "d-2"]
+
+    def test_invalid_files(self, tmp_path):
+        path = tmp_path / "other.ndjson"
+        path.write_text(json.dumps({"id": "d-1"}) + "\n")
+        with pytest.raises(ValueError):
+            read_header(str(path))
+
+        path.write_text(json.dumps({"format": "motorpy-snapshot", "version": VERSION + 1}) + "\n")
+        with pytest.raises(ValueError):
+            list(load_snapshot(str(path)))
+
+    def test_msgpack(self, tmp_path):
+        pytest.importorskip("msgpack")
+        path = str(tmp_path / "drivers.msgpack")
+        dump_snapshot(path, [Driver(**DRIVER)], Driver, encoding="msgpack")
+        assert next(load_snapshot(path)).id == "d-1"
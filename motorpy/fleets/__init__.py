@@ -1 +1,3 @@
 from .core import Fleets
+from .graph import FleetGraph
+from .reconcile import DesiredAssignment, ReconcilePlan, ReconcileReport, reconcile_fleet
@@ -1,6 +1,11 @@
 import motorpy.models as models
 from motorpy.api import APIHandler
-from typing import Generator
+from typing import Generator, Iterable, Union
+
+from .graph import FleetGraph
+from .reconcile import DesiredAssignment, Pair, ReconcileReport, reconcile_fleet
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY
+from motorpy.api.idempotency import idempotent_request
 
 
 class Fleets:
@@ -32,7 +37,7 @@ class Fleets:
 
         model.api = self.api
 
-        return model
+        return model.snapshot()
 
     async def list_fleets(self,
                     max_records: int = None) -> Generator[models.Fleet, None, None]:
@@ -41,24 +46,63 @@ class Fleets:
             if max_records is not None:
                 if count >= max_records:
                     break
-            model: models.Fleet = models.Fleet(**fleet)
-            model.api = self.api
+            model: models.Fleet = models.Fleet.from_api(self.api, fleet)
             yield model
             count += 1
     
-    async def create_fleet(self, fleet: models.Fleet) -> models.Fleet:
+    async def create_fleet(self, fleet: models.Fleet, idempotency_key: str = None) -> models.Fleet:
         """Create a new fleet.
 
         Args:
             fleet (models.Fleet): the fleet model.
+            idempotency_key (str, optional): retries with the same key return the fleet created by the first call,
+                see `motorpy.api.idempotency`. Defaults to None.
 
         Returns:
             models.Fleet: the created fleet model.
         """
-        raw = await self.api.request("POST", "fleets", data=fleet.dict(exclude_unset=True))
+        raw = await idempotent_request(self.api, "POST", "fleets", key=idempotency_key, data=fleet.dict(exclude_unset=True))
 
         model: models.Fleet = models.Fleet(**raw)
 
         model.api = self.api
 
-        return model
+        return model.snapshot()
+
+    async def load_fleet_graph(self, root_id: str = None, concurrency: int = DEFAULT_CONCURRENCY) -> FleetGraph:
+        """Load a fleet tree into an in-memory graph, see `motorpy.fleets.graph`.
+
+        Args:
+            root_id (str, optional): the root fleet ID. Defaults to None (all fleets).
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+
+        Returns:
+            FleetGraph: the graph.
+        """
+        return await FleetGraph.load(self.api, root_id=root_id, concurrency=concurrency)
+
+    async def reconcile_fleet(self,
+                              fleet_id: str,
+                              assignments: Iterable[Union[DesiredAssignment, Pair]],
+                              drivers: Iterable[str] = None,
+                              remove_drivers: bool = True,
+                              remove_assignments: bool = True,
+                              dry_run: bool = False,
+                              concurrency: int = DEFAULT_CONCURRENCY) -> ReconcileReport:
+        """Apply the minimal changes to reach the desired driver to vehicle assignments of a fleet, see `motorpy.fleets.reconcile`.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            assignments (Iterable[Union[DesiredAssignment, Pair]]): the desired assignments, or (driver ID, vehicle ID) pairs.
+            drivers (Iterable[str], optional): drivers that should be in the fleet without an assignment. Defaults to None.
+            remove_drivers (bool, optional): whether to remove the drivers that are not desired. Defaults to True.
+            remove_assignments (bool, optional): whether to remove the assignments that are not desired. Defaults to True.
+            dry_run (bool, optional): only plan the changes. Defaults to False.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+
+        Returns:
+            ReconcileReport: the plan and the result of each call.
+        """
+        return await reconcile_fleet(await self.get_fleet(fleet_id), assignments, drivers=drivers,
+                                     remove_drivers=remove_drivers, remove_assignments=remove_assignments,
+                                     dry_run=dry_run, concurrency=concurrency)
@@ -0,0 +1,457 @@
+"""
+In-memory fleet graph.
+
+`FleetGraph` loads a fleet tree (the fleet hierarchy, the drivers and vehicles of each fleet and the driver to vehicle assignments)
+into adjacency indexes, so questions about the tree are answered without requests:
+
+```python
+graph = await motor.load_fleet_graph("fleet-id")
+graph.vehicles_for_driver("driver-id")   # index lookup
+graph.descendants("fleet-id")            # O(k) for k descendants
+graph.unassigned_vehicles("fleet-id")    # index lookup
+```
+
+The add and remove methods of the graph call the API (through `Fleet`) and update the indexes,
+so the graph stays current without being reloaded.
+"""
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import motorpy.models as models
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY, gather_limited
+
+
+class FleetGraph:
+    "Adjacency indexes of fleets, drivers, vehicles and driver to vehicle assignments."
+
+    def __init__(self, api: Any = None) -> None:
+        """
+        Args:
+            api (APIHandler, optional): the API handler, required by the add and remove methods. Defaults to None.
+        """
+        self.api = api
+        self.fleets: Dict[str, models.Fleet] = {}
+        # hierarchy
+        self._parent: Dict[str, Optional[str]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        # fleet -> driver/vehicle ID -> membership
+        self._fleet_drivers: Dict[str, Dict[str, models.FleetDriver]] = {}
+        self._fleet_vehicles: Dict[str, Dict[str, models.FleetVehicle]] = {}
+        # driver/vehicle ID -> fleets
+        self._driver_fleets: Dict[str, Set[str]] = {}
+        self._vehicle_fleets: Dict[str, Set[str]] = {}
+        # assignments: driver -> vehicle -> fleets, and the reverse
+        self._driver_vehicles: Dict[str, Dict[str, Set[str]]] = {}
+        self._vehicle_drivers: Dict[str, Dict[str, Set[str]]] = {}
+        # fleet -> vehicles without a driver in that fleet
+        self._unassigned: Dict[str, Set[str]] = {}
+        # (fleet, driver, vehicle) -> assignment, when known
+        self._assignments: Dict[Tuple[str, str, str], models.FleetDriverVehicleAssignment] = {}
+
+    # * **********************************************************************************************************************
+    # * loading
+    # * **********************************************************************************************************************
+
+    @classmethod
+    async def load(cls,
+                   api: Any,
+                   root_id: Optional[str] = None,
+                   concurrency: int = DEFAULT_CONCURRENCY) -> 'FleetGraph':
+        """Load a fleet tree.
+
+        The fleets are listed once to build the hierarchy. With a root, only the root, its descendants
+        and its ancestors (fetched with `get_parent` if they are not listed) are loaded.
+        The drivers, vehicles and assignments of the loaded fleets are fetched concurrently.
+
+        Args:
+            api (APIHandler): the API handler.
+            root_id (str, optional): the root fleet ID. Defaults to None (all fleets).
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+
+        Returns:
+            FleetGraph: the graph.
+        """
+        graph = cls(api)
+        async for raw in api.batch_fetch("fleets"):
+            graph.add_fleet(models.Fleet.from_api(api, raw))
+
+        if root_id is not None:
+            if root_id not in graph.fleets:
+                graph.add_fleet(models.Fleet.from_api(api, await api.request("GET", f"fleets/{root_id}")))
+            keep = graph.descendants(root_id) | {root_id}
+            # ancestors outside of the listing
+            fleet = graph.fleets[root_id]
+            while fleet.has_parent():
+                parent = graph.fleets.get(fleet.parent_id) or await fleet.get_parent()
+                graph.add_fleet(parent)
+                keep.add(parent.id)
+                fleet = parent
+            for fleet_id in set(graph.fleets) - keep:
+                graph.remove_fleet(fleet_id)
+
+        await graph.load_members(list(graph.fleets.values()), concurrency=concurrency)
+        return graph
+
+    async def load_members(self, fleets: List[models.Fleet], concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        """Load the drivers, vehicles and assignments of fleets, the fleets are added to the hierarchy.
+
+        Args:
+            fleets (List[models.Fleet]): the fleets.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+        """
+        for fleet in fleets:
+            if fleet.id not in self.fleets:
+                self.add_fleet(fleet)
+
+        async def load_fleet(fleet: models.Fleet) -> None:
+            async for fd in fleet.list_drivers():
+                self._add_driver(fleet.id, fd)
+            async for fv in fleet.list_vehicles():
+                self._add_vehicle(fleet.id, fv)
+
+        await gather_limited((load_fleet(f) for f in fleets), limit=concurrency)
+
+        async def load_assignments(fleet: models.Fleet, driver_id: str) -> None:
+            async for a in fleet.list_driver_vehicle_assignments(driver_id, include_unassigned=False):
+                if a.is_assigned and a.vehicle:
+                    self._assign(fleet.id, driver_id, a.vehicle.id, a)
+
+        await gather_limited(
+            (load_assignments(f, d) for f in fleets for d in list(self._fleet_drivers.get(f.id, {}))),
+            limit=concurrency
+        )
+
+    # * **********************************************************************************************************************
+    # * queries
+    # * **********************************************************************************************************************
+
+    def parent(self, fleet_id: str) -> Optional[str]:
+        "The parent fleet ID of a fleet."
+        return self._parent.get(fleet_id)
+
+    def children(self, fleet_id: str) -> Set[str]:
+        "The child fleet IDs of a fleet."
+        return set(self._children.get(fleet_id, ()))
+
+    def ancestors(self, fleet_id: str) -> List[str]:
+        """The ancestors of a fleet.
+
+        Args:
+            fleet_id (str): the fleet ID.
+
+        Returns:
+            List[str]: the fleet IDs, from the parent to the root.
+        """
+        result = []
+        parent = self._parent.get(fleet_id)
+        while parent is not None and parent not in result:
+            result.append(parent)
+            parent = self._parent.get(parent)
+        return result
+
+    def descendants(self, fleet_id: str) -> Set[str]:
+        """All descendants of a fleet.
+
+        Args:
+            fleet_id (str): the fleet ID.
+
+        Returns:
+            Set[str]: the fleet IDs, excluding the fleet.
+        """
+        result: Set[str] = set()
+        queue = deque(self._children.get(fleet_id, ()))
+        while queue:
+            child = queue.popleft()
+            if child in result or child == fleet_id:
+                continue
+            result.add(child)
+            queue.extend(self._children.get(child, ()))
+        return result
+
+    def drivers(self, fleet_id: str) -> Set[str]:
+        "The driver IDs in a fleet."
+        return set(self._fleet_drivers.get(fleet_id, ()))
+
+    def vehicles(self, fleet_id: str) -> Set[str]:
+        "The vehicle IDs in a fleet."
+        return set(self._fleet_vehicles.get(fleet_id, ()))
+
+    def fleet_driver(self, fleet_id: str, driver_id: str) -> Optional[models.FleetDriver]:
+        "The fleet membership of a driver."
+        return self._fleet_drivers.get(fleet_id, {}).get(driver_id)
+
+    def fleet_vehicle(self, fleet_id: str, vehicle_id: str) -> Optional[models.FleetVehicle]:
+        "The fleet membership of a vehicle."
+        return self._fleet_vehicles.get(fleet_id, {}).get(vehicle_id)
+
+    def fleets_of_driver(self, driver_id: str) -> Set[str]:
+        "The fleet IDs a driver is in."
+        return set(self._driver_fleets.get(driver_id, ()))
+
+    def fleets_of_vehicle(self, vehicle_id: str) -> Set[str]:
+        "The fleet IDs a vehicle is in."
+        return set(self._vehicle_fleets.get(vehicle_id, ()))
+
+    def vehicles_for_driver(self, driver_id: str, fleet_id: Optional[str] = None) -> Set[str]:
+        """The vehicles a driver is assigned to.
+
+        Args:
+            driver_id (str): the driver ID.
+            fleet_id (str, optional): only the assignments of this fleet. Defaults to None.
+
+        Returns:
+            Set[str]: the vehicle IDs.
+        """
+        vehicles = self._driver_vehicles.get(driver_id, {})
+        if fleet_id is None:
+            return set(vehicles)
+        return {v for v, fleets in vehicles.items() if fleet_id in fleets}
+
+    def drivers_for_vehicle(self, vehicle_id: str, fleet_id: Optional[str] = None) -> Set[str]:
+        """The drivers assigned to a vehicle.
+
+        Args:
+            vehicle_id (str): the vehicle ID.
+            fleet_id (str, optional): only the assignments of this fleet. Defaults to None.
+
+        Returns:
+            Set[str]: the driver IDs.
+        """
+        drivers = self._vehicle_drivers.get(vehicle_id, {})
+        if fleet_id is None:
+            return set(drivers)
+        return {d for d, fleets in drivers.items() if fleet_id in fleets}
+
+    def is_assigned(self, fleet_id: str, driver_id: str, vehicle_id: str) -> bool:
+        "Whether a driver is assigned to a vehicle in a fleet."
+        return fleet_id in self._driver_vehicles.get(driver_id, {}).get(vehicle_id, ())
+
+    def assignment(self, fleet_id: str, driver_id: str, vehicle_id: str) -> Optional[models.FleetDriverVehicleAssignment]:
+        "The assignment of a driver to a vehicle in a fleet, None if not assigned or not known."
+        return self._assignments.get((fleet_id, driver_id, vehicle_id))
+
+    def unassigned_vehicles(self, fleet_id: Optional[str] = None) -> Set[str]:
+        """The vehicles without an assigned driver.
+
+        Args:
+            fleet_id (str, optional): the fleet ID. Defaults to None (vehicles unassigned in any fleet).
+
+        Returns:
+            Set[str]: the vehicle IDs.
+        """
+        if fleet_id is not None:
+            return set(self._unassigned.get(fleet_id, ()))
+        return set().union(*self._unassigned.values())
+
+    # * **********************************************************************************************************************
+    # * index updates
+    # * **********************************************************************************************************************
+
+    def add_fleet(self, fleet: models.Fleet) -> None:
+        """Add a fleet to the hierarchy, or update it.
+
+        Args:
+            fleet (models.Fleet): the fleet.
+        """
+        previous = self._parent.get(fleet.id)
+        if previous is not None:
+            self._children.get(previous, set()).discard(fleet.id)
+        self.fleets[fleet.id] = fleet
+        self._parent[fleet.id] = fleet.parent_id
+        if fleet.parent_id:
+            self._children.setdefault(fleet.parent_id, set()).add(fleet.id)
+
+    def remove_fleet(self, fleet_id: str) -> None:
+        """Remove a fleet and its memberships from the graph (not from the API).
+
+        Args:
+            fleet_id (str): the fleet ID.
+        """
+        for driver_id in list(self._fleet_drivers.get(fleet_id, ())):
+            self._remove_driver(fleet_id, driver_id)
+        for vehicle_id in list(self._fleet_vehicles.get(fleet_id, ())):
+            self._remove_vehicle(fleet_id, vehicle_id)
+        self._fleet_drivers.pop(fleet_id, None)
+        self._fleet_vehicles.pop(fleet_id, None)
+        self._unassigned.pop(fleet_id, None)
+        parent = self._parent.pop(fleet_id, None)
+        if parent is not None:
+            self._children.get(parent, set()).discard(fleet_id)
+        self.fleets.pop(fleet_id, None)
+
+    def _add_driver(self, fleet_id: str, fleet_driver: models.FleetDriver, driver_id: Optional[str] = None) -> None:
+        driver_id = driver_id or fleet_driver.id
+        if not driver_id:
+            return
+        self._fleet_drivers.setdefault(fleet_id, {})[driver_id] = fleet_driver
+        self._driver_fleets.setdefault(driver_id, set()).add(fleet_id)
+
+    def _remove_driver(self, fleet_id: str, driver_id: str) -> None:
+        for vehicle_id in self.vehicles_for_driver(driver_id, fleet_id):
+            self._unassign(fleet_id, driver_id, vehicle_id)
+        self._fleet_drivers.get(fleet_id, {}).pop(driver_id, None)
+        self._discard(self._driver_fleets, driver_id, fleet_id)
+
+    def _add_vehicle(self, fleet_id: str, fleet_vehicle: models.FleetVehicle, vehicle_id: Optional[str] = None) -> None:
+        vehicle_id = vehicle_id or fleet_vehicle.id
+        if not vehicle_id:
+            return
+        self._fleet_vehicles.setdefault(fleet_id, {})[vehicle_id] = fleet_vehicle
+        self._vehicle_fleets.setdefault(vehicle_id, set()).add(fleet_id)
+        if not self.drivers_for_vehicle(vehicle_id, fleet_id):
+            self._unassigned.setdefault(fleet_id, set()).add(vehicle_id)
+
+    def _remove_vehicle(self, fleet_id: str, vehicle_id: str) -> None:
+        for driver_id in self.drivers_for_vehicle(vehicle_id, fleet_id):
+            self._unassign(fleet_id, driver_id, vehicle_id)
+        self._fleet_vehicles.get(fleet_id, {}).pop(vehicle_id, None)
+        self._discard(self._vehicle_fleets, vehicle_id, fleet_id)
+        self._unassigned.get(fleet_id, set()).discard(vehicle_id)
+
+    def _assign(self,
+                fleet_id: str,
+                driver_id: str,
+                vehicle_id: str,
+                assignment: Optional[models.FleetDriverVehicleAssignment] = None) -> None:
+        if assignment is not None:
+            self._assignments[(fleet_id, driver_id, vehicle_id)] = assignment
+        self._driver_vehicles.setdefault(driver_id, {}).setdefault(vehicle_id, set()).add(fleet_id)
+        self._vehicle_drivers.setdefault(vehicle_id, {}).setdefault(driver_id, set()).add(fleet_id)
+        self._unassigned.get(fleet_id, set()).discard(vehicle_id)
+
+    def _unassign(self, fleet_id: str, driver_id: str, vehicle_id: str) -> None:
+        self._assignments.pop((fleet_id, driver_id, vehicle_id), None)
+        self._discard(self._driver_vehicles.get(driver_id, {}), vehicle_id, fleet_id)
+        self._discard(self._vehicle_drivers.get(vehicle_id, {}), driver_id, fleet_id)
+        if vehicle_id in self._fleet_vehicles.get(fleet_id, {}) and not self.drivers_for_vehicle(vehicle_id, fleet_id):
+            self._unassigned.setdefault(fleet_id, set()).add(vehicle_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, value: str) -> None:
+        values = index.get(key)
+        if values is None:
+            return
+        values.discard(value)
+        if not values:
+            del index[key]
+
+    # * **********************************************************************************************************************
+    # * API operations
+    # * **********************************************************************************************************************
+
+    def _fleet(self, fleet_id: str) -> models.Fleet:
+        fleet = self.fleets.get(fleet_id)
+        if fleet is None:
+            raise ValueError(f"Fleet not in graph: {fleet_id}")
+        if fleet.api is None:
+            fleet.api = self.api
+        return fleet
+
+    async def add_driver(self, fleet_id: str, driver_id: str, **kwargs) -> models.FleetDriver:
+        """Add a driver to a fleet, see `Fleet.add_driver`.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            driver_id (str): the driver ID.
+            **kwargs: the other arguments of `Fleet.add_driver`.
+
+        Returns:
+            FleetDriver: the API response.
+        """
+        fleet_driver = await self._fleet(fleet_id).add_driver(driver_id, **kwargs)
+        self._add_driver(fleet_id, fleet_driver, driver_id)
+        for vehicle_id in kwargs.get("vehicle_ids") or []:
+            self._assign(fleet_id, driver_id, vehicle_id)
+        return fleet_driver
+
+    async def remove_driver(self, fleet_id: str, driver_id: str) -> None:
+        """Remove a driver from a fleet, with their vehicle assignments.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            driver_id (str): the driver ID.
+        """
+        await self._fleet(fleet_id).remove_driver(driver_id)
+        self._remove_driver(fleet_id, driver_id)
+
+    async def add_vehicle(self, fleet_id: str, vehicle_id: str, **kwargs) -> models.FleetVehicle:
+        """Add a vehicle to a fleet, see `Fleet.add_vehicle`.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            vehicle_id (str): the vehicle ID.
+            **kwargs: the other arguments of `Fleet.add_vehicle`.
+
+        Returns:
+            FleetVehicle: the API response.
+        """
+        fleet_vehicle = await self._fleet(fleet_id).add_vehicle(vehicle_id, **kwargs)
+        self._add_vehicle(fleet_id, fleet_vehicle, vehicle_id)
+        return fleet_vehicle
+
+    async def remove_vehicle(self, fleet_id: str, vehicle_id: str) -> None:
+        """Remove a vehicle from a fleet, with its driver assignments.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            vehicle_id (str): the vehicle ID.
+        """
+        await self._fleet(fleet_id).remove_vehicle(vehicle_id)
+        self._remove_vehicle(fleet_id, vehicle_id)
+
+    async def add_driver_to_vehicle(self,
+                                    fleet_id: str,
+                                    driver_id: str,
+                                    vehicle_id: str,
+                                    expires_at: Optional[datetime] = None,
+                                    is_active: bool = True) -> models.FleetDriverVehicleAssignment:
+        """Assign a driver to a vehicle in a fleet.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            driver_id (str): the driver ID.
+            vehicle_id (str): the vehicle ID.
+            expires_at (datetime, optional): if and when the assignment expires. Defaults to None.
+            is_active (bool, optional): if active in the fleet. Defaults to True.
+
+        Returns:
+            FleetDriverVehicleAssignment: the API response.
+        """
+        assignment = await self._fleet(fleet_id).add_driver_to_vehicle(
+            driver_id, vehicle_id, expires_at=expires_at, is_active=is_active)
+        self._assign(fleet_id, driver_id, vehicle_id, assignment)
+        return assignment
+
+    async def update_driver_vehicle_assignment(self,
+                                               fleet_id: str,
+                                               driver_id: str,
+                                               vehicle_id: str,
+                                               expires_at: Optional[datetime] = None,
+                                               is_active: bool = True) -> None:
+        """Update the assignment of a driver to a vehicle in a fleet.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            driver_id (str): the driver ID.
+            vehicle_id (str): the vehicle ID.
+            expires_at (datetime, optional): if and when the assignment expires. Defaults to None.
+            is_active (bool, optional): if active in the fleet. Defaults to True.
+        """
+        await self._fleet(fleet_id).update_driver_vehicle_assignment(
+            driver_id, vehicle_id, expires_at=expires_at, is_active=is_active)
+        assignment = self.assignment(fleet_id, driver_id, vehicle_id)
+        if assignment is not None:
+            assignment.expires_at = expires_at
+            assignment.is_active = is_active
+
+    async def remove_driver_from_vehicle(self, fleet_id: str, driver_id: str, vehicle_id: str) -> None:
+        """Remove a driver from a vehicle in a fleet.
+
+        Args:
+            fleet_id (str): the fleet ID.
+            driver_id (str): the driver ID.
+            vehicle_id (str): the vehicle ID.
+        """
+        await self._fleet(fleet_id).remove_driver_from_vehicle(driver_id, vehicle_id)
+        self._unassign(fleet_id, driver_id, vehicle_id)
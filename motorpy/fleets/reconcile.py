@@ -0,0 +1,200 @@
+"""
+Desired-state reconciliation of fleet rosters.
+
+`reconcile_fleet` takes the driver to vehicle assignments a fleet should have (eg. from an HR system),
+compares them with the current state of the fleet and applies only the differences:
+
+- drivers and vehicles that are missing from the fleet are added
+- missing assignments are added, assignments with a different `is_active` or `expires_at` are updated
+- assignments and drivers that are not desired are removed (see `remove_assignments` and `remove_drivers`)
+
+```python
+report = await motor.reconcile_fleet("fleet-id", [("driver-1", "vehicle-1"), ("driver-2", "vehicle-1")])
+print(report.plan.changes, report.result.counts())
+```
+
+Independent calls run concurrently, assignments are added once their driver and vehicle are in the fleet.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+import motorpy.models as models
+from motorpy.models.bulk import BulkItemResult, BulkResult, BulkStatus, Operation, run_bulk
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY
+from .graph import FleetGraph
+
+
+class DesiredAssignment(NamedTuple):
+    "A driver to vehicle assignment that should exist in the fleet."
+    driver_id: str
+    vehicle_id: str
+    is_active: bool = True
+    expires_at: Optional[datetime] = None
+
+
+Pair = Tuple[str, str]
+
+
+class ReconcilePlan(BaseModel):
+    "The changes needed to reach the desired state."
+    drivers_to_add: List[str] = Field(default_factory=list)
+    drivers_to_remove: List[str] = Field(default_factory=list)
+    vehicles_to_add: List[str] = Field(default_factory=list)
+    assignments_to_add: List[Pair] = Field(default_factory=list)
+    assignments_to_update: List[Pair] = Field(default_factory=list)
+    assignments_to_remove: List[Pair] = Field(default_factory=list)
+    unchanged: int = Field(
+        default=0,
+        description="The number of desired assignments that already exist as desired."
+    )
+
+    @property
+    def changes(self) -> int:
+        "The number of API calls needed."
+        return (len(self.drivers_to_add) + len(self.drivers_to_remove) + len(self.vehicles_to_add)
+                + len(self.assignments_to_add) + len(self.assignments_to_update) + len(self.assignments_to_remove))
+
+
+class ReconcileReport(BaseModel):
+    "The result of a reconciliation."
+    fleet_id: str
+    dry_run: bool = False
+    plan: ReconcilePlan
+    result: BulkResult = Field(
+        default_factory=BulkResult,
+        description="The result of each call, keyed by driver ID, vehicle ID or driver/vehicle."
+    )
+
+
+def _desired(assignments: Iterable[Union[DesiredAssignment, Pair]]) -> Dict[Pair, DesiredAssignment]:
+    desired = {}
+    for a in assignments:
+        a = a if isinstance(a, DesiredAssignment) else DesiredAssignment(*a)
+        desired[(a.driver_id, a.vehicle_id)] = a
+    return desired
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # naive datetimes are UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _differs(current: Optional[models.FleetDriverVehicleAssignment], desired: DesiredAssignment) -> bool:
+    if current is None:
+        # the attributes are not known
+        return False
+    return current.is_active != desired.is_active or _utc(current.expires_at) != _utc(desired.expires_at)
+
+
+def plan_reconcile(graph: FleetGraph,
+                   fleet_id: str,
+                   assignments: Iterable[Union[DesiredAssignment, Pair]],
+                   drivers: Optional[Iterable[str]] = None,
+                   remove_drivers: bool = True,
+                   remove_assignments: bool = True) -> ReconcilePlan:
+    """Compare the desired state of a fleet with a loaded graph.
+
+    Args:
+        graph (FleetGraph): the graph, with the members of the fleet loaded.
+        fleet_id (str): the fleet ID.
+        assignments (Iterable[Union[DesiredAssignment, Pair]]): the desired assignments, or (driver ID, vehicle ID) pairs.
+        drivers (Iterable[str], optional): drivers that should be in the fleet without an assignment. Defaults to None.
+        remove_drivers (bool, optional): whether to remove the drivers that are not desired. Defaults to True.
+        remove_assignments (bool, optional): whether to remove the assignments that are not desired. Defaults to True.
+
+    Returns:
+        ReconcilePlan: the changes.
+    """
+    desired = _desired(assignments)
+    desired_drivers = set(drivers or ()) | {d for d, _ in desired}
+    current_drivers = graph.drivers(fleet_id)
+    current: Set[Pair] = {(d, v) for d in current_drivers for v in graph.vehicles_for_driver(d, fleet_id)}
+
+    drivers_to_remove = current_drivers - desired_drivers if remove_drivers else set()
+    kept = desired.keys() & current
+    to_update = {p for p in kept if _differs(graph.assignment(fleet_id, *p), desired[p])}
+    to_remove = {
+        # removing a driver removes their assignments
+        p for p in current - desired.keys() if p[0] not in drivers_to_remove
+    } if remove_assignments else set()
+
+    return ReconcilePlan(
+        drivers_to_add=sorted(desired_drivers - current_drivers),
+        drivers_to_remove=sorted(drivers_to_remove),
+        vehicles_to_add=sorted({v for _, v in desired} - graph.vehicles(fleet_id)),
+        assignments_to_add=sorted(desired.keys() - current),
+        assignments_to_update=sorted(to_update),
+        assignments_to_remove=sorted(to_remove),
+        unchanged=len(kept) - len(to_update)
+    )
+
+
+async def reconcile_fleet(fleet: models.Fleet,
+                          assignments: Iterable[Union[DesiredAssignment, Pair]],
+                          drivers: Optional[Iterable[str]] = None,
+                          remove_drivers: bool = True,
+                          remove_assignments: bool = True,
+                          dry_run: bool = False,
+                          concurrency: int = DEFAULT_CONCURRENCY,
+                          graph: Optional[FleetGraph] = None) -> ReconcileReport:
+    """Apply the minimal changes to reach the desired assignments of a fleet.
+
+    Args:
+        fleet (models.Fleet): the fleet.
+        assignments (Iterable[Union[DesiredAssignment, Pair]]): the desired assignments, or (driver ID, vehicle ID) pairs.
+        drivers (Iterable[str], optional): drivers that should be in the fleet without an assignment. Defaults to None.
+        remove_drivers (bool, optional): whether to remove the drivers that are not desired. Defaults to True.
+        remove_assignments (bool, optional): whether to remove the assignments that are not desired. Defaults to True.
+        dry_run (bool, optional): only plan the changes. Defaults to False.
+        concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+        graph (FleetGraph, optional): a graph with the fleet members loaded, it is updated with the changes.
+            Defaults to None (the fleet members are loaded).
+
+    Returns:
+        ReconcileReport: the plan and the result of each call.
+    """
+    desired = _desired(assignments)
+    if graph is None:
+        graph = FleetGraph(fleet.api)
+        await graph.load_members([fleet], concurrency=concurrency)
+    elif fleet.id not in graph.fleets:
+        await graph.load_members([fleet], concurrency=concurrency)
+
+    plan = plan_reconcile(graph, fleet.id, desired.values(), drivers=drivers,
+                          remove_drivers=remove_drivers, remove_assignments=remove_assignments)
+    report = ReconcileReport(fleet_id=fleet.id, dry_run=dry_run, plan=plan)
+    if dry_run or not plan.changes:
+        return report
+
+    fid = fleet.id
+    first: List[Operation] = [
+        *((d, "add_driver", lambda d=d: graph.add_driver(fid, d)) for d in plan.drivers_to_add),
+        *((v, "add_vehicle", lambda v=v: graph.add_vehicle(fid, v)) for v in plan.vehicles_to_add),
+        *((f"{d}/{v}", "remove_assignment", lambda d=d, v=v: graph.remove_driver_from_vehicle(fid, d, v))
+          for d, v in plan.assignments_to_remove),
+        *((d, "remove_driver", lambda d=d: graph.remove_driver(fid, d)) for d in plan.drivers_to_remove),
+    ]
+    await run_bulk(first, concurrency=concurrency, result=report.result)
+
+    failed = {(i.action, i.key) for i in report.result.failed}
+    second: List[Operation] = []
+    for d, v in plan.assignments_to_add:
+        if ("add_driver", d) in failed or ("add_vehicle", v) in failed:
+            report.result.items.append(BulkItemResult(
+                key=f"{d}/{v}", action="add_assignment", status=BulkStatus.skipped,
+                error="The driver or vehicle could not be added to the fleet"
+            ))
+            continue
+        a = desired[(d, v)]
+        second.append((f"{d}/{v}", "add_assignment", lambda a=a: graph.add_driver_to_vehicle(
+            fid, a.driver_id, a.vehicle_id, expires_at=a.expires_at, is_active=a.is_active)))
+    for d, v in plan.assignments_to_update:
+        a = desired[(d, v)]
+        second.append((f"{d}/{v}", "update_assignment", lambda a=a: graph.update_driver_vehicle_assignment(
+            fid, a.driver_id, a.vehicle_id, expires_at=a.expires_at, is_active=a.is_active)))
+    await run_bulk(second, concurrency=concurrency, result=report.result)
+    return report
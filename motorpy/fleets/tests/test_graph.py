@@ -0,0 +1,106 @@
+import asyncio
+
+from ...base import Motor
+from ...tests.fakes import FakeAPI
+
+
+FLEETS = [
+    {"id": "f-0", "display": "Root", "parentId": "top"},
+    {"id": "f-1", "display": "Child", "parentId": "f-0"},
+    {"id": "f-2", "display": "Grandchild", "parentId": "f-1"},
+    {"id": "x", "display": "Other"},
+]
+
+DRIVERS = {"f-0": ["d-1", "d-2"], "f-1": ["d-1"], "f-2": [], "top": [], "x": ["d-9"]}
+VEHICLES = {"f-0": ["v-1", "v-2", "v-3"], "f-1": ["v-4"], "f-2": ["v-5"], "top": [], "x": []}
+ASSIGNMENTS = {("f-0", "d-1"): ["v-1"], ("f-0", "d-2"): ["v-1", "v-2"], ("f-1", "d-1"): ["v-4"]}
+
+
+def respond(call):
+    parts = call.endpoint.strip("/").split("/")
+    data = call.data
+    if call.method == "GET":
+        return {"id": parts[1], "display": "Top"}
+    if call.method == "POST" and parts[-1] == "drivers":
+        return {"id": parts[1], "driver": {"id": data["driverId"]}}
+    if call.method == "POST" and parts[-1] == "vehicles" and len(parts) == 3:
+        return {"registeredVehicle": {"id": data["registeredVehicleId"]}}
+    if call.method == "POST":
+        return {"assigned": True, "registeredVehicle": {"id": data.get("registeredVehicleId", parts[-1])}}
+    return None
+
+
+def pages(call, limit):
+    parts = call.endpoint.strip("/").split("/")
+    if parts == ["fleets"]:
+        yield FLEETS
+    elif parts[-1] == "drivers":
+        yield [{"id": parts[1], "driver": {"id": d}} for d in DRIVERS[parts[1]]]
+    elif len(parts) == 3:
+        yield [{"registeredVehicle": {"id": v}} for v in VEHICLES[parts[1]]]
+    else:
+        yield [
+            {"assigned": True, "isActive": True, "registeredVehicle": {"id": v}, "driver": {"id": parts[3]}}
+            for v in ASSIGNMENTS.get((parts[1], parts[3]), [])
+        ]
+
+
+def load(root_id=None):
+    motor = Motor("org", region="eu-1")
+    motor.api = FakeAPI(respond=respond, pages=pages)
+    return asyncio.run(motor.load_fleet_graph(root_id)), motor.api
+
+
+class TestFleetGraph:
+
+    def test_hierarchy(self):
+        graph, api = load("f-0")
+        assert set(graph.fleets) == {"top", "f-0", "f-1", "f-2"}
+        assert graph.descendants("f-0") == {"f-1", "f-2"}
+        assert graph.descendants("top") == {"f-0", "f-1", "f-2"}
+        assert graph.ancestors("f-2") == ["f-1", "f-0", "top"]
+        assert graph.children("f-1") == {"f-2"}
+        # the parent outside of the listing was fetched
+        assert ("GET", "/fleets/top") in api.log("method", "endpoint")
+        # fleets outside of the tree are not loaded
+        assert not graph.fleets_of_driver("d-9")
+
+    def test_indexes(self):
+        graph, _ = load()
+        assert graph.vehicles_for_driver("d-1") == {"v-1", "v-4"}
+        assert graph.vehicles_for_driver("d-1", "f-1") == {"v-4"}
+        assert graph.drivers_for_vehicle("v-1") == {"d-1", "d-2"}
+        assert graph.fleets_of_driver("d-1") == {"f-0", "f-1"}
+        assert graph.unassigned_vehicles("f-0") == {"v-3"}
+        assert graph.unassigned_vehicles() == {"v-3", "v-5"}
+        assert graph.drivers("x") == {"d-9"}
+
+    def test_incremental_updates(self):
+        graph, api = load("f-0")
+
+        async def main():
+            await graph.add_driver_to_vehicle("f-0", "d-1", "v-3")
+            assert graph.unassigned_vehicles("f-0") == set()
+            assert graph.is_assigned("f-0", "d-1", "v-3")
+
+            await graph.remove_driver("f-0", "d-2")
+            assert graph.drivers_for_vehicle("v-2") == set()
+            assert graph.unassigned_vehicles("f-0") == {"v-2"}
+
+            await graph.add_vehicle("f-2", "v-6")
+            assert graph.unassigned_vehicles("f-2") == {"v-5", "v-6"}
+
+            await graph.add_driver("f-2", "d-3", vehicle_ids=["v-6"])
+            assert graph.vehicles_for_driver("d-3") == {"v-6"}
+            assert graph.unassigned_vehicles("f-2") == {"v-5"}
+
+            await graph.remove_vehicle("f-2", "v-6")
+            assert graph.vehicles_for_driver("d-3") == set()
+            assert graph.vehicles("f-2") == {"v-5"}
+
+            await graph.remove_driver_from_vehicle("f-0", "d-1", "v-1")
+            assert graph.vehicles_for_driver("d-1") == {"v-3", "v-4"}
+            assert graph.unassigned_vehicles("f-0") == {"v-1", "v-2"}
+
+        asyncio.run(main())
+        assert ("DELETE", "/fleets/f-0/drivers/d-2") in api.log("method", "endpoint")
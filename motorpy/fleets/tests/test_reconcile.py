@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timezone
+
+from ...base import Motor
+from ...models.bulk import BulkStatus
+from ...tests.fakes import FakeAPI
+from ..reconcile import DesiredAssignment
+
+
+class RosterAPI(FakeAPI):
+    "A fleet with a roster that is updated by the calls."
+
+    def __init__(self, drivers, vehicles, assignments, fail=()):
+        super().__init__(fail=fail, fail_status=400)
+        self.drivers = set(drivers)
+        self.vehicles = set(vehicles)
+        # (driver, vehicle) -> expiresAt
+        self.assignments = dict(assignments)
+
+    def writes(self):
+        "The method and fleet relative path of the calls that change the roster."
+        return [(c.method, c.endpoint.strip("/").split("/", 2)[2]) for c in self.calls if c.method not in ("GET", "LIST")]
+
+    def respond(self, call):
+        method, data = call.method, call.data
+        parts = call.endpoint.strip("/").split("/")
+        if method == "GET":
+            return {"id": parts[1], "display": "Fleet"}
+        if parts[2:] == ["drivers"]:
+            self.drivers.add(data["driverId"])
+            return {"id": parts[1], "driver": {"id": data["driverId"]}}
+        if parts[2:] == ["vehicles"]:
+            self.vehicles.add(data["registeredVehicleId"])
+            return {"registeredVehicle": {"id": data["registeredVehicleId"]}}
+        if len(parts) == 4 and method == "DELETE":
+            self.drivers.discard(parts[3])
+            self.assignments = {k: v for k, v in self.assignments.items() if k[0] != parts[3]}
+            return None
+        if len(parts) == 5:
+            self.assignments[(parts[3], data["registeredVehicleId"])] = data["expiresAt"]
+            return {"assigned": True, "isActive": True, "registeredVehicle": {"id": data["registeredVehicleId"]}}
+        if method == "DELETE":
+            del self.assignments[(parts[3], parts[5])]
+            return None
+        self.assignments[(parts[3], parts[5])] = data["expiresAt"]
+        return None
+
+    def pages(self, call, limit):
+        parts = call.endpoint.strip("/").split("/")
+        if parts[-1] == "drivers":
+            yield [{"id": parts[1], "driver": {"id": d}} for d in sorted(self.drivers)]
+        elif len(parts) == 3:
+            yield [{"registeredVehicle": {"id": v}} for v in sorted(self.vehicles)]
+        else:
+            yield [
+                {"assigned": True, "isActive": True, "expiresAt": expires_at,
+                 "registeredVehicle": {"id": v}, "driver": {"id": d}}
+                for (d, v), expires_at in sorted(self.assignments.items())
+                if d == parts[3]
+            ]
+
+
+def make_motor(**kwargs):
+    motor = Motor("org", region="eu-1")
+    motor.api = RosterAPI(
+        drivers=["d-1", "d-2", "d-3"],
+        vehicles=["v-1", "v-2"],
+        assignments={("d-1", "v-1"): None, ("d-2", "v-2"): None, ("d-3", "v-1"): None},
+        **kwargs
+    )
+    return motor
+
+
+DESIRED = [
+    ("d-1", "v-1"),
+    DesiredAssignment("d-2", "v-1", expires_at=datetime(2030, 1, 1)),
+    DesiredAssignment("d-2", "v-2", expires_at=datetime(2030, 1, 1)),
+    ("d-4", "v-3"),
+]
+
+
+class TestReconcile:
+
+    def test_plan(self):
+        motor = make_motor()
+        report = asyncio.run(motor.reconcile_fleet("f-1", DESIRED, dry_run=True))
+        plan = report.plan
+        assert plan.drivers_to_add == ["d-4"]
+        assert plan.drivers_to_remove == ["d-3"]
+        assert plan.vehicles_to_add == ["v-3"]
+        assert plan.assignments_to_add == [("d-2", "v-1"), ("d-4", "v-3")]
+        assert plan.assignments_to_update == [("d-2", "v-2")]
+        # removed with the driver
+        assert plan.assignments_to_remove == []
+        assert plan.unchanged == 1
+        assert plan.changes == 6
+        assert motor.api.writes() == []
+
+    def test_apply(self):
+        motor = make_motor()
+        report = asyncio.run(motor.reconcile_fleet("f-1", DESIRED, concurrency=2))
+        assert report.result.ok
+        assert len(report.result.items) == report.plan.changes
+        api = motor.api
+        assert api.drivers == {"d-1", "d-2", "d-4"}
+        assert set(api.assignments) == {("d-1", "v-1"), ("d-2", "v-1"), ("d-2", "v-2"), ("d-4", "v-3")}
+
+        # only the changed attribute is updated
+        again = asyncio.run(motor.reconcile_fleet("f-1", [
+            ("d-1", "v-1"), ("d-2", "v-1"), DesiredAssignment("d-2", "v-2", expires_at=datetime(2030, 1, 1, tzinfo=timezone.utc)),
+            DesiredAssignment("d-2", "v-1", expires_at=None), ("d-4", "v-3")
+        ]))
+        assert again.plan.changes == 1
+        assert again.plan.assignments_to_update == [("d-2", "v-1")]
+
+    def test_failures_skip_dependents(self):
+        motor = make_motor(fail={"/fleets/f-1/drivers"})
+        report = asyncio.run(motor.reconcile_fleet("f-1", DESIRED, remove_drivers=False))
+        assert not report.result.ok
+        statuses = {(i.action, i.key): i.status for i in report.result.items}
+        assert statuses[("add_driver", "d-4")] == BulkStatus.error
+        assert statuses[("add_assignment", "d-4/v-3")] == BulkStatus.skipped
+        assert statuses[("add_assignment", "d-2/v-1")] == BulkStatus.ok
+        assert report.result.failed[0].status_code == 400
+        # the driver is kept, only their assignment is removed
+        assert "d-3" in motor.api.drivers
+        assert ("d-3", "v-1") not in motor.api.assignments
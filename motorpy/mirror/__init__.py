@@ -0,0 +1 @@
+from .core import Mirror, Resource, SyncResult, RESOURCES
@@ -0,0 +1,405 @@
+"""
+Local SQLite mirror of org data.
+
+Each resource is stored in its own table as raw API records (JSON), keyed by the record ID:
+
+| resource       | endpoint                                   | key        |
+| -------------- | ------------------------------------------ | ---------- |
+| fleets         | fleets                                     | id         |
+| fleet_drivers  | fleets/{fleet}/drivers                     | sourceId   |
+| fleet_vehicles | fleets/{fleet}/vehicles                    | sourceId   |
+| assignments    | fleets/{fleet}/drivers/{driver}/vehicles   | sourceId   |
+| drivers        | drivers                                    | id         |
+| vehicles       | registered-vehicles                        | id         |
+| policies       | policy                                     | id         |
+
+The first sync of a resource fetches everything.
+Later syncs only fetch records created after the resource watermark (the latest `createdAt` seen),
+using a `Search(watermark, "gt")` filter. Records are upserted, so a full sync (`full=True`) refreshes changed records
+and deletes the records the API no longer returns.
+"""
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field
+from pydantic.datetime_parse import parse_datetime
+
+import motorpy.models as models
+from motorpy.models.trusted import construct_trusted
+from motorpy.search import Search
+from motorpy.search.local import LocalCollection
+
+
+class SyncResult(BaseModel):
+    "The result of syncing one resource."
+    resource: str
+    full: bool = Field(
+        default=False,
+        description="Whether all records were fetched, instead of only new ones."
+    )
+    records: int = Field(
+        default=0,
+        description="The number of records fetched."
+    )
+    skipped: int = Field(
+        default=0,
+        description="The number of records without an ID, these are not stored."
+    )
+    deleted: int = Field(
+        default=0,
+        description="The number of stored records that a full sync did not return, these are deleted."
+    )
+    pages: int = Field(
+        default=0,
+        description="The number of pages (requests) fetched."
+    )
+    seconds: float = Field(
+        default=0.0,
+        description="The time taken to sync the resource."
+    )
+    watermark: Optional[datetime] = Field(
+        default=None,
+        description="The latest createdAt of the resource after syncing."
+    )
+    synced_at: Optional[datetime] = None
+
+
+class Resource:
+    "A mirrored API resource."
+
+    def __init__(self,
+                 name: str,
+                 endpoint: str,
+                 model: Type[BaseModel],
+                 key: str = "id",
+                 parent: Optional[str] = None,
+                 params: Optional[dict] = None) -> None:
+        """
+        Args:
+            name (str): the resource (and table) name.
+            endpoint (str): the listing endpoint. For child resources it is formatted with the parent record
+                and the parent's own `parent_id`, eg. "fleets/{parent_id}/drivers/{driver[id]}/vehicles".
+            model (Type[BaseModel]): the model of the records.
+            key (str, optional): the key of the record ID. Defaults to "id".
+            parent (Optional[str], optional): the parent resource, the listing is fetched for each parent record. Defaults to None.
+            params (Optional[dict], optional): extra query parameters. Defaults to None.
+        """
+        self.name = name
+        self.endpoint = endpoint
+        self.model = model
+        self.key = key
+        self.parent = parent
+        self.params = params or {}
+
+    def record_id(self, record: dict) -> Optional[str]:
+        """Get the ID of a raw record.
+
+        Args:
+            record (dict): the raw record.
+
+        Returns:
+            Optional[str]: the record ID, None if the record has none.
+        """
+        value = record.get(self.key)
+        return None if value is None else str(value)
+
+
+RESOURCES: Dict[str, Resource] = {r.name: r for r in [
+    Resource("fleets", "fleets", models.Fleet),
+    Resource("fleet_drivers", "fleets/{id}/drivers", models.FleetDriver, key="sourceId", parent="fleets"),
+    Resource("fleet_vehicles", "fleets/{id}/vehicles", models.FleetVehicle, key="sourceId", parent="fleets"),
+    Resource("assignments", "fleets/{parent_id}/drivers/{driver[id]}/vehicles", models.FleetDriverVehicleAssignment,
+             key="sourceId", parent="fleet_drivers", params={"includeUnassigned": False}),
+    Resource("drivers", "drivers", models.Driver),
+    Resource("vehicles", "registered-vehicles", models.Vehicle, params={"full": "t"}),
+    Resource("policies", "policy", models.Policy),
+]}
+
+
+def _created_at(record: dict) -> Optional[datetime]:
+    value = record.get("createdAt")
+    if not value:
+        return None
+    try:
+        return parse_datetime(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class Mirror:
+    """
+    A local SQLite mirror of org data, kept up to date with incremental syncs.
+
+    ```python
+    mirror = Mirror(motor.api, "org.db")
+    await mirror.sync()
+    for driver in mirror.models("drivers"):
+        ...
+    ```
+    """
+
+    def __init__(self,
+                 api: Any,
+                 path: str = ":memory:",
+                 resources: Optional[Iterable[Resource]] = None,
+                 page_size: int = 500) -> None:
+        """
+        Args:
+            api (APIHandler): the API handler.
+            path (str, optional): the SQLite database path. Defaults to ":memory:".
+            resources (Optional[Iterable[Resource]], optional): the resources to mirror. Defaults to `RESOURCES`.
+            page_size (int, optional): records per request. Defaults to 500.
+        """
+        self.api = api
+        self.path = path
+        self.page_size = page_size
+        self.resources: Dict[str, Resource] = {r.name: r for r in (resources or RESOURCES.values())}
+        for r in self.resources.values():
+            if r.parent is not None and r.parent not in self.resources:
+                raise ValueError(f"Resource {r.name} requires its parent resource {r.parent}")
+        # the results of the last sync of each resource
+        self.timings: Dict[str, SyncResult] = {}
+
+        self.db = sqlite3.connect(path)
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS watermarks ("
+                "resource TEXT PRIMARY KEY, created_at TEXT, synced_at TEXT, records INTEGER, seconds REAL)"
+            )
+            for name in self.resources:
+                self.db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} ("
+                    "id TEXT PRIMARY KEY, parent_id TEXT, created_at TEXT, data TEXT NOT NULL)"
+                )
+                self.db.execute(f"CREATE INDEX IF NOT EXISTS {name}_parent ON {name} (parent_id)")
+
+    def close(self) -> None:
+        "Close the database."
+        self.db.close()
+
+    def _resource(self, name: str) -> Resource:
+        if name not in self.resources:
+            raise ValueError(f"Invalid resource: {name} - can be one of {set(self.resources)}")
+        return self.resources[name]
+
+    # * **********************************************************************************************************************
+    # * watermarks
+    # * **********************************************************************************************************************
+
+    def watermark(self, resource: str) -> Optional[datetime]:
+        """Get the watermark (latest createdAt synced) of a resource.
+
+        Args:
+            resource (str): the resource name.
+
+        Returns:
+            Optional[datetime]: the watermark, None if the resource was never synced.
+        """
+        self._resource(resource)
+        row = self.db.execute("SELECT created_at FROM watermarks WHERE resource = ?", (resource,)).fetchone()
+        return parse_datetime(row[0]) if row and row[0] else None
+
+    def watermarks(self) -> Dict[str, Optional[datetime]]:
+        """Get the watermarks of all resources.
+
+        Returns:
+            Dict[str, Optional[datetime]]: the watermark of each resource.
+        """
+        return {name: self.watermark(name) for name in self.resources}
+
+    # * **********************************************************************************************************************
+    # * sync
+    # * **********************************************************************************************************************
+
+    async def sync(self, resources: Optional[List[str]] = None, full: bool = False) -> Dict[str, SyncResult]:
+        """Sync resources, parents are synced before their children.
+
+        Args:
+            resources (Optional[List[str]], optional): the resources to sync. Defaults to all.
+            full (bool, optional): fetch all records instead of only new ones. Defaults to False.
+
+        Returns:
+            Dict[str, SyncResult]: the result of each resource.
+        """
+        names = set(resources) if resources is not None else set(self.resources)
+        for name in names:
+            self._resource(name)
+        results = {}
+        # resources are declared parents first
+        for name in self.resources:
+            if name in names:
+                results[name] = await self.sync_resource(name, full=full)
+        return results
+
+    async def sync_resource(self, resource: str, full: bool = False) -> SyncResult:
+        """Sync a single resource.
+
+        Args:
+            resource (str): the resource name.
+            full (bool, optional): fetch all records instead of only new ones. Defaults to False.
+
+        Returns:
+            SyncResult: the result.
+        """
+        spec = self._resource(resource)
+        started = time.perf_counter()
+
+        watermark = None if full else self.watermark(resource)
+        result = SyncResult(resource=resource, full=watermark is None)
+        params = dict(spec.params)
+        if watermark is not None:
+            params["createdAt"] = str(Search(watermark, "gt"))
+
+        latest = watermark
+        # the IDs returned by a full sync, the other stored records were deleted in the API
+        seen = set()
+        for endpoint, parent_id in self._endpoints(spec):
+            async for page in self.api.batch_fetch_pages(endpoint, params=dict(params), limit=self.page_size):
+                rows = []
+                for record in page:
+                    record_id = spec.record_id(record)
+                    if record_id is None:
+                        result.skipped += 1
+                        continue
+                    if result.full:
+                        seen.add(record_id)
+                    created_at = _created_at(record)
+                    if created_at is not None and (latest is None or created_at > latest):
+                        latest = created_at
+                    rows.append((
+                        record_id,
+                        parent_id,
+                        created_at.isoformat() if created_at else None,
+                        json.dumps(record, separators=(",", ":"), default=str)
+                    ))
+                with self.db:
+                    self.db.executemany(
+                        f"INSERT OR REPLACE INTO {resource} (id, parent_id, created_at, data) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                result.pages += 1
+                result.records += len(rows)
+
+        if result.full:
+            stale = [(i,) for i, in self.db.execute(f"SELECT id FROM {resource}") if i not in seen]
+            with self.db:
+                self.db.executemany(f"DELETE FROM {resource} WHERE id = ?", stale)
+            result.deleted = len(stale)
+
+        result.watermark = latest
+        result.seconds = time.perf_counter() - started
+        result.synced_at = datetime.utcnow()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO watermarks (resource, created_at, synced_at, records, seconds) VALUES (?, ?, ?, ?, ?)",
+                (resource, latest.isoformat() if latest else None, result.synced_at.isoformat(), self.count(resource), result.seconds)
+            )
+        self.timings[resource] = result
+        return result
+
+    def _endpoints(self, spec: Resource) -> Generator[Tuple[str, Optional[str]], None, None]:
+        "The endpoints to fetch for a resource, with the parent record ID."
+        if spec.parent is None:
+            yield spec.endpoint, None
+            return
+        # the parents are read up front, as the database is written while fetching
+        rows = self.db.execute(f"SELECT id, parent_id, data FROM {spec.parent} ORDER BY rowid").fetchall()
+        for parent_id, grandparent_id, data in rows:
+            try:
+                yield spec.endpoint.format(**{**json.loads(data), "parent_id": grandparent_id}), parent_id
+            except (KeyError, TypeError):
+                # eg. a fleet driver without a driver
+                continue
+
+    # * **********************************************************************************************************************
+    # * reads
+    # * **********************************************************************************************************************
+
+    def count(self, resource: str) -> int:
+        """Count the mirrored records of a resource.
+
+        Args:
+            resource (str): the resource name.
+
+        Returns:
+            int: the number of records.
+        """
+        self._resource(resource)
+        return self.db.execute(f"SELECT COUNT(*) FROM {resource}").fetchone()[0]
+
+    def get(self, resource: str, record_id: str) -> Optional[dict]:
+        """Get a raw record.
+
+        Args:
+            resource (str): the resource name.
+            record_id (str): the record ID.
+
+        Returns:
+            Optional[dict]: the raw record, None if it is not mirrored.
+        """
+        self._resource(resource)
+        row = self.db.execute(f"SELECT data FROM {resource} WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_items(self, resource: str, parent_id: Optional[str] = None) -> Generator[Tuple[str, dict], None, None]:
+        """Iterate the raw records of a resource with their IDs.
+
+        Args:
+            resource (str): the resource name.
+            parent_id (Optional[str], optional): only records of this parent. Defaults to None.
+
+        Yields:
+            Tuple[str, dict]: the record ID and raw record.
+        """
+        self._resource(resource)
+        if parent_id is None:
+            rows = self.db.execute(f"SELECT id, data FROM {resource} ORDER BY rowid")
+        else:
+            rows = self.db.execute(f"SELECT id, data FROM {resource} WHERE parent_id = ? ORDER BY rowid", (parent_id,))
+        for record_id, data in rows:
+            yield record_id, json.loads(data)
+
+    def iter_raw(self, resource: str, parent_id: Optional[str] = None) -> Generator[dict, None, None]:
+        """Iterate the raw records of a resource.
+
+        Args:
+            resource (str): the resource name.
+            parent_id (Optional[str], optional): only records of this parent. Defaults to None.
+
+        Yields:
+            dict: the raw records.
+        """
+        for _, record in self.iter_items(resource, parent_id=parent_id):
+            yield record
+
+    def models(self, resource: str, parent_id: Optional[str] = None) -> Generator[BaseModel, None, None]:
+        """Iterate the records of a resource as models, built with the trusted construction path.
+
+        Args:
+            resource (str): the resource name.
+            parent_id (Optional[str], optional): only records of this parent. Defaults to None.
+
+        Yields:
+            BaseModel: the models, attached to the mirror's API handler.
+        """
+        model_cls = self._resource(resource).model
+        for record in self.iter_raw(resource, parent_id=parent_id):
+            yield construct_trusted(model_cls, record, api=self.api)
+
+    def collection(self, resource: str, **kwargs) -> LocalCollection:
+        """Load the models of a resource into a `LocalCollection` for indexed local queries.
+
+        Args:
+            resource (str): the resource name.
+            **kwargs: passed to `LocalCollection`, eg. `hash_fields`.
+
+        Returns:
+            LocalCollection: the collection.
+        """
+        return LocalCollection(self.models(resource), **kwargs)
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+
+from motorpy.models import Driver, Fleet
+from motorpy.tests.fakes import FakeAPI
+from ..core import Mirror, Resource, RESOURCES
+
+
+def stamp(day: int) -> str:
+    return f"2022-01-{day:02d}T00:00:00+00:00"
+
+
+class ListingsAPI(FakeAPI):
+    "Serves listings from memory, applying createdAt gt filters."
+
+    def __init__(self, data: dict) -> None:
+        super().__init__()
+        self.data = data
+
+    def pages(self, call, limit):
+        params = call.params or {}
+        records = self.data.get(call.endpoint, [])
+        if "createdAt" in params:
+            op, value = params["createdAt"].split(".", 1)
+            assert op == "gt"
+            records = [r for r in records if r["createdAt"] > value]
+        return [records[i:i + limit] for i in range(0, len(records), limit)]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestMirror:
+
+    def test_full_then_incremental(self):
+        api = ListingsAPI({"drivers": [
+            {"id": f"d-{i}", "firstName": "Joe", "lastName": "Adams", "email": "x", "createdAt": stamp(i)}
+            for i in range(1, 6)
+        ]})
+        mirror = Mirror(api, resources=[RESOURCES["drivers"]], page_size=2)
+
+        result = run(mirror.sync())["drivers"]
+        assert result.full is True
+        assert result.records == 5
+        assert result.pages == 3
+        assert mirror.count("drivers") == 5
+        assert mirror.watermark("drivers").day == 5
+        assert mirror.timings["drivers"] is result
+
+        api.data["drivers"].append({"id": "d-6", "firstName": "Ann", "createdAt": stamp(6)})
+        result = run(mirror.sync())["drivers"]
+        assert result.full is False
+        assert result.records == 1
+        assert api.calls[-1].params["createdAt"] == "gt." + stamp(5)
+        assert mirror.count("drivers") == 6
+        assert mirror.watermarks() == {"drivers": mirror.watermark("drivers")}
+
+        assert mirror.get("drivers", "d-6")["firstName"] == "Ann"
+        models = list(mirror.models("drivers"))
+        assert isinstance(models[0], Driver)
+        assert models[0].api is api
+
+        # full syncs refresh existing records
+        api.data["drivers"][0]["firstName"] = "Jim"
+        assert run(mirror.sync(full=True))["drivers"].records == 6
+        assert mirror.get("drivers", "d-1")["firstName"] == "Jim"
+        assert mirror.count("drivers") == 6
+
+        # and delete the records the API no longer returns
+        del api.data["drivers"][1]
+        result = run(mirror.sync(full=True))["drivers"]
+        assert result.deleted == 1
+        assert mirror.get("drivers", "d-2") is None
+        assert mirror.count("drivers") == 5
+        assert run(mirror.sync())["drivers"].deleted == 0
+
+    def test_child_resources(self):
+        api = ListingsAPI({
+            "fleets": [{"id": "f-1", "createdAt": stamp(1)}, {"id": "f-2", "createdAt": stamp(2)}],
+            "fleets/f-1/drivers": [{"sourceId": "fd-1", "driver": {"id": "d-1"}, "createdAt": stamp(3)}],
+            "fleets/f-2/drivers": [{"sourceId": "fd-2", "driver": None, "createdAt": stamp(3)}, {"isActive": True}],
+            "fleets/f-1/drivers/d-1/vehicles": [{"sourceId": "a-1", "createdAt": stamp(4)}],
+        })
+        mirror = Mirror(api, resources=[RESOURCES["fleets"], RESOURCES["fleet_drivers"], RESOURCES["assignments"]])
+        results = run(mirror.sync())
+
+        assert list(results) == ["fleets", "fleet_drivers", "assignments"]
+        assert results["fleet_drivers"].records == 2
+        assert results["fleet_drivers"].skipped == 1
+        assert [r["sourceId"] for r in mirror.iter_raw("fleet_drivers", parent_id="f-1")] == ["fd-1"]
+        assert mirror.count("assignments") == 1
+        assert isinstance(next(mirror.models("fleets")), Fleet)
+
+    def test_persisted(self, tmp_path):
+        path = str(tmp_path / "org.db")
+        api = ListingsAPI({"fleets": [{"id": "f-1", "createdAt": stamp(1)}]})
+        mirror = Mirror(api, path, resources=[RESOURCES["fleets"]])
+        run(mirror.sync())
+        mirror.close()
+
+        mirror = Mirror(api, path, resources=[RESOURCES["fleets"]])
+        assert mirror.count("fleets") == 1
+        assert mirror.watermark("fleets").day == 1
+        assert run(mirror.sync())["fleets"].full is False
+
+    def test_invalid_resources(self):
+        with pytest.raises(ValueError):
+            Mirror(ListingsAPI({}), resources=[RESOURCES["assignments"]])
+        mirror = Mirror(ListingsAPI({}), resources=[Resource("fleets", "fleets", Fleet)])
+        with pytest.raises(ValueError):
+            run(mirror.sync(["drivers"]))
@@ -5,6 +5,7 @@ from .policy import Policy
 from .vehicles import VehicleType, Vehicle, DriverVehicle
 from .drivers import Driver
 from .fleets import FleetVehicle, FleetDriver, Fleet, FleetDriverVehicleAssignment
+from .drivers.aggregate import Driver360
 
 from typing import Union
 
@@ -0,0 +1,169 @@
+"""
+Results of bulk operations.
+
+Bulk operations run many API calls with bounded concurrency. A failed call does not stop the others,
+each call is reported as a `BulkItemResult`:
+
+```python
+result = await run_bulk([("d-1", "remove_driver", lambda: fleet.remove_driver("d-1"))])
+for item in result.failed:
+    print(item.key, item.error)
+```
+"""
+import asyncio
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from motorpy.api.exceptions import APIError
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY, gather_limited
+from motorpy.util.retry import backoff_delays, is_transient
+
+
+class BulkStatus(str, Enum):
+    ok = "ok"
+    error = "error"
+    skipped = "skipped"
+
+
+class BulkItemResult(BaseModel):
+    "The result of one call of a bulk operation."
+    key: str = Field(
+        description="Identifies the item, eg. a record ID or a row number."
+    )
+    action: Optional[str] = Field(
+        default=None,
+        description="The operation, eg. add_driver."
+    )
+    status: BulkStatus = BulkStatus.ok
+    error: Optional[str] = None
+    status_code: Optional[int] = Field(
+        default=None,
+        description="The API status code, for API errors."
+    )
+    attempts: int = 1
+    result: Any = Field(
+        default=None,
+        description="The value returned by the call, eg. the created model."
+    )
+
+
+class BulkResult(BaseModel):
+    "The results of a bulk operation."
+    items: List[BulkItemResult] = Field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def succeeded(self) -> List[BulkItemResult]:
+        "The calls that succeeded."
+        return [i for i in self.items if i.status == BulkStatus.ok]
+
+    @property
+    def failed(self) -> List[BulkItemResult]:
+        "The calls that failed."
+        return [i for i in self.items if i.status == BulkStatus.error]
+
+    @property
+    def skipped(self) -> List[BulkItemResult]:
+        "The calls that were not made."
+        return [i for i in self.items if i.status == BulkStatus.skipped]
+
+    @property
+    def ok(self) -> bool:
+        "Whether no call failed."
+        return not self.failed
+
+    def counts(self) -> Dict[str, int]:
+        """Count the calls by status.
+
+        Returns:
+            Dict[str, int]: the number of calls by status.
+        """
+        counts = {s.value: 0 for s in BulkStatus}
+        for item in self.items:
+            counts[item.status.value] += 1
+        return counts
+
+
+def error_result(key: str, action: Optional[str], error: BaseException, attempts: int = 1) -> BulkItemResult:
+    """The result of a failed call.
+
+    Args:
+        key (str): the item key.
+        action (Optional[str]): the operation.
+        error (BaseException): the error.
+        attempts (int, optional): the number of attempts. Defaults to 1.
+
+    Returns:
+        BulkItemResult: the result.
+    """
+    return BulkItemResult(
+        key=key,
+        action=action,
+        status=BulkStatus.error,
+        error=str(error) or error.__class__.__name__,
+        status_code=error.status_code if isinstance(error, APIError) else None,
+        attempts=attempts
+    )
+
+
+# key, action, call
+Operation = Tuple[str, Optional[str], Callable[[], Awaitable[Any]]]
+
+
+async def run_operation(key: str,
+                        action: Optional[str],
+                        call: Callable[[], Awaitable[Any]],
+                        retries: int = 0,
+                        retry_delay: float = 0.5) -> BulkItemResult:
+    """Run one call, reporting a failure instead of raising it.
+
+    Args:
+        key (str): the item key.
+        action (Optional[str]): the operation.
+        call (Callable[[], Awaitable[Any]]): makes the call.
+        retries (int, optional): the number of times a transient failure is retried (see `motorpy.util.retry.is_transient`). Defaults to 0.
+        retry_delay (float, optional): the delay before the first retry in seconds, doubled after each retry. Defaults to 0.5.
+
+    Returns:
+        BulkItemResult: the result.
+    """
+    delays = backoff_delays(retry_delay)
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            return BulkItemResult(key=key, action=action, result=await call(), attempts=attempts)
+        except Exception as e:
+            if attempts > retries or not is_transient(e):
+                return error_result(key, action, e, attempts=attempts)
+        await asyncio.sleep(next(delays))
+
+
+async def run_bulk(operations: Iterable[Operation],
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   result: Optional[BulkResult] = None,
+                   retries: int = 0,
+                   retry_delay: float = 0.5) -> BulkResult:
+    """Run calls with bounded concurrency.
+
+    Args:
+        operations (Iterable[Operation]): (key, action, call) tuples, `call` makes the API call.
+        concurrency (int, optional): the maximum number of calls at once. Defaults to 10.
+        result (BulkResult, optional): a result to add the items to. Defaults to None.
+        retries (int, optional): the number of times a transient failure of a call is retried. Defaults to 0.
+        retry_delay (float, optional): the delay before the first retry in seconds, doubled after each retry. Defaults to 0.5.
+
+    Returns:
+        BulkResult: the results, in the order of the operations.
+    """
+    result = result if result is not None else BulkResult()
+    started = time.perf_counter()
+    result.items.extend(await gather_limited(
+        (run_operation(*op, retries=retries, retry_delay=retry_delay) for op in operations),
+        limit=concurrency
+    ))
+    result.seconds += time.perf_counter() - started
+    return result
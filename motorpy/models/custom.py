@@ -1,5 +1,37 @@
-from pydantic import BaseModel, Field
-from typing import Any, Optional, Set
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Any, ClassVar, Dict, FrozenSet, Optional, Set
+from .trusted import construct_trusted
+
+
+# fields that are never exported
+_EXPORT_HIDDEN = frozenset({"api", "api_path"})
+
+
+class _ExportPlan:
+    "The cached export plan for a model class."
+    __slots__ = ("names", "aliases")
+
+    def __init__(self, model_cls: type) -> None:
+        # exportable field name -> output key, hidden and private fields are left out
+        self.names: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+        for name, field in model_cls.__fields__.items():
+            if name.startswith("_") or name in _EXPORT_HIDDEN:
+                continue
+            self.names[name] = name
+            self.aliases[name] = field.alias or name
+
+
+_EXPORT_PLANS: Dict[type, _ExportPlan] = {}
+
+_PYDANTIC_DICT = BaseModel.dict
+
+
+def _get_export_plan(model_cls: type) -> _ExportPlan:
+    plan = _EXPORT_PLANS.get(model_cls)
+    if plan is None:
+        plan = _EXPORT_PLANS[model_cls] = _ExportPlan(model_cls)
+    return plan
 
 
 class Exporter(BaseModel):
@@ -13,6 +45,8 @@ class Exporter(BaseModel):
              exclude_defaults: bool = False) -> dict:
         """Export the model as a dict. This will recursively export any nested models.
 
+        The field to key mapping is resolved once per model class and cached.
+
         Args:
             exclude (Optional[Set[str]], optional): fields to exclude. Defaults to None.
             include (Optional[Set[str]], optional): fields to include. Defaults to None.
@@ -23,21 +57,15 @@ class Exporter(BaseModel):
         Returns:
             dict: a dict of the model.
         """
-        _ex_keys = {"api", "api_path"}
-
         if not exclude:
             exclude = set()
-
-            # hidden_fields = set(
-            #     attribute_name
-            #     for attribute_name, model_field in self.__fields__.items()
-            #     if model_field.field_info.extra.get("hidden") is True
-            # )
-
-            # exclude = exclude.union(hidden_fields)
         if not include:
             include = set()
 
+        plan = _get_export_plan(self.__class__)
+        names = plan.aliases if by_alias else plan.names
+        fields_set = self.__fields_set__
+
         result = dict()
 
         for key, value in self.__dict__.items():
@@ -46,21 +74,23 @@ class Exporter(BaseModel):
             if key in include:
                 result[key] = value
                 continue
-            if key.startswith("_"):
-                continue
 
-            if key not in self.__fields_set__ and exclude_unset:
-                continue
+            name = names.get(key)
+            if name is None:
+                # hidden, private or unknown
+                if key.startswith("_") or key in _EXPORT_HIDDEN or (exclude_unset and key not in fields_set):
+                    continue
+                raise KeyError(key)
 
-            # remove hidden fields here
-            if key in _ex_keys:
+            if exclude_unset and key not in fields_set:
                 continue
 
-            # set key to alias if it exists
-            key = self.__fields__[key].alias if by_alias and self.__fields__[key].alias else key
-
             if isinstance(value, BaseModel):
-                result[key] = value.dict(
+                if not include and type(value).dict is _PYDANTIC_DICT:
+                    # pydantic intersects the fields with an empty include, nothing is exported
+                    result[name] = {}
+                    continue
+                result[name] = value.dict(
                     exclude=exclude,
                     include=include,
                     exclude_unset=exclude_unset,
@@ -68,11 +98,90 @@ class Exporter(BaseModel):
                     by_alias=by_alias
                 )
             else:
-                result[key] = value
+                result[name] = value
 
         return result
 
 
+def model_state(value: Any) -> Any:
+    """The API formatted state of a value, for change tracking.
+
+    Models are exported by alias (nested models included, lazy policy sections that were not loaded are left out)
+    and containers are copied, so later changes to the value do not change the state.
+
+    Args:
+        value (Any): a model or a field value.
+
+    Returns:
+        Any: the state.
+    """
+    if isinstance(value, BaseModel):
+        fields = value.__fields__
+        return {
+            (fields[k].alias if k in fields else k): model_state(v)
+            for k, v in value.__dict__.items()
+            if not k.startswith("_") and k not in _EXPORT_HIDDEN
+        }
+    if isinstance(value, dict):
+        return {k: model_state(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [model_state(v) for v in value]
+    return value
+
+
+def _copy_data(value: Any) -> Any:
+    "Copy the dicts and lists of an API response, the other values are immutable."
+    if isinstance(value, dict):
+        return {k: _copy_data(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_data(v) for v in value]
+    return value
+
+
+def diff_state(loaded: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """The changes between two states, nested objects only include their changed keys.
+
+    Args:
+        loaded (Dict[str, Any]): the loaded state.
+        current (Dict[str, Any]): the current state.
+
+    Returns:
+        Dict[str, Any]: the changed keys and their current values.
+    """
+    changes = {}
+    for key, value in current.items():
+        if key not in loaded:
+            changes[key] = value
+            continue
+        old = loaded[key]
+        if isinstance(value, dict) and isinstance(old, dict):
+            nested = diff_state(old, value)
+            if nested:
+                changes[key] = nested
+        elif value != old:
+            changes[key] = value
+    return changes
+
+
+def merge_state(state: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply changes (eg. from `diff_state`) to a state in place, nested objects are merged key by key.
+
+    Args:
+        state (Dict[str, Any]): the state to update.
+        changes (Dict[str, Any]): the changed keys and their values.
+
+    Returns:
+        Dict[str, Any]: the updated state.
+    """
+    for key, value in changes.items():
+        old = state.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            merge_state(old, value)
+        else:
+            state[key] = model_state(value)
+    return state
+
+
 class PrivateAPIHandler(Exporter):
     """
     This api handler is for private use only.
@@ -94,9 +203,100 @@ class PrivateAPIHandler(Exporter):
         alias='apiPath'
     )
 
+    # related collections fetched with a listing, see `motorpy.models.prefetch`
+    _prefetched: Dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    # the state of the model when it was loaded from the API, see snapshot
+    _loaded: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
+    # the API response of from_api, the loaded state is computed from it when it is first needed
+    _loaded_data: Optional[dict] = PrivateAttr(default=None)
+
+    # the fields that save never sends, eg. related records
+    _save_exclude: ClassVar[FrozenSet[str]] = frozenset()
+
     class Config:
         allow_populatiion_by_field_name = True
 
+    @classmethod
+    def from_api(cls, api: Any, data: dict) -> 'PrivateAPIHandler':
+        """Create a model from an API response.
+
+        If the API handler is in trusted mode, the model is constructed without validation (see `motorpy.models.trusted`).
+        Otherwise this is the same as `cls(api=api, **data)`.
+
+        A copy of the response is kept as the loaded state of the model (see `snapshot`), it is only parsed
+        when the changes are first needed, so loading models that are never saved stays cheap.
+        The model shares the nested dicts and lists of the response, changing them in place is still tracked.
+
+        Args:
+            api (APIHandler): the API handler to attach to the model.
+            data (dict): the API response body.
+
+        Returns:
+            PrivateAPIHandler: the model.
+        """
+        model = cls._parse_api(api, data)
+        model._loaded_data = _copy_data(data)
+        return model
+
+    @classmethod
+    def _parse_api(cls, api: Any, data: dict) -> 'PrivateAPIHandler':
+        if getattr(api, "trusted", False):
+            return construct_trusted(cls, data, api=api)
+        return cls(api=api, **data)
+
+    def snapshot(self) -> 'PrivateAPIHandler':
+        """Record the current state as the state in the API.
+        Models loaded from the API are snapshotted, `save` then only sends the fields that changed since.
+
+        Returns:
+            PrivateAPIHandler: this model.
+        """
+        self._loaded = model_state(self)
+        self._loaded_data = None
+        return self
+
+    def _loaded_state(self) -> Optional[Dict[str, Any]]:
+        "The state of the model in the API, computed from the API response on first use. None if not loaded."
+        if self._loaded is None and self._loaded_data is not None:
+            self._loaded = model_state(self._parse_api(self.api, self._loaded_data))
+            self._loaded_data = None
+        return self._loaded
+
+    def get_changes(self, exclude: Set[str] = None) -> Optional[Dict[str, Any]]:
+        """Get the API formatted fields that changed since the model was loaded.
+
+        Args:
+            exclude (Set[str], optional): the fields to leave out. Defaults to None.
+
+        Returns:
+            Optional[Dict[str, Any]]: the changed fields, nested objects only include their changed keys.
+                None if the model was not loaded from the API.
+        """
+        if self._loaded_state() is None:
+            return None
+        return self._changes(model_state(self), exclude)
+
+    def _changes(self, state: Dict[str, Any], exclude: Set[str] = None) -> Dict[str, Any]:
+        changes = diff_state(self._loaded_state(), state)
+        for name in {'api', 'id', 'created_at'}.union(exclude or ()):
+            field = self.__fields__.get(name)
+            changes.pop(field.alias if field else name, None)
+        return changes
+
+    def get_prefetched(self, relation: str, default: Any = None) -> Any:
+        """Get a related collection that was prefetched with the listing of this model.
+
+        Args:
+            relation (str): the relation name, eg. "vehicles".
+            default (Any, optional): returned if the relation was not prefetched. Defaults to None.
+
+        Returns:
+            Any: the related models.
+        """
+        return self._prefetched.get(relation, default)
+
     def get_api_path(self) -> Optional[str]:
         """Get the API path for the model.
 
@@ -122,30 +322,45 @@ class PrivateAPIHandler(Exporter):
             object.__setattr__(self, key, value)
             self.__fields_set__.add(key)
         if persist:
-            await self._save()
+            await self.save()
 
     async def _save(self, url: str, fields: dict = None, exclude: Set[str] = None, params: dict = None) -> Optional[dict]:
         """
         Update via the API.
 
+        Only the fields that changed since the model was loaded are sent (see `snapshot`),
+        the request is not made if nothing changed.
+
         Args:
-            fields (dict, optional): the API formatted fields to update. If not supplied, any set fields in the model will be updated in the API. Defaults to None.
+            fields (dict, optional): the API formatted fields to update. If not supplied, the changed fields are updated in the API,
+                or any set fields if the model was not loaded from the API. Defaults to None.
         """
         if not self.api:
             raise ValueError("APIHandler not set.")
-        if not exclude:
-            exclude = set()
-        data = self.dict(
-            by_alias=True,
-            exclude={'api', 'id', 'created_at'}.union(exclude),
-            exclude_defaults=True,
-            exclude_unset=True
-        ) if not fields else fields
+        exclude = self._save_exclude.union(exclude or ())
+        state = None
+        if fields:
+            data = fields
+        elif self._loaded_state() is not None:
+            # changes made while the request is in flight are sent by the next save
+            state = model_state(self)
+            data = self._changes(state, exclude)
+        else:
+            data = self.dict(
+                by_alias=True,
+                exclude={'api', 'id', 'created_at'}.union(exclude),
+                exclude_defaults=True,
+                exclude_unset=True
+            )
         if not data:
             return
-        return await self.api.request(
+        res = await self.api.request(
             "PATCH",
             url,
             data=data,
             params=params
         )
+        if state is not None:
+            # the API now has the saved state
+            self._loaded = state
+        return res
@@ -1,10 +1,13 @@
 import motorpy.models as models
-import asyncio
-from pydantic import Field, validator, parse_raw_as, parse_obj_as
+from pydantic import Field, PrivateAttr, validator, parse_raw_as, parse_obj_as
 from datetime import datetime, date
-from typing import Optional, List, Generator, Any, AsyncGenerator
+from typing import Dict, Optional, List, Generator, Any, AsyncGenerator, Tuple, ClassVar, FrozenSet
 
 from motorpy.models.billing.events import BillingEvent, BillingEventStatus, BillingEventType
+from motorpy.export import export_listing
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY, gather_limited
+from motorpy.api.idempotency import idempotent_request
+from motorpy.util.retry import poll_until
 
 
 class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
@@ -178,6 +181,8 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
         alias="fleets"
     )
 
+    _save_exclude: ClassVar[FrozenSet[str]] = frozenset({'fleets', 'vehicles_raw', 'created_at'})
+
     class Config:
         allow_population_by_field_name = True
         # exclude properties from exports
@@ -204,26 +209,29 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
             value = parse_raw_as(List[models.fleets.FleetDriver], value)
         elif isinstance(value, list):
             value = parse_obj_as(List[models.fleets.FleetDriver], value)
-        for f in value:
-            f.driver = cls
-            f.api = cls.api
+        # the API handler is set by list_fleets, it is not known when validating
         return value
 
     vehicles_raw: List[dict] = Field(
         default=[]
     )
 
+    # (roster version, resolved trackable assets) by (source ID type, fleet ID), see list_trackable_models
+    _trackable: Dict[Tuple[str, Optional[str]], Tuple[int, list]] = PrivateAttr(default_factory=dict)
+
     async def list_vehicles(self) -> List[models.vehicles.DriverVehicle]:
         """List all vehicles for this driver.
 
         Returns:
             List[Vehicle]: list of vehicles
         """
+        if "vehicles" in self._prefetched:
+            return self._prefetched["vehicles"]
         self.vehicles_raw = await self.api.request("GET",
                                                    f"drivers/{self.id}/vehicles")
         if self.vehicles_raw is None:
             return []
-        return [models.vehicles.DriverVehicle(api=self.api, **v) for v in self.vehicles_raw]
+        return [models.vehicles.DriverVehicle.from_api(self.api, v) for v in self.vehicles_raw]
 
     def to_dict(self, api_format: bool = False, **kwargs) -> dict:
         return self.dict(exclude={"api"}, by_alias=api_format, **kwargs)
@@ -277,7 +285,7 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
                 "primary": primary_only,
             }
         )
-        return [models.billing.BillingAccount(api=self.api, **ba) for ba in (accounts or [])]
+        return [models.billing.BillingAccount.from_api(self.api, ba) for ba in (accounts or [])]
 
     async def get_billing_account(self, id: str) -> models.billing.BillingAccount:
         """Get a billing account for this driver.
@@ -308,11 +316,15 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
         # make another request for the full account details
         return await self.get_billing_account(res[0].id) if res else None
 
-    async def create_billing_account(self, account: models.billing.BillingAccount) -> models.billing.BillingAccount:
+    async def create_billing_account(self,
+                                     account: models.billing.BillingAccount,
+                                     timeout: float = 10.0) -> models.billing.BillingAccount:
         """Create a billing account for this driver.
 
         Args:
             account (BillingAccount): the account to create
+            timeout (float, optional): the maximum seconds to wait for the account to be readable,
+                if the API does not return the full account. Defaults to 10.0.
 
         Returns:
             BillingAccount: the created account
@@ -323,17 +335,20 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
             f"/drivers/{self.id}/billing-accounts",
             data=account.dict(exclude_unset=True)
         )
-        # wait for the account to be created before returning
-        await asyncio.sleep(2)
-        # fetch the full account details
-        return await self.get_billing_account(_r["id"])
+        if "createdAt" in _r:
+            # the API returned the full account
+            return models.billing.BillingAccount(api=self.api, **_r).snapshot()
+        # the account is readable shortly after it is created, poll for the full account details
+        return await poll_until(lambda: self.get_billing_account(_r["id"]), timeout=timeout)
 
-    async def charge(self, amount: int = None, event: BillingEvent = None) -> BillingEvent:
+    async def charge(self, amount: int = None, event: BillingEvent = None, idempotency_key: str = None) -> BillingEvent:
         """Charge the driver. The billing event will be entered under their current primary billing account.
 
         Args:
             amount (int, optional): the amount to charge. Defaults to None.
             event (BillingEvent, optional): the billing event to charge. This overrides the amount if both are provided. Defaults to None.
+            idempotency_key (str, optional): retries with the same key return the event of the first call instead of charging again,
+                see `motorpy.api.idempotency`. Defaults to None.
 
         Raises:
             ValueError: if neither amount nor event are provided
@@ -352,9 +367,11 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
             )
 
         self._check_id()
-        return models.billing.BillingEvent(api=self.api, **(await self.api.request(
+        return models.billing.BillingEvent(api=self.api, **(await idempotent_request(
+            self.api,
             "POST",
             f"/drivers/{self.id}/billing-events",
+            key=idempotency_key,
             data=event.dict(exclude_unset=True)
         )))
 
@@ -385,9 +402,40 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
             if max_records:
                 if count >= max_records:
                     break
-            yield models.billing.BillingEvent(api=self.api, **p)
+            yield models.billing.BillingEvent.from_api(self.api, p)
             count += 1
 
+    async def export_charges(self,
+                             path: str,
+                             format: str = "parquet",
+                             event_type: BillingEventType = None,
+                             event_status: BillingEventStatus = None,
+                             page_size: int = 500,
+                             max_records: int = None) -> int:
+        """Export the charges for this driver to a columnar file, see `motorpy.export.columnar`.
+
+        Args:
+            path (str): the file path.
+            format (str, optional): one of "parquet", "arrow" or "npz". Defaults to "parquet".
+            event_type (BillingEventType, optional): filter by type. Defaults to None.
+            event_status (BillingEventStatus, optional): filter by status. Defaults to None.
+            page_size (int, optional): records per request and per batch written. Defaults to 500.
+            max_records (int, optional): the maximum number of charges to write. Defaults to None.
+
+        Returns:
+            int: the number of charges written.
+        """
+        self._check_id()
+
+        params = {}
+        if event_type:
+            params["type"] = event_type
+        if event_status:
+            params["status"] = event_status
+
+        return await export_listing(self.api, f"/drivers/{self.id}/billing-events", models.billing.BillingEvent, path,
+                                    format=format, params=params, page_size=page_size, max_records=max_records)
+
     async def get_charge(self, id: str) -> BillingEvent:
         """Get a charge for this driver.
 
@@ -437,16 +485,28 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
 
     # fleets
 
-    async def list_fleets(self) -> List['models.fleets.Fleet']:
-        "List fleets for this driver."
+    async def list_fleets(self, concurrency: int = DEFAULT_CONCURRENCY) -> List['models.fleets.Fleet']:
+        """List fleets for this driver.
+        Fleets are fetched concurrently, each fleet once (see `models.fleets.fleet_loader`).
+
+        The fleets are fetched again on each call: the loader is not shared between calls, so edits made
+        elsewhere are seen. To share fleets across the drivers of a listing, use `prefetch=["fleets"]`;
+        `Motor.load_fleet` with `cache_loads=True` caches them for the client's lifetime.
+
+        Args:
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+
+        Returns:
+            List[Fleet]: the fleets
+        """
+        if "fleets" in self._prefetched:
+            return self._prefetched["fleets"]
         if not self.fleets:
             await self.refresh()
-        fleets = []
-        for fd in self.fleets:
-            f = await fd.get_fleet()
-            if f:
-                fleets.append(f)
-        return fleets
+        loader = models.fleets.fleet_loader(self.api, concurrency)
+        fleet_ids = list(dict.fromkeys(fd.fleet_id for fd in self.fleets if fd.fleet_id))
+        fleets = await gather_limited((loader.load(i) for i in fleet_ids), limit=concurrency)
+        return [f for f in fleets if f]
 
     # policies
     async def list_vehicle_policies(self, vehicle_id: str) -> List['models.policy.Policy']:
@@ -460,16 +520,24 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
                     "drvIds": vehicle_id
                 }) or [])]
 
-    async def list_policies(self, loose_match: bool = True, is_active_policy: bool = None) -> Generator['models.policy.Policy', None, None]:
+    async def list_policies(self,
+                            loose_match: bool = True,
+                            is_active_policy: bool = None,
+                            lazy: bool = False) -> Generator['models.policy.Policy', None, None]:
         """List policies for this driver.
 
         Args:
             loose_match (bool, optional): if True, will return any policy related to the driver (D, DRV, RV, FD, FDRV). Defaults to True.
             is_active_policy (bool, optional): if True, will return only active policies. Defaults to None.
+            lazy (bool, optional): if True, nested policy sections are validated on first access. Defaults to False.
 
         Returns:
             Generator[Policy]: policies
         """
+        if loose_match and is_active_policy is None and not lazy and "policies" in self._prefetched:
+            for p in self._prefetched["policies"]:
+                yield p
+            return
         params = {
             "driverIds": self.id,
             "driverLooseMatch": loose_match
@@ -478,7 +546,10 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
             params["isActivePolicy"] = is_active_policy
 
         async for p in self.api.batch_fetch(f"policy", params=params):
-            yield models.policy.Policy(api=self.api, **p)
+            if lazy:
+                yield models.policy.Policy.parse_lazy(api=self.api, **p)
+            else:
+                yield models.policy.Policy.from_api(self.api, p)
 
     async def create_policy(self, policy: 'models.policy.Policy' = None) -> 'models.policy.Policy':
         """Create a policy for this driver.
@@ -509,7 +580,7 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
         return models.policy.Policy(api=self.api, **(await self.api.request(
             "GET",
             f"policy/{policy_id}"
-        )))
+        ))).snapshot()
 
     def _check_id(self) -> None:
         if not self.id:
@@ -565,6 +636,7 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
             **_r,
             api=api
         )
+        self.snapshot()
 
     async def delete(self) -> None:
         """
@@ -587,8 +659,7 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
 
         return await self._save(
             url=f"/drivers/{self.id}",
-            fields=fields,
-            exclude={'fleets', 'vehicles_raw', 'created_at'}
+            fields=fields
         )
 
     async def update(self, persist: bool = False, **kwargs) -> None:
@@ -601,16 +672,30 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
 
         Note: when doing multiple updates, it is recommended to call update() after all updates are made.
         """
+        self.invalidate_trackable_models()
         await self._update(persist=persist, **kwargs)
 
-    async def list_trackable_models(self, fleet_id: str = None) -> List['models.TrackableAsset']:
+    def invalidate_trackable_models(self) -> None:
+        "Forget the resolved trackable assets, eg. after the driver was assigned to a fleet or vehicle."
+        self._trackable.clear()
+
+    async def list_trackable_models(self,
+                                    fleet_id: str = None,
+                                    concurrency: int = DEFAULT_CONCURRENCY,
+                                    refresh: bool = False) -> List['models.TrackableAsset']:
         """List trackable models for this driver.
 
         Depending on the org settings, this will return a model that contains a source ID.
         The source ID (not the ID) will be used to identify the model for telematics.
 
+        Fleets are queried concurrently. The result is kept on the driver until `invalidate_trackable_models()`,
+        `update()` or `refresh()` is called, or until a fleet roster is changed through the same API handler
+        (see `models.fleets.roster_changed`).
+
         Args:
             fleet_id (str, optional): the fleet ID to filter on. Defaults to None.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+            refresh (bool, optional): whether to resolve the assets again. Defaults to False.
 
         Returns:
             List[TrackableAsset]: assets that can be tracked for different insurance use-cases.
@@ -625,6 +710,18 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
 
         sid_type = self.api.org_data.source_id_type
 
+        key = (sid_type, fleet_id)
+        version = models.fleets.roster_version(self.api)
+        cached = self._trackable.get(key)
+        if refresh or cached is None or cached[0] != version:
+            cached = (version, await self._resolve_trackable_models(sid_type, fleet_id, concurrency))
+            self._trackable[key] = cached
+        return list(cached[1])
+
+    async def _resolve_trackable_models(self,
+                                        sid_type: str,
+                                        fleet_id: Optional[str],
+                                        concurrency: int) -> List['models.TrackableAsset']:
         assets: List['models.TrackableAsset'] = []
 
         if sid_type == 'drv':
@@ -634,35 +731,33 @@ class Driver(models.custom.PrivateAPIHandler, models.risk.CommonRisk):
             return [drv.vehicle for drv in (await self.list_vehicles()) if drv.is_active and drv.vehicle.is_active]
         elif sid_type == 'd':
             return [self]
-        elif sid_type == 'fd':
-            fleets = await self.list_fleets()
-            if fleets:
-                for fleet in fleets:
-                    if fleet_id is not None:
-                        if fleet.id != fleet_id:
-                            continue
-                    driver_record = await fleet.get_driver(self.id)
+        elif sid_type in ('fd', 'fdrv', 'frv'):
+            fleets = [
+                fleet for fleet in await self.list_fleets(concurrency=concurrency)
+                if fleet_id is None or fleet.id == fleet_id
+            ]
+            if sid_type == 'fd':
+                for driver_record in await gather_limited((fleet.get_driver(self.id) for fleet in fleets), limit=concurrency):
                     if driver_record:
                         assets.append(driver_record)
-        elif sid_type == 'fdrv' or sid_type == 'frv':
+                return assets
+
             # frv and fdrvs will be returned here as 'open to all' frv's are returned as well
-            fleets = await self.list_fleets()
-            if fleets:
-                for fleet in fleets:
-                    if fleet_id is not None:
-                        if fleet.id != fleet_id:
+            async def list_assignments(fleet: 'models.Fleet') -> List['models.FleetDriverVehicleAssignment']:
+                return [fdrv async for fdrv in fleet.list_driver_vehicle_assignments(
+                    self.id,
+                    include_unassigned=(sid_type == 'frv'))]
+
+            for assignments in await gather_limited((list_assignments(fleet) for fleet in fleets), limit=concurrency):
+                for fdrv in assignments:
+                    if sid_type == 'fdrv':
+                        # only return fdrvs that are assigned to the driver and active
+                        if fdrv.is_assigned and fdrv.is_active:
+                            assets.append(fdrv.driver)
                             continue
-                    async for fdrv in fleet.list_driver_vehicle_assignments(
-                            self.id,
-                            include_unassigned=(sid_type == 'frv')):
-                        if sid_type == 'fdrv':
-                            # only return fdrvs that are assigned to the driver and active
-                            if fdrv.is_assigned and fdrv.is_active:
-                                assets.append(fdrv.driver)
-                                continue
-                        else:
-                            if not fdrv.is_assigned and fdrv.is_active:
-                                assets.append(fdrv)
+                    else:
+                        if not fdrv.is_assigned and fdrv.is_active:
+                            assets.append(fdrv)
         return assets
 
     @property
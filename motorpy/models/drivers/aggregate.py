@@ -0,0 +1,75 @@
+"""
+Driver 360 aggregate.
+
+A driver together with their vehicles, fleets, policies, billing accounts and recent charges,
+see `Motor.get_driver_360`. Each part is fetched concurrently with its own timeout,
+a part that fails or times out is left empty and reported in `parts`.
+"""
+from enum import Enum
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from motorpy.models.billing import BillingAccount, BillingEvent
+from motorpy.models.drivers import Driver
+from motorpy.models.fleets import Fleet
+from motorpy.models.policy import Policy
+from motorpy.models.vehicles import DriverVehicle
+
+
+# the parts of the aggregate, other than the driver
+DRIVER_360_PARTS = ("vehicles", "fleets", "policies", "billing_accounts", "charges")
+
+
+class PartStatus(str, Enum):
+    ok = "ok"
+    timeout = "timeout"
+    error = "error"
+    skipped = "skipped"
+
+
+class PartResult(BaseModel):
+    "How a part of an aggregate was fetched."
+    status: PartStatus
+    error: Optional[str] = Field(
+        default=None,
+        description="The error message, for failed parts."
+    )
+    seconds: float = Field(
+        default=0.0,
+        description="The time taken to fetch the part."
+    )
+
+
+class Driver360(BaseModel):
+    "A driver with their related records."
+    driver: Driver
+    vehicles: List[DriverVehicle] = Field(default_factory=list)
+    fleets: List[Fleet] = Field(default_factory=list)
+    policies: List[Policy] = Field(default_factory=list)
+    billing_accounts: List[BillingAccount] = Field(default_factory=list)
+    charges: List[BillingEvent] = Field(
+        default_factory=list,
+        description="The most recent charges."
+    )
+    parts: Dict[str, PartResult] = Field(
+        default_factory=dict,
+        description="How each part was fetched, by part name."
+    )
+    seconds: float = Field(
+        default=0.0,
+        description="The time taken to fetch the aggregate."
+    )
+
+    @property
+    def complete(self) -> bool:
+        "Whether every requested part was fetched."
+        return all(p.status in (PartStatus.ok, PartStatus.skipped) for p in self.parts.values())
+
+    def failed_parts(self) -> List[str]:
+        """The parts that failed or timed out.
+
+        Returns:
+            List[str]: the part names.
+        """
+        return [name for name, p in self.parts.items() if p.status in (PartStatus.error, PartStatus.timeout)]
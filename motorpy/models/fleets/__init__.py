@@ -1,14 +1,51 @@
+import functools
 from pydantic import Field
-from typing import Optional, List, Union, Generator
+from typing import Any, Optional, List, Union, Generator, ClassVar, FrozenSet
 import motorpy.models as models
 # from motorpy.models.risk import Risk
 from datetime import datetime
 from motorpy.models.constants import LANG
+from motorpy.api.loader import BatchLoader
+from motorpy.export import export_listing
+from motorpy.models.prefetch import DEFAULT_CONCURRENCY, iter_prefetched
+from motorpy.util.concurrency import gather_limited
 from .drivers import FleetDriver
 from .vehicles import FleetVehicle
 from .assigned import FleetDriverVehicleAssignment
 
 
+def roster_version(api: Any) -> int:
+    """The version of the fleet rosters seen through an API handler.
+
+    Args:
+        api (Any): the API handler.
+
+    Returns:
+        int: a number that changes whenever a fleet roster is changed through the handler.
+    """
+    return getattr(api, "roster_version", 0)
+
+
+def roster_changed(api: Any) -> None:
+    """Mark the fleet rosters of an API handler as changed, so results derived from them are resolved again.
+
+    Args:
+        api (Any): the API handler.
+    """
+    api.roster_version = roster_version(api) + 1
+
+
+def _changes_roster(method):
+    "Call `roster_changed` after a fleet method that adds, updates or removes drivers and vehicles, even if it fails."
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            roster_changed(self.api)
+    return wrapper
+
+
 class Fleet(models.PrivateAPIHandler):
     """
     Fleet model
@@ -78,6 +115,8 @@ class Fleet(models.PrivateAPIHandler):
         alias="risk"
     )
 
+    _save_exclude: ClassVar[FrozenSet[str]] = frozenset({'vehicle_type'})
+
     class Config:
         allow_population_by_field_name = True
 
@@ -143,7 +182,9 @@ class Fleet(models.PrivateAPIHandler):
                                       f"/fleets/{self.id}")),
             api=api
         )
+        self.snapshot()
 
+    @_changes_roster
     async def delete(self) -> None:
         """
         Delete this record via the API.
@@ -165,8 +206,7 @@ class Fleet(models.PrivateAPIHandler):
 
         return await self._save(
             url=f"/fleets/{self.id}",
-            fields=fields,
-            exclude={'vehicle_type'}
+            fields=fields
         )
 
     async def update(self, persist: bool = False, **kwargs) -> None:
@@ -193,6 +233,7 @@ class Fleet(models.PrivateAPIHandler):
     # * driver operations
     # * **********************************************************************************************************************
 
+    @_changes_roster
     async def add_driver(self,
                          driver_id: str,
                          is_vehicle_manager: bool = False,
@@ -269,6 +310,7 @@ class Fleet(models.PrivateAPIHandler):
             raise e
         return driver
 
+    @_changes_roster
     async def remove_driver(self, driver_id: str) -> None:
         """Remove a driver from the fleet
 
@@ -293,6 +335,7 @@ class Fleet(models.PrivateAPIHandler):
             **(await self.api.request("GET", f"/fleets/{self.id}/drivers/{driver_id}"))
         )
 
+    @_changes_roster
     async def update_driver(self,
                             driver_id: str,
                             is_vehicle_manager: bool = None,
@@ -331,19 +374,33 @@ class Fleet(models.PrivateAPIHandler):
             data=data
         )))
 
-    async def list_drivers(self) -> Generator[List[FleetDriver], None, None]:
+    async def list_drivers(self,
+                           prefetch: List[str] = None,
+                           concurrency: int = DEFAULT_CONCURRENCY) -> Generator[List[FleetDriver], None, None]:
         """List the drivers in the fleet
 
+        Args:
+            prefetch (List[str], optional): related collections to fetch per page and attach to the fleet drivers,
+                any of "assignments" and "policies", see `motorpy.models.prefetch`. Defaults to None.
+            concurrency (int, optional): the maximum number of prefetch requests at once. Defaults to 10.
+
         Returns:
             List[FleetDriver]: the drivers
         """
+        if prefetch:
+            async for d in iter_prefetched(self.api, f"/fleets/{self.id}/drivers", FleetDriver, prefetch,
+                                           concurrency=concurrency, context={"fleet": self}):
+                yield d
+            return
+
         async for d in self.api.batch_fetch(f"/fleets/{self.id}/drivers"):
-            yield FleetDriver(api=self.api, **d)
+            yield FleetDriver.from_api(self.api, d)
 
     # * **********************************************************************************************************************
     # * vehicle operations
     # * **********************************************************************************************************************
 
+    @_changes_roster
     async def add_vehicle(self, vehicle_id: str, is_active: bool = True, is_open_to_all: bool = True) -> FleetVehicle:
         """Add a vehicle to the fleet
 
@@ -366,6 +423,7 @@ class Fleet(models.PrivateAPIHandler):
             data=data
         )))
 
+    @_changes_roster
     async def remove_vehicle(self, vehicle_id: str) -> None:
         """Remove a vehicle from the fleet
 
@@ -376,6 +434,7 @@ class Fleet(models.PrivateAPIHandler):
             "DELETE", f"/fleets/{self.id}/vehicles/{vehicle_id}"
         )
 
+    @_changes_roster
     async def update_vehicle(self,
                        vehicle_id: str,
                        is_active: bool = None,
@@ -412,12 +471,13 @@ class Fleet(models.PrivateAPIHandler):
             Generator[FleetVehicle, None, None]: the vehicle assignments
         """
         async for v in self.api.batch_fetch(f"/fleets/{self.id}/vehicles"):
-            yield FleetVehicle(api=self.api, **v)
+            yield FleetVehicle.from_api(self.api, v)
 
     # * **********************************************************************************************************************
     # * driver to vehicle assignment operations
     # * **********************************************************************************************************************
 
+    @_changes_roster
     async def add_driver_to_vehicle(self, driver_id: str,
                               vehicle_id: str,
                               expires_at: datetime = None,
@@ -440,6 +500,7 @@ class Fleet(models.PrivateAPIHandler):
             }
         )))
 
+    @_changes_roster
     async def remove_driver_from_vehicle(self, driver_id: str, vehicle_id: str) -> None:
         """Remove a driver from a vehicle
 
@@ -451,6 +512,7 @@ class Fleet(models.PrivateAPIHandler):
             "DELETE", f"/fleets/{self.id}/drivers/{driver_id}/vehicles/{vehicle_id}"
         )
 
+    @_changes_roster
     async def update_driver_vehicle_assignment(self,
                                          driver_id: str,
                                          vehicle_id: str,
@@ -486,20 +548,70 @@ class Fleet(models.PrivateAPIHandler):
         async for d in self.api.batch_fetch(f"/fleets/{self.id}/drivers/{driver_id}/vehicles", params={
             "includeUnassigned": include_unassigned
         }):
-            yield FleetDriverVehicleAssignment(api=self.api, **d)
+            yield FleetDriverVehicleAssignment.from_api(self.api, d)
 
     # * **********************************************************************************************************************
     # * policy operations
     # * **********************************************************************************************************************
 
-    async def list_policies(self) -> Generator['models.policies.Policy', None, None]:
+    async def list_policies(self, lazy: bool = False) -> Generator['models.policy.Policy', None, None]:
         """List all policies for this fleet.
 
+        Args:
+            lazy (bool, optional): if True, nested policy sections are validated on first access. Defaults to False.
+
         Returns:
             Generator[Policy, None, None]: policies
         """
         async for p in self.api.batch_fetch(f"policy", params={"fleetIds": self.id}):
-            yield models.policies.Policy(api=self.api, **p)
+            if lazy:
+                yield models.policy.Policy.parse_lazy(api=self.api, **p)
+            else:
+                yield models.policy.Policy.from_api(self.api, p)
+
+    async def export_policies(self,
+                              path: str,
+                              format: str = "parquet",
+                              page_size: int = 500,
+                              max_records: int = None) -> int:
+        """Export all policies for this fleet to a columnar file, see `motorpy.export.columnar`.
+        Nested policy sections are flattened, eg. `duration.start`.
+
+        Args:
+            path (str): the file path.
+            format (str, optional): one of "parquet", "arrow" or "npz". Defaults to "parquet".
+            page_size (int, optional): records per request and per batch written. Defaults to 500.
+            max_records (int, optional): the maximum number of policies to write. Defaults to None.
+
+        Returns:
+            int: the number of policies written.
+        """
+        return await export_listing(self.api, "policy", models.policy.Policy, path, format=format,
+                                    params={"fleetIds": self.id}, page_size=page_size, max_records=max_records)
 
 
 Fleet.update_forward_refs()
+
+
+def fleet_loader(api: Any, concurrency: int = DEFAULT_CONCURRENCY) -> BatchLoader:
+    """Create a loader of fleets by ID, for one call or listing.
+    Each fleet is fetched once per loader, so the fleets are as fresh as the loader.
+
+    Args:
+        api (APIHandler): the API handler.
+        concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+
+    Returns:
+        BatchLoader: the loader of fleets by ID.
+    """
+    async def fetch(fleet_ids: List[str]) -> dict:
+        fetched = await gather_limited(
+            (api.request("GET", f"fleets/{i}") for i in fleet_ids),
+            limit=concurrency,
+            return_exceptions=True
+        )
+        return {
+            i: Fleet.from_api(api, r) if isinstance(r, dict) else r
+            for i, r in zip(fleet_ids, fetched)
+        }
+    return BatchLoader(fetch)
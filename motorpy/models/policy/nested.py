@@ -1,7 +1,11 @@
 from datetime import datetime
-from pydantic import Field
-from typing import Optional
+from pydantic import Field, PrivateAttr, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
+from typing import Any, Dict, Optional, Tuple
 
+from motorpy.api.idempotency import idempotent_request
+from motorpy.models.custom import model_state
 from .enums import PolicyGroup
 
 from .base import PolicyBase
@@ -26,6 +30,108 @@ from .telematics import PolicyTelematics
 from .rates import PolicyRates
 from .premium import PolicyBasePremium
 
+# marks a lazy section that was not in the API response, the field default is used on access
+_MISSING = object()
+
+
+def driver_approval_sections(agreed_at: datetime = None) -> Dict[str, dict]:
+    "The policy sections of a driver approval."
+    return {"driver": {"agreedAt": agreed_at or datetime.utcnow()}}
+
+
+def approval_sections(approved_by_id: str = None, approved_at: datetime = None) -> Dict[str, dict]:
+    "The policy sections of an internal approval."
+    body = {"approval": {"approvedAt": approved_at or datetime.utcnow()}}
+    if approved_by_id:
+        body["approval"]["approvedBy"] = approved_by_id
+    return body
+
+
+def cancellation_sections(message: str = None, cancelled_at: datetime = None) -> Dict[str, dict]:
+    "The policy sections of a cancellation."
+    body = {"cancellation": {"cancelledAt": cancelled_at or datetime.utcnow()}}
+    if message:
+        body["cancellation"]["message"] = message
+    return body
+
+
+def sections_data(body: Dict[str, dict]) -> Dict[str, dict]:
+    "The API formatted PATCH body of policy sections."
+    return {
+        section: {k: v.isoformat() if isinstance(v, datetime) else v for k, v in values.items()}
+        for section, values in body.items()
+    }
+
+
+def target_params(group: PolicyGroup,
+                  record_id: str,
+                  driver_id: str = None,
+                  vehicle_id: str = None) -> Tuple[str, Dict[str, str]]:
+    """Check the records a policy of a group is created on, see `Policy.create`.
+
+    Args:
+        group (PolicyGroup): policy group
+        record_id (str): record id, to place policy on
+        driver_id (str, optional): driver id, required for some fleet policies. Defaults to None.
+        vehicle_id (str, optional): vehicle id, required for some fleet policies. Defaults to None.
+
+    Raises:
+        ValueError: a required id is missing, or an id is repeated.
+
+    Returns:
+        Tuple[str, Dict[str, str]]: the record id and the query params of the create request.
+    """
+    params = {}
+
+    if group == PolicyGroup.D:
+        # * D
+        if driver_id is not None:
+            # just in case the driver id is not the same as the record id
+            record_id = driver_id if record_id != driver_id else record_id
+    elif group == PolicyGroup.DRV:
+        # * DRV
+        # record id is all that is needed
+        pass
+    elif group == PolicyGroup.RV:
+        # * RV
+        pass
+    elif group == PolicyGroup.FD:
+        # * FD
+        if driver_id is None:
+            raise ValueError("driver_id must be supplied for FD policies")
+        params["driverId"] = driver_id
+
+        if record_id == driver_id:
+            raise ValueError(
+                "record_id (fleet id) must not be the same as driver_id for FD policies")
+    elif group == PolicyGroup.FDRV:
+        # * FDRV
+        if driver_id is None:
+            raise ValueError(
+                "driver_id must be supplied for FDRV policies")
+        if vehicle_id is None:
+            raise ValueError(
+                "vehicle_id must be supplied for FDRV policies")
+        params["driverId"] = driver_id
+        params["vehicleId"] = vehicle_id
+
+        if record_id == driver_id or record_id == vehicle_id:
+            raise ValueError(
+                "record_id (fleet id) must not be the same as driver_id or vehicle_id for FDRV policies")
+    elif group == PolicyGroup.FRV:
+        # * FRV
+        if vehicle_id is None:
+            raise ValueError(
+                "vehicle_id must be supplied for FRV policies")
+
+        if record_id == vehicle_id:
+            raise ValueError(
+                "record_id (fleet id) must not be the same as vehicle_id for FRV policies")
+
+        params["vehicleId"] = vehicle_id
+
+    return record_id, params
+
 
 class Policy(PolicyBase):
     approval: PolicyApproval = Field(
@@ -109,9 +215,121 @@ class Policy(PolicyBase):
         description="The telematics details for the policy"
     )
 
+    # raw section data waiting to be validated, only set by parse_lazy
+    _lazy_sections: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
     class Config:
         allow_population_by_field_name = True
 
+    @classmethod
+    def parse_lazy(cls, **data) -> 'Policy':
+        """Create a policy where the nested sections (rates, premium, fees, etc.) are validated on first access.
+
+        The top level fields are validated as normal.
+        The raw data for each section is kept and only parsed when the section is read or the policy is exported,
+        which makes scanning many policies for a few fields (eg. duration, approval) much cheaper.
+
+        Args:
+            **data: the policy data, as returned from the API.
+
+        Raises:
+            ValidationError: a top level field is invalid. Section errors are raised when the section is accessed.
+
+        Returns:
+            Policy: the policy.
+        """
+        values: Dict[str, Any] = {}
+        fields_set = set()
+        pending: Dict[str, Any] = {}
+        errors = []
+
+        for name, field in cls.__fields__.items():
+            if field.alias in data:
+                raw = data[field.alias]
+            elif name in data:
+                raw = data[name]
+            else:
+                raw = _MISSING
+
+            if name in POLICY_SECTIONS:
+                pending[name] = raw
+                if raw is not _MISSING:
+                    fields_set.add(name)
+                continue
+
+            if raw is _MISSING:
+                if field.required:
+                    errors.append(ErrorWrapper(MissingError(), loc=field.alias))
+                else:
+                    values[name] = field.get_default()
+                continue
+
+            value, error = field.validate(raw, values, loc=field.alias, cls=cls)
+            if error:
+                errors.append(error)
+            else:
+                values[name] = value
+                fields_set.add(name)
+
+        if errors:
+            raise ValidationError(errors, cls)
+
+        model = cls.__new__(cls)
+        object.__setattr__(model, '__dict__', values)
+        object.__setattr__(model, '__fields_set__', fields_set)
+        model._init_private_attributes()
+        model._lazy_sections = pending
+        # the sections are added to the snapshot when they are loaded
+        return model.snapshot()
+
+    def _load_section(self, name: str) -> None:
+        "Validate a pending section and store it on the model."
+        raw = self._lazy_sections.pop(name)
+        if name in self.__dict__:
+            # assigned before it was ever read
+            return
+        field = self.__fields__[name]
+        if raw is _MISSING:
+            value = field.get_default()
+        else:
+            value, error = field.validate(raw, {}, loc=field.alias, cls=self.__class__)
+            if error:
+                raise ValidationError([error], self.__class__)
+        self.__dict__[name] = value
+        if self._loaded is not None:
+            self._loaded[field.alias] = model_state(value)
+
+    def _load_sections(self) -> None:
+        "Validate all pending sections, keeping the field order of an eagerly parsed policy."
+        if not self._lazy_sections:
+            return
+        for name in list(self._lazy_sections):
+            self._load_section(name)
+        ordered = {k: self.__dict__[k] for k in self.__fields__ if k in self.__dict__}
+        ordered.update(self.__dict__)
+        object.__setattr__(self, '__dict__', ordered)
+
+    def __getattr__(self, name: str) -> Any:
+        # only called when normal lookup fails, ie. for sections that have not been loaded yet
+        if not name.startswith('_'):
+            pending = self._lazy_sections
+            if pending and name in pending:
+                self._load_section(name)
+                return self.__dict__[name]
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    def _iter(self, *args, **kwargs):
+        self._load_sections()
+        return super()._iter(*args, **kwargs)
+
+    def __repr_args__(self):
+        self._load_sections()
+        return super().__repr_args__()
+
+    def dict(self, **kwargs) -> dict:
+        self._load_sections()
+        return super().dict(**kwargs)
+
     def is_cancelled(self) -> bool:
         """
         Is the policy cancelled?
@@ -184,61 +402,61 @@ class Policy(PolicyBase):
         Approve the the policy on behalf of the driver.
 
         Args:
-            refresh: Refresh the policy after approval.
+            refresh: Refresh the policy after approval. The policy is updated from the response if the API returns it,
+                otherwise it is fetched again.
         """
-        self._check_id()
-
-        body = {
-            "driver": {
-                "agreedAt": datetime.utcnow().isoformat()
-            }
-        }
-
-        await self.api.request("PATCH", f"policies/{self.id}", body=body)
-        if refresh:
-            await self.refresh()
+        await self._patch_sections(driver_approval_sections(), refresh=refresh)
 
     async def internal_approve(self, refresh=True, approved_by_id: str = None) -> None:
         """
         Approve the the policy internally.
 
         Args:
-            refresh: Refresh the policy after approval.
+            refresh: Refresh the policy after approval. The policy is updated from the response if the API returns it,
+                otherwise it is fetched again.
         """
-        self._check_id()
-
-        body = {
-            "approval": {
-                "approvedAt": datetime.utcnow().isoformat()
-            }
-        }
-        if approved_by_id:
-            body["approval"]["approvedBy"] = approved_by_id
-
-        await self.api.request("PATCH", f"policies/{self.id}", body=body)
-        if refresh:
-            await self.refresh()
+        await self._patch_sections(approval_sections(approved_by_id), refresh=refresh)
 
     async def cancel(self, refresh=True, message: str = None) -> None:
         """
         Cancel the policy.
 
         Args:
-            refresh: Refresh the policy after cancellation.
+            refresh: Refresh the policy after cancellation. The policy is updated from the response if the API returns it,
+                otherwise it is fetched again.
         """
-        self._check_id()
-
-        body = {
-            "cancellation": {
-                "cancelledAt": datetime.utcnow().isoformat()
-            }
-        }
-        if message:
-            body["cancellation"]["message"] = message
+        await self._patch_sections(cancellation_sections(message), refresh=refresh)
 
-        await self.api.request("PATCH", f"policies/{self.id}", body=body)
-        if refresh:
+    async def _patch_sections(self, body: Dict[str, dict], refresh: bool) -> None:
+        "PATCH policy sections and update the model in place, from the response where the API returns the policy."
+        self._check_id()
+        res = await self.api.request("PATCH", f"/policy/{self.id}", data=sections_data(body))
+        if isinstance(res, dict) and res.get("id") == self.id:
+            self._reload(res)
+        elif refresh:
             await self.refresh()
+        else:
+            self._apply_sections(body)
+
+    def _apply_sections(self, body: Dict[str, dict]) -> None:
+        "Merge the sent section values into the model, they are now saved in the API."
+        names = {f.alias: name for name, f in self.__fields__.items()}
+        for alias, values in body.items():
+            name = names[alias]
+            current = getattr(self, name)
+            section = current.__class__(**{**current.dict(by_alias=True, exclude_unset=True), **values})
+            setattr(self, name, section)
+            loaded = self._loaded_state()
+            if loaded is not None and isinstance(loaded.get(alias), dict):
+                # only the sent values are saved, other changes to the section are still pending
+                state = model_state(section)
+                loaded[alias].update({k: state[k] for k in values if k in state})
+
+    def _reload(self, data: dict) -> None:
+        "Replace the model fields with an API response."
+        api = self.api
+        self.__init__(**data, api=api)
+        self.snapshot()
 
     def _check_id(self) -> None:
         if not self.id:
@@ -249,12 +467,7 @@ class Policy(PolicyBase):
         Refresh the model from the API.
         """
         self._check_id()
-        api = self.api
-        self.__init__(
-            **(await self.api.request("GET",
-                                      f"/policy/{self.id}")),
-            api=api
-        )
+        self._reload(await self.api.request("GET", f"/policy/{self.id}"))
 
     async def delete(self) -> None:
         """
@@ -277,8 +490,7 @@ class Policy(PolicyBase):
 
         return await self._save(
             url=f"/policy/{self.id}",
-            fields=fields,
-            exclude=None
+            fields=fields
         )
 
     async def update(self, persist: bool = False, **kwargs) -> None:
@@ -300,7 +512,8 @@ class Policy(PolicyBase):
                      api_handler,
                      record_id: str,
                      driver_id: str = None,
-                     vehicle_id: str = None) -> 'Policy':
+                     vehicle_id: str = None,
+                     idempotency_key: str = None) -> 'Policy':
         """
         Create a policy.
 
@@ -313,6 +526,8 @@ class Policy(PolicyBase):
             policy (Policy, optional): policy to create. This can be left None and a new policy will be created using the org defaults. Defaults to None.
             driver_id (str, optional): driver id, required for some fleet policies. Defaults to None.
             vehicle_id (str, optional): vehicle id, required for some fleet policies. Defaults to None.
+            idempotency_key (str, optional): retries with the same key return the policy created by the first call,
+                see `motorpy.api.idempotency`. Defaults to None.
 
         For policy groups:
 
@@ -326,54 +541,7 @@ class Policy(PolicyBase):
         Returns:
             Policy: created policy
         """
-        params = {}
-
-        if self.policy_group == PolicyGroup.D:
-            # * D
-            if driver_id is not None:
-                # just in case the driver id is not the same as the record id
-                record_id = driver_id if record_id != driver_id else record_id
-        elif self.policy_group == PolicyGroup.DRV:
-            # * DRV
-            # record id is all that is needed
-            pass
-        elif self.policy_group == PolicyGroup.RV:
-            # * RV
-            pass
-        elif self.policy_group == PolicyGroup.FD:
-            # * FD
-            if driver_id is None:
-                raise ValueError("driver_id must be supplied for FD policies")
-            params["driverId"] = driver_id
-
-            if record_id == driver_id:
-                raise ValueError(
-                    "record_id (fleet id) must not be the same as driver_id for FD policies")
-        elif self.policy_group == PolicyGroup.FDRV:
-            # * FDRV
-            if driver_id is None:
-                raise ValueError(
-                    "driver_id must be supplied for FDRV policies")
-            if vehicle_id is None:
-                raise ValueError(
-                    "vehicle_id must be supplied for FDRV policies")
-            params["driverId"] = driver_id
-            params["vehicleId"] = vehicle_id
-
-            if record_id == driver_id or record_id == vehicle_id:
-                raise ValueError(
-                    "record_id (fleet id) must not be the same as driver_id or vehicle_id for FDRV policies")
-        elif self.policy_group == PolicyGroup.FRV:
-            # * FRV
-            if vehicle_id is None:
-                raise ValueError(
-                    "vehicle_id must be supplied for FRV policies")
-
-            if record_id == vehicle_id:
-                raise ValueError(
-                    "record_id (fleet id) must not be the same as vehicle_id for FRV policies")
-
-            params["vehicleId"] = vehicle_id
+        record_id, params = target_params(self.policy_group, record_id, driver_id, vehicle_id)
 
         import pprint
         pp = pprint.PrettyPrinter(indent=4)
@@ -383,13 +551,19 @@ class Policy(PolicyBase):
             exclude_unset=True
         ))
 
-        res = await api_handler.request("POST",
-                                        f"policy/{record_id}",
-                                        params=params,
-                                        data=self.dict(
-                                            by_alias=True,
-                                            exclude_unset=True
-                                        ))
+        res = await idempotent_request(api_handler,
+                                       "POST",
+                                       f"policy/{record_id}",
+                                       key=idempotency_key,
+                                       params=params,
+                                       data=self.dict(
+                                           by_alias=True,
+                                           exclude_unset=True
+                                       ))
         # reset with the new policy created by the API
         self.__init__(api=api_handler, **res)
-        return self
+        return self.snapshot()
+
+
+# nested sections of the policy, these are validated on first access with Policy.parse_lazy
+POLICY_SECTIONS = frozenset(Policy.__fields__) - frozenset(PolicyBase.__fields__)
@@ -0,0 +1,56 @@
+import pytest
+from pydantic import ValidationError
+from ..nested import Policy, POLICY_SECTIONS
+from ..rates import PolicyRates
+from .const import FULL
+
+
+class TestLazy:
+
+    def test_sections_pending(self):
+        p = Policy.parse_lazy(**FULL)
+        assert p.id == "DRV-123"
+        assert set(p._lazy_sections) == POLICY_SECTIONS
+        assert "rates" not in p.__dict__
+
+        # validated on access
+        assert isinstance(p.rates, PolicyRates)
+        assert p.rates.rates_value == 0.5
+        assert "rates" not in p._lazy_sections
+        assert "rates" in p.__dict__
+
+    def test_matches_eager(self):
+        eager = Policy(**FULL)
+        lazy = Policy.parse_lazy(**FULL)
+
+        assert lazy.is_live() == eager.is_live()
+        assert lazy.__fields_set__ == eager.__fields_set__
+        assert lazy.dict(by_alias=True, exclude_unset=True) == eager.dict(by_alias=True, exclude_unset=True)
+        assert list(lazy.__dict__) == list(eager.__dict__)
+        assert lazy == eager
+
+    def test_missing_sections_use_defaults(self):
+        p = Policy.parse_lazy(id="DRV-123")
+        assert p.is_approved() is False
+        assert "approval" not in p.__fields_set__
+        assert p.dict(exclude_unset=True) == {"id": "DRV-123"}
+
+    def test_assigned_before_access(self):
+        p = Policy.parse_lazy(**FULL)
+        p.rates = PolicyRates(rates_value=2.0)
+        p.dict()
+        assert p.rates.rates_value == 2.0
+
+    def test_section_errors_raised_on_access(self):
+        p = Policy.parse_lazy(id="DRV-123", rates={"value": -1})
+        with pytest.raises(ValidationError):
+            p.rates
+
+    def test_top_level_errors_raised(self):
+        with pytest.raises(ValidationError):
+            Policy.parse_lazy(id="DRV-123", sumInsured=-1)
+
+    def test_unknown_attribute(self):
+        p = Policy.parse_lazy(id="DRV-123")
+        with pytest.raises(AttributeError):
+            p.not_a_field
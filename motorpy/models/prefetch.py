@@ -0,0 +1,194 @@
+"""
+Prefetching related collections for listings.
+
+Calling `driver.list_vehicles()` for every driver of a listing makes one request per driver, one after the other.
+With `prefetch`, the related collections of each page are fetched concurrently (with bounded concurrency)
+before the page is yielded, and attached to the models:
+
+```python
+async for driver in motor.list_drivers(prefetch=["vehicles", "fleets"]):
+    vehicles = await driver.list_vehicles()  # no request
+    fleets = driver.get_prefetched("fleets")
+```
+
+The list methods of the models (`list_vehicles`, `list_policies` with default arguments, `list_fleets`, etc.)
+return the prefetched collection instead of making a request. `refresh()` drops the prefetched collections.
+
+Fleets are shared within a listing: each fleet is fetched once per listing (see `motorpy.models.fleets.fleet_loader`).
+"""
+from typing import Any, Awaitable, Callable, Dict, Generator, Iterable, List, Optional, Type
+
+import motorpy.models as models
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY, gather_limited
+
+Fetcher = Callable[[Any, dict], Awaitable[Any]]
+
+
+async def _policies(item: Any, context: dict) -> List['models.Policy']:
+    return [p async for p in item.list_policies()]
+
+
+async def _driver_vehicles(driver: 'models.Driver', context: dict) -> List['models.DriverVehicle']:
+    return await driver.list_vehicles()
+
+
+async def _driver_fleets(driver: 'models.Driver', context: dict) -> List['models.FleetDriver']:
+    "The fleet memberships of a driver, the fleets are fetched for the whole page by `_resolve_fleets`."
+    if driver.fleets:
+        return driver.fleets
+    raw = await driver.api.request("GET", f"drivers/{driver.id}", params={
+        "fleets": True,
+        "risk": False,
+        "address": False,
+        "points": False,
+        "files": False,
+        "contact": False,
+        "occupation": False
+    }) or {}
+    driver.fleets = [models.FleetDriver.from_api(driver.api, f) for f in raw.get("fleets") or []]
+    return driver.fleets
+
+
+async def _resolve_fleets(api: Any, memberships: List[List['models.FleetDriver']], context: dict, concurrency: int) -> List[List['models.Fleet']]:
+    "Fetch the fleets of a page, through the fleet loader of the listing."
+    loader = context.get("fleet_loader")
+    if loader is None:
+        loader = context["fleet_loader"] = models.fleets.fleet_loader(api, concurrency)
+    fleet_ids = list(dict.fromkeys(fd.fleet_id for page in memberships for fd in page if fd.fleet_id))
+    fleets = dict(zip(fleet_ids, await gather_limited((loader.load(i) for i in fleet_ids), limit=concurrency)))
+    return [
+        [fleets[i] for i in dict.fromkeys(fd.fleet_id for fd in page if fd.fleet_id) if fleets[i]]
+        for page in memberships
+    ]
+
+
+async def _fleet_driver_assignments(fleet_driver: 'models.FleetDriver', context: dict) -> List['models.FleetDriverVehicleAssignment']:
+    if not fleet_driver.id:
+        return []
+    fleet: 'models.Fleet' = context["fleet"]
+    return [a async for a in fleet.list_driver_vehicle_assignments(fleet_driver.id)]
+
+
+async def _fleet_driver_policies(fleet_driver: 'models.FleetDriver', context: dict) -> List['models.Policy']:
+    if not fleet_driver.id:
+        return []
+    fleet: 'models.Fleet' = context["fleet"]
+    return [
+        models.Policy.from_api(fleet_driver.api, p)
+        async for p in fleet_driver.api.batch_fetch("policy", params={"fleetIds": fleet.id, "driverIds": fleet_driver.id})
+    ]
+
+
+# relation name -> fetcher, by model name
+# fetchers are called per model, with bounded concurrency
+RELATIONS: Dict[str, Dict[str, Fetcher]] = {
+    "Driver": {
+        "vehicles": _driver_vehicles,
+        "policies": _policies,
+        "fleets": _driver_fleets,
+    },
+    "Vehicle": {
+        "policies": _policies,
+    },
+    "FleetDriver": {
+        "assignments": _fleet_driver_assignments,
+        "policies": _fleet_driver_policies,
+    },
+}
+
+
+Resolver = Callable[[Any, List[Any], dict, int], Awaitable[List[Any]]]
+
+# relation name -> resolver, called with the fetched values of a page, to fetch shared models
+RESOLVERS: Dict[str, Resolver] = {
+    "fleets": _resolve_fleets,
+}
+
+
+def check_relations(model_cls: Type, relations: Iterable[str]) -> List[str]:
+    """Validate the relations to prefetch for a model.
+
+    Args:
+        model_cls (Type): the model class.
+        relations (Iterable[str]): the relation names.
+
+    Returns:
+        List[str]: the unique relation names.
+    """
+    available = RELATIONS.get(model_cls.__name__, {})
+    relations = list(dict.fromkeys(relations))
+    for relation in relations:
+        if relation not in available:
+            raise ValueError(f"Invalid prefetch relation: {relation} - can be one of {set(available)}")
+    return relations
+
+
+async def prefetch(items: List['models.PrivateAPIHandler'],
+                   relations: Iterable[str],
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   context: Optional[dict] = None) -> None:
+    """Fetch related collections for models and attach them, see `get_prefetched`.
+
+    Args:
+        items (List[PrivateAPIHandler]): the models, of the same class.
+        relations (Iterable[str]): the relation names.
+        concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+        context (Optional[dict], optional): shared between calls, eg. the parent fleet and the fetched fleets. Defaults to None.
+    """
+    if not items:
+        return
+    relations = check_relations(type(items[0]), relations)
+    fetchers = RELATIONS[type(items[0]).__name__]
+    context = context if context is not None else {}
+    pairs = [(item, relation) for item in items for relation in relations]
+    results = await gather_limited((fetchers[r](item, context) for item, r in pairs), limit=concurrency)
+    for relation in relations:
+        resolver = RESOLVERS.get(relation)
+        if resolver is None:
+            continue
+        positions = [n for n, (_, r) in enumerate(pairs) if r == relation]
+        resolved = await resolver(items[0].api, [results[n] for n in positions], context, concurrency)
+        for n, value in zip(positions, resolved):
+            results[n] = value
+    for (item, relation), value in zip(pairs, results):
+        item._prefetched[relation] = value
+
+
+async def iter_prefetched(api: Any,
+                          endpoint: str,
+                          model_cls: Type['models.PrivateAPIHandler'],
+                          relations: Iterable[str],
+                          params: Optional[dict] = None,
+                          page_size: int = 50,
+                          max_records: Optional[int] = None,
+                          concurrency: int = DEFAULT_CONCURRENCY,
+                          context: Optional[dict] = None) -> Generator['models.PrivateAPIHandler', None, None]:
+    """List models page by page, prefetching the related collections of each page.
+
+    Args:
+        api (APIHandler): the API handler.
+        endpoint (str): the listing endpoint.
+        model_cls (Type[PrivateAPIHandler]): the model class.
+        relations (Iterable[str]): the relation names.
+        params (dict, optional): query parameters. Defaults to None.
+        page_size (int, optional): records per request. Defaults to 50.
+        max_records (int, optional): the maximum number of models. Defaults to None.
+        concurrency (int, optional): the maximum number of prefetch requests at once. Defaults to 10.
+        context (Optional[dict], optional): shared with the fetchers. Defaults to None.
+
+    Yields:
+        PrivateAPIHandler: the models, with the relations attached.
+    """
+    relations = check_relations(model_cls, relations)
+    context = context if context is not None else {}
+    count = 0
+    async for page in api.batch_fetch_pages(endpoint, params=params, limit=page_size):
+        if max_records is not None:
+            page = page[:max_records - count]
+        items = [model_cls.from_api(api, raw) for raw in page]
+        await prefetch(items, relations, concurrency=concurrency, context=context)
+        for item in items:
+            yield item
+        count += len(items)
+        if max_records is not None and count >= max_records:
+            break
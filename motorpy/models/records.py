@@ -0,0 +1,180 @@
+"""
+Compact read-only records.
+
+A record holds the same fields as a model in `__slots__`, without a `__dict__`, `__fields_set__` or validation state.
+They are meant for large listings (eg. whole-org snapshots) where the full models use too much memory.
+
+Record classes are generated once per model class, see `record_type`.
+Values are coerced like `motorpy.models.trusted`: datetimes, dates and enums are parsed,
+nested models become nested records and everything else (including fields with custom validators) is kept as returned by the API.
+
+Use `to_model()` to get the full model when it is needed.
+"""
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic.fields import ModelField, SHAPE_LIST, SHAPE_SET, SHAPE_SINGLETON
+
+from .trusted import _REQUIRED, _default, _item_converter, _optional, Converter
+
+
+class Record:
+    "Base class for read-only model records."
+    __slots__ = ()
+
+    # set on the generated classes
+    _model: Type[BaseModel] = None
+    # (name, alias, converter, default, default factory)
+    _plan: Tuple[Tuple[str, str, Optional[Converter], Any, Optional[Callable[[], Any]]], ...] = ()
+
+    @classmethod
+    def from_api(cls, data: dict, **values) -> 'Record':
+        """Create a record from an API response.
+
+        Args:
+            data (dict): the API data, keyed by alias (field names are accepted as well).
+            **values: field values to set as is, by field name (eg. `api`).
+
+        Returns:
+            Record: the record.
+        """
+        record = object.__new__(cls)
+        for name, alias, convert, default, default_factory in cls._plan:
+            if name in values:
+                value = values[name]
+            elif alias in data:
+                value = data[alias]
+                if convert is not None:
+                    value = convert(value)
+            elif name in data:
+                value = data[name]
+                if convert is not None:
+                    value = convert(value)
+            elif default_factory is not None:
+                value = default_factory()
+            else:
+                value = default
+            object.__setattr__(record, name, value)
+        return record
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, f[0]) == getattr(other, f[0]) for f in self._plan)
+
+    def __repr__(self) -> str:
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name, *_ in self._plan if name not in _HIDDEN
+        )
+        return f"{self.__class__.__name__}({values})"
+
+    def to_dict(self, by_alias: bool = False) -> dict:
+        """Export the record as a dict, nested records are exported as dicts.
+
+        Args:
+            by_alias (bool, optional): whether to use the alias for the field name. Defaults to False.
+
+        Returns:
+            dict: the record fields, excluding the API handler.
+        """
+        result = {}
+        for name, alias, *_ in self._plan:
+            if name in _HIDDEN:
+                continue
+            result[alias if by_alias else name] = _export(getattr(self, name), by_alias)
+        return result
+
+    def to_model(self, api: Any = None) -> BaseModel:
+        """Convert the record to the full model.
+
+        Args:
+            api (APIHandler, optional): the API handler for the model. Defaults to the record's API handler.
+
+        Returns:
+            BaseModel: the model.
+        """
+        data = self.to_dict(by_alias=True)
+        if "api" in self._model.__fields__:
+            return self._model.from_api(api or getattr(self, "api"), data)
+        return self._model(**data)
+
+
+# fields that are not exported from records
+_HIDDEN = frozenset({"api"})
+
+_RECORD_TYPES: Dict[type, Type[Record]] = {}
+
+
+def _export(value: Any, by_alias: bool) -> Any:
+    if isinstance(value, Record):
+        return value.to_dict(by_alias=by_alias)
+    if isinstance(value, tuple):
+        return [_export(v, by_alias) for v in value]
+    return value
+
+
+def _nested_record(model_cls: Type[BaseModel]) -> Converter:
+    def convert(value: Any) -> Any:
+        if isinstance(value, dict):
+            return record_type(model_cls).from_api(value)
+        return value
+    return convert
+
+
+def _field_converter(field: ModelField) -> Optional[Converter]:
+    if field.class_validators:
+        # custom validators can have side effects, keep the raw value
+        return None
+    if field.shape == SHAPE_SINGLETON:
+        convert = _item_converter(field.type_, _nested_record)
+        return _optional(convert) if convert else None
+    if field.shape in (SHAPE_LIST, SHAPE_SET):
+        convert = _item_converter(field.type_, _nested_record)
+        if convert is None:
+            return None
+
+        def convert_items(value: Any) -> Any:
+            if value is None:
+                return None
+            # tuples keep records immutable
+            return tuple(convert(v) for v in value)
+        return convert_items
+    return None
+
+
+def _record_default(field: ModelField) -> Tuple[Any, Optional[Callable[[], Any]]]:
+    default, default_factory = _default(field)
+    # records have no required fields, a missing value is None
+    return (None if default is _REQUIRED else default), default_factory
+
+
+def record_type(model_cls: Type[BaseModel]) -> Type[Record]:
+    """Get the record class for a model class, generating it on first use.
+
+    Args:
+        model_cls (Type[BaseModel]): the pydantic model class.
+
+    Returns:
+        Type[Record]: the record class, named `<Model>Record`.
+    """
+    cls = _RECORD_TYPES.get(model_cls)
+    if cls is None:
+        plan = tuple(
+            (name, field.alias or name, _field_converter(field), *_record_default(field))
+            for name, field in model_cls.__fields__.items()
+        )
+        cls = type(f"{model_cls.__name__}Record", (Record,), {
+            "__slots__": tuple(f[0] for f in plan),
+            "__module__": __name__,
+            "__doc__": f"Read-only record of `{model_cls.__module__}.{model_cls.__name__}`.",
+            "_model": model_cls,
+            "_plan": plan,
+        })
+        _RECORD_TYPES[model_cls] = cls
+    return cls
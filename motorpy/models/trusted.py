@@ -0,0 +1,185 @@
+"""
+Trusted model construction.
+
+Responses from the Motor API are already validated server side,
+so bulk listings can skip full pydantic validation and populate models directly.
+A construction plan (alias map, defaults and converters) is built once per model class and cached.
+
+Only the coercions the models rely on are applied:
+
+- datetimes and dates are parsed from ISO strings
+- enums are cast to the enum type
+- nested models (and lists/sets of them) are constructed recursively
+
+Fields with custom validators (eg. `Driver.fleets`) are validated as normal.
+Other values are used as is, so an int is not cast to a float for example.
+"""
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from pydantic.datetime_parse import parse_date, parse_datetime
+from pydantic.fields import ModelField, SHAPE_LIST, SHAPE_SET, SHAPE_SINGLETON
+
+
+Converter = Callable[[Any], Any]
+
+
+# defaults of these types can be shared between instances instead of copied
+_IMMUTABLE = (type(None), str, bytes, int, float, bool, Enum, tuple, frozenset, date)
+
+# marks a required field without a default
+_REQUIRED = object()
+
+
+class _ModelPlan:
+    "The cached construction plan for a model class."
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: List[Tuple[str, str, Optional[Converter], Any, Optional[Callable[[], Any]]]]) -> None:
+        # (name, alias, converter, default, default factory)
+        # converter is None when the value is used as is
+        # the factory is None when the default can be shared
+        self.fields = fields
+
+
+_PLANS: Dict[type, _ModelPlan] = {}
+
+
+def _validate_field(model_cls: type, field: ModelField) -> Converter:
+    def convert(value: Any) -> Any:
+        value, error = field.validate(value, {}, loc=field.alias, cls=model_cls)
+        if error:
+            raise ValidationError([error], model_cls)
+        return value
+    return convert
+
+
+def _nested(model_cls: Type[BaseModel]) -> Converter:
+    def convert(value: Any) -> Any:
+        if isinstance(value, dict):
+            return construct_trusted(model_cls, value)
+        return value
+    return convert
+
+
+def _enum(enum_cls: Type[Enum]) -> Converter:
+    def convert(value: Any) -> Any:
+        return enum_cls(value)
+    return convert
+
+
+def _item_converter(type_: Any, nested: Callable[[Type[BaseModel]], Converter] = _nested) -> Optional[Converter]:
+    """Converter for a single value of `type_`, None if the value is used as is.
+    `nested` makes the converter of nested models (eg. records instead of models)."""
+    if not isinstance(type_, type):
+        # Any, Union, etc.
+        return None
+    if issubclass(type_, datetime):
+        return parse_datetime
+    if issubclass(type_, date):
+        return parse_date
+    if issubclass(type_, Enum):
+        return _enum(type_)
+    if issubclass(type_, BaseModel):
+        return nested(type_)
+    return None
+
+
+def _optional(convert: Converter) -> Converter:
+    def wrapper(value: Any) -> Any:
+        if value is None:
+            return None
+        return convert(value)
+    return wrapper
+
+
+def _field_converter(model_cls: type, field: ModelField) -> Optional[Converter]:
+    if field.class_validators or field.type_.__class__.__name__ == "ForwardRef":
+        return _validate_field(model_cls, field)
+
+    if field.shape == SHAPE_SINGLETON:
+        convert = _item_converter(field.type_)
+        return _optional(convert) if convert else None
+
+    if field.shape in (SHAPE_LIST, SHAPE_SET):
+        convert = _item_converter(field.type_)
+        if convert is None:
+            return None
+        container = list if field.shape == SHAPE_LIST else set
+
+        def convert_items(value: Any) -> Any:
+            if value is None:
+                return None
+            return container(convert(v) for v in value)
+        return convert_items
+
+    # mappings, tuples etc. are rare in the models, validate them
+    return _validate_field(model_cls, field)
+
+
+def _default(field: ModelField) -> Tuple[Any, Optional[Callable[[], Any]]]:
+    if field.required:
+        return _REQUIRED, None
+    if field.default_factory is None and isinstance(field.default, _IMMUTABLE):
+        return field.default, None
+    return None, field.get_default
+
+
+def get_plan(model_cls: type) -> _ModelPlan:
+    """Get the construction plan for a model class, building it on first use.
+
+    Args:
+        model_cls (type): the pydantic model class.
+
+    Returns:
+        _ModelPlan: the plan.
+    """
+    plan = _PLANS.get(model_cls)
+    if plan is None:
+        plan = _ModelPlan([
+            (name, field.alias, _field_converter(model_cls, field), *_default(field))
+            for name, field in model_cls.__fields__.items()
+        ])
+        _PLANS[model_cls] = plan
+    return plan
+
+
+def construct_trusted(model_cls: Type[BaseModel], data: dict, **values) -> BaseModel:
+    """Construct a model from trusted API data without running validation.
+
+    Args:
+        model_cls (Type[BaseModel]): the model class.
+        data (dict): the API data, keyed by alias (field names are accepted as well).
+        **values: field values to set as is, by field name (eg. `api`).
+
+    Returns:
+        BaseModel: the model.
+    """
+    fields_values: Dict[str, Any] = {}
+    fields_set = set()
+
+    for name, alias, convert, default, default_factory in get_plan(model_cls).fields:
+        if name in values:
+            fields_values[name] = values[name]
+            fields_set.add(name)
+            continue
+        if alias in data:
+            value = data[alias]
+        elif name in data:
+            value = data[name]
+        else:
+            if default_factory is not None:
+                fields_values[name] = default_factory()
+            elif default is not _REQUIRED:
+                fields_values[name] = default
+            continue
+        fields_values[name] = convert(value) if convert is not None else value
+        fields_set.add(name)
+
+    model = model_cls.__new__(model_cls)
+    object.__setattr__(model, "__dict__", fields_values)
+    object.__setattr__(model, "__fields_set__", fields_set)
+    model._init_private_attributes()
+    return model
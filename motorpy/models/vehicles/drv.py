@@ -1,6 +1,6 @@
 import motorpy.models as models
 from pydantic import Field
-from typing import Optional, Generator
+from typing import Optional, Generator, ClassVar, FrozenSet
 from motorpy.models import PrivateAPIHandler
 from datetime import datetime
 from motorpy.models.risk import CommonRisk
@@ -97,6 +97,8 @@ class DriverVehicle(PrivateAPIHandler, CommonRisk):
         default=None
     )
 
+    _save_exclude: ClassVar[FrozenSet[str]] = frozenset({'driver_id', 'vehicle'})
+
     class Config:
         allow_population_by_field_name = True
         anystr_strip_whitespace = True
@@ -131,13 +133,15 @@ class DriverVehicle(PrivateAPIHandler, CommonRisk):
     async def list_policies(self,
                             loose_match: bool = True,
                             is_active_policy: bool = None,
-                            max_records: int = None) -> Generator['models.policies.Policy', None, None]:
+                            max_records: int = None,
+                            lazy: bool = False) -> Generator['models.policy.Policy', None, None]:
         """List policies for this vehicle.
 
         Args:
             loose_match: If True, will match on the DRV ID and the vehicle ID.
             is_active_policy (bool, optional): if True, will return only active policies. Defaults to None.
             max_records (int, optional): maximum number of records to return. Defaults to None.
+            lazy (bool, optional): if True, nested policy sections are validated on first access. Defaults to False.
 
         Returns:
             Generator[Policy]: policies
@@ -156,7 +160,10 @@ class DriverVehicle(PrivateAPIHandler, CommonRisk):
             if max_records is not None:
                 if count >= max_records:
                     break
-            yield models.policies.Policy(api=self.api, **p)
+            if lazy:
+                yield models.policy.Policy.parse_lazy(api=self.api, **p)
+            else:
+                yield models.policy.Policy.from_api(self.api, p)
             count += 1
 
     async def create_policy(self, policy: 'models.policies.Policy' = None) -> 'models.policies.Policy':
@@ -230,6 +237,7 @@ class DriverVehicle(PrivateAPIHandler, CommonRisk):
             api=api,
             driver_id=driver_id
         )
+        self.snapshot()
 
     async def delete(self) -> None:
         """
@@ -252,8 +260,7 @@ class DriverVehicle(PrivateAPIHandler, CommonRisk):
 
         return await self._save(
             url=f"/drivers/{self.driver_id}/vehicles/{self.id}",
-            fields=fields,
-            exclude={'driver_id', 'vehicle'}
+            fields=fields
         )
 
     async def update(self, persist: bool = False, **kwargs) -> None:
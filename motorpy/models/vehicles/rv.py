@@ -1,6 +1,6 @@
 import motorpy.models as models
 from pydantic import Field
-from typing import Optional, Generator
+from typing import Optional, Generator, ClassVar, FrozenSet
 from motorpy.models import PrivateAPIHandler
 from datetime import datetime
 from motorpy.models.risk import CommonRisk
@@ -180,6 +180,8 @@ class Vehicle(PrivateAPIHandler, CommonRisk):
         description="The vehicle type."
     )
 
+    _save_exclude: ClassVar[FrozenSet[str]] = frozenset({'vehicle_type'})
+
     class Config:
         allow_population_by_field_name = True
         anystr_strip_whitespace = True
@@ -200,15 +202,20 @@ class Vehicle(PrivateAPIHandler, CommonRisk):
         """
         return self.source_id
 
-    async def list_policies(self, is_active_policy: bool = None) -> Generator['models.policies.Policy', None, None]:
+    async def list_policies(self, is_active_policy: bool = None, lazy: bool = False) -> Generator['models.policy.Policy', None, None]:
         """List policies for this vehicle.
 
         Args:
             is_active_policy (bool, optional): if True, will return only active policies. Defaults to None.
+            lazy (bool, optional): if True, nested policy sections are validated on first access. Defaults to False.
 
         Returns:
             Generator[Policy]: policies
         """
+        if is_active_policy is None and not lazy and "policies" in self._prefetched:
+            for p in self._prefetched["policies"]:
+                yield p
+            return
         params = {
             "rvIds": self.id
         }
@@ -216,7 +223,10 @@ class Vehicle(PrivateAPIHandler, CommonRisk):
             params["isActivePolicy"] = is_active_policy
 
         async for p in self.api.batch_fetch(f"policy", params=params):
-            yield models.policies.Policy(api=self.api, **p)
+            if lazy:
+                yield models.policy.Policy.parse_lazy(api=self.api, **p)
+            else:
+                yield models.policy.Policy.from_api(self.api, p)
 
     async def create_policy(self, policy: 'models.policies.Policy' = None) -> 'models.policies.Policy':
         """Create a policy for this vehicle.
@@ -285,6 +295,7 @@ class Vehicle(PrivateAPIHandler, CommonRisk):
                                f"/registered-vehicles/{self.id}")),
             api=api
         )
+        self.snapshot()
 
     async def delete(self) -> None:
         """
@@ -307,8 +318,7 @@ class Vehicle(PrivateAPIHandler, CommonRisk):
 
         return await self._save(
             url=f"/registered-vehicles/{self.id}",
-            fields=fields,
-            exclude={'vehicle_type'}
+            fields=fields
         )
 
     async def update(self, persist: bool = False, **kwargs) -> None:
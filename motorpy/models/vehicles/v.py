@@ -256,6 +256,7 @@ class VehicleType(PrivateAPIHandler, CommonRisk):
                                       f"/vehicles/{self.id}")),
             api=api
         )
+        self.snapshot()
 
     async def delete(self) -> None:
         """
@@ -278,8 +279,7 @@ class VehicleType(PrivateAPIHandler, CommonRisk):
 
         return await self._save(
             url=f"/vehicles/{self.id}",
-            fields=fields,
-            exclude=None
+            fields=fields
         )
 
     async def update(self, persist: bool = False, **kwargs) -> None:
@@ -0,0 +1,2 @@
+from .lifecycle import PolicyLifecycle, PolicyLifecycleIndex, ExpiryScheduler
+from .core import Policies, PolicyTarget, DEFAULT_RETRIES, FLEET_POLICY_GROUPS
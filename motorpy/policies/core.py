@@ -0,0 +1,187 @@
+import json
+from datetime import datetime
+from functools import partial
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from pydantic.json import pydantic_encoder
+
+from motorpy.api import APIHandler
+from motorpy.api.idempotency import derive_key, idempotent_request
+from motorpy.models.bulk import BulkResult, run_bulk
+from motorpy.models.policy import Policy
+from motorpy.models.policy.enums import PolicyGroup
+from motorpy.models.policy.nested import (
+    approval_sections, cancellation_sections, driver_approval_sections, sections_data, target_params
+)
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY
+
+# the default number of times a transient failure of a bulk call is retried
+DEFAULT_RETRIES = 3
+
+# the policy groups that bulk_create supports
+FLEET_POLICY_GROUPS = frozenset({PolicyGroup.FD, PolicyGroup.FDRV, PolicyGroup.FRV})
+
+
+class PolicyTarget(NamedTuple):
+    "The fleet member a policy is created for, the driver and vehicle required depend on the policy group."
+    fleet_id: str
+    driver_id: Optional[str] = None
+    vehicle_id: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        "Identifies the target in a bulk result, eg. \"<fleet id>/<driver id>/\"."
+        return "/".join(i or "" for i in self)
+
+
+class Policies:
+    """
+    Org level operations on groups of Policies.
+
+    The bulk lifecycle actions make one PATCH per policy with bounded concurrency and do not refresh the policies.
+    Every policy of a call gets the same timestamp, timeouts and transient API errors (eg. 429, 503) are retried with backoff,
+    and a failed policy does not stop the others:
+
+    ```python
+    result = await motor.policies.bulk_approve(policy_ids, approved_by_id=user_id, concurrency=50)
+    print(result.counts())
+    for item in result.failed:
+        print(item.key, item.status_code, item.error)
+    ```
+    """
+
+    def __init__(self, api: APIHandler) -> None:
+        self.api = api
+
+    async def _bulk_patch(self,
+                          action: str,
+                          policy_ids: Iterable[str],
+                          body: Dict[str, dict],
+                          concurrency: int,
+                          retries: int) -> BulkResult:
+        "PATCH the same policy sections on many policies."
+        # serialized once for every policy
+        data = sections_data(body)
+        return await run_bulk(
+            (
+                (policy_id, action, partial(self.api.request, "PATCH", f"/policy/{policy_id}", data=data))
+                for policy_id in dict.fromkeys(policy_ids)
+            ),
+            concurrency=concurrency,
+            retries=retries
+        )
+
+    async def bulk_driver_approve(self,
+                                  policy_ids: Iterable[str],
+                                  agreed_at: Optional[datetime] = None,
+                                  concurrency: int = DEFAULT_CONCURRENCY,
+                                  retries: int = DEFAULT_RETRIES) -> BulkResult:
+        """Approve policies on behalf of their drivers.
+
+        Args:
+            policy_ids (Iterable[str]): the policy IDs, duplicates are approved once.
+            agreed_at (datetime, optional): when the drivers agreed, in UTC. Defaults to now.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+            retries (int, optional): the number of times a transient failure is retried. Defaults to 3.
+
+        Returns:
+            BulkResult: the result of each policy keyed by ID, the result value is the API response.
+        """
+        return await self._bulk_patch("driver_approve", policy_ids, driver_approval_sections(agreed_at),
+                                      concurrency, retries)
+
+    async def bulk_approve(self,
+                           policy_ids: Iterable[str],
+                           approved_by_id: Optional[str] = None,
+                           approved_at: Optional[datetime] = None,
+                           concurrency: int = DEFAULT_CONCURRENCY,
+                           retries: int = DEFAULT_RETRIES) -> BulkResult:
+        """Approve policies internally.
+
+        Args:
+            policy_ids (Iterable[str]): the policy IDs, duplicates are approved once.
+            approved_by_id (str, optional): the user who approved the policies. Defaults to None.
+            approved_at (datetime, optional): when the policies were approved, in UTC. Defaults to now.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+            retries (int, optional): the number of times a transient failure is retried. Defaults to 3.
+
+        Returns:
+            BulkResult: the result of each policy keyed by ID, the result value is the API response.
+        """
+        return await self._bulk_patch("approve", policy_ids, approval_sections(approved_by_id, approved_at),
+                                      concurrency, retries)
+
+    async def bulk_cancel(self,
+                          policy_ids: Iterable[str],
+                          message: Optional[str] = None,
+                          cancelled_at: Optional[datetime] = None,
+                          concurrency: int = DEFAULT_CONCURRENCY,
+                          retries: int = DEFAULT_RETRIES) -> BulkResult:
+        """Cancel policies.
+
+        Args:
+            policy_ids (Iterable[str]): the policy IDs, duplicates are cancelled once.
+            message (str, optional): the reason for the cancellations. Defaults to None.
+            cancelled_at (datetime, optional): when the policies were cancelled, in UTC. Defaults to now.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+            retries (int, optional): the number of times a transient failure is retried. Defaults to 3.
+
+        Returns:
+            BulkResult: the result of each policy keyed by ID, the result value is the API response.
+        """
+        return await self._bulk_patch("cancel", policy_ids, cancellation_sections(message, cancelled_at),
+                                      concurrency, retries)
+
+    async def bulk_create(self,
+                          template: Policy,
+                          targets: Iterable[PolicyTarget],
+                          concurrency: int = DEFAULT_CONCURRENCY,
+                          retries: int = 0,
+                          idempotency_prefix: Optional[str] = None) -> BulkResult:
+        """Create a fleet policy from the same template for many fleet drivers or vehicles.
+
+        The template is exported once for all targets and the creations are posted concurrently.
+        A target that is invalid for the policy group (eg. a missing vehicle ID for an FRV policy) fails on its own.
+
+        ```python
+        template = Policy(policy_group=PolicyGroup.FD, ...)
+        result = await motor.policies.bulk_create(template, [PolicyTarget(fleet.id, d.id) for d in drivers])
+        ```
+
+        Args:
+            template (Policy): the policy to create, its `policy_group` must be FD, FDRV or FRV.
+            targets (Iterable[PolicyTarget]): (fleet id, driver id, vehicle id) tuples.
+            concurrency (int, optional): the maximum number of requests at once. Defaults to 10.
+            retries (int, optional): the number of times a transient failure is retried,
+                use with `idempotency_prefix` so a retry does not create a second policy. Defaults to 0.
+            idempotency_prefix (str, optional): creates each policy with a key derived from the prefix and the target,
+                see `motorpy.api.idempotency`. Defaults to None.
+
+        Raises:
+            ValueError: the policy group of the template is not a fleet policy group.
+
+        Returns:
+            BulkResult: the result of each target keyed by `PolicyTarget.key`, the result value is the created policy.
+        """
+        group = template.policy_group
+        if group not in FLEET_POLICY_GROUPS:
+            raise ValueError(f"Invalid policy group: {group} - can be one of {set(g.value for g in FLEET_POLICY_GROUPS)}")
+        # exported once for every target
+        data = json.loads(json.dumps(template.dict(by_alias=True, exclude_unset=True), default=pydantic_encoder))
+
+        async def create(target: PolicyTarget) -> Policy:
+            record_id, params = target_params(group, *target)
+            res = await idempotent_request(
+                self.api,
+                "POST",
+                f"policy/{record_id}",
+                key=None if idempotency_prefix is None else derive_key(idempotency_prefix, *target),
+                params=params,
+                data=data
+            )
+            return Policy.parse_lazy(api=self.api, **res)
+
+        operations = []
+        for target in dict.fromkeys(PolicyTarget(*t) for t in targets):
+            operations.append((target.key, "create", partial(create, target)))
+        return await run_bulk(operations, concurrency=concurrency, retries=retries)
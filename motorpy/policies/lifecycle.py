@@ -0,0 +1,647 @@
+"""
+Policy lifecycle index and expiry scheduler.
+
+The index keeps the duration, grace period, approval and cancellation state of many policies in memory,
+so questions such as "which policies are live at time t" do not need to call `Policy.is_live()` on every record.
+"""
+import asyncio
+import heapq
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import motorpy.models as models
+
+_EPOCH = datetime(1970, 1, 1)
+_OPEN_ENDED = float("inf")
+
+# scheduler event kinds
+GRACE = "grace"
+EXPIRED = "expired"
+
+
+def to_timestamp(value: Optional[Union[datetime, date, float, int]]) -> Optional[float]:
+    """Convert a datetime to UTC epoch seconds.
+
+    Naive datetimes are treated as UTC, matching the `datetime.utcnow()` defaults used on the policy models.
+
+    Args:
+        value (Union[datetime, date, float, int], optional): the value to convert. Numbers are returned as is.
+
+    Returns:
+        Optional[float]: epoch seconds, or None if the value is None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds()
+
+
+class PolicyLifecycle:
+    """
+    The lifecycle state of a single policy, as stored in the index.
+
+    Args:
+        policy_id (str): the policy ID.
+        start (float): the policy start in epoch seconds.
+        end (float, optional): the policy end in epoch seconds. None if the policy is open ended.
+        grace_period_secs (float, optional): seconds after the end that the policy is still active. Defaults to 0.
+        is_active (bool, optional): the policy is the active policy for pricing. Defaults to True.
+        is_approved (bool, optional): the policy is approved. Defaults to False.
+        is_cancelled (bool, optional): the policy is cancelled. Defaults to False.
+        is_driver_agreed (bool, optional): the driver has agreed to the policy. Defaults to False.
+    """
+    __slots__ = (
+        "policy_id",
+        "start",
+        "end",
+        "grace_period_secs",
+        "is_active",
+        "is_approved",
+        "is_cancelled",
+        "is_driver_agreed"
+    )
+
+    def __init__(self,
+                 policy_id: str,
+                 start: float,
+                 end: Optional[float] = None,
+                 grace_period_secs: float = 0.0,
+                 is_active: bool = True,
+                 is_approved: bool = False,
+                 is_cancelled: bool = False,
+                 is_driver_agreed: bool = False) -> None:
+        if not policy_id:
+            raise ValueError("policy_id must be set.")
+        self.policy_id = policy_id
+        self.start = start
+        self.end = _OPEN_ENDED if end is None else end
+        self.grace_period_secs = grace_period_secs or 0.0
+        self.is_active = is_active
+        self.is_approved = is_approved
+        self.is_cancelled = is_cancelled
+        self.is_driver_agreed = is_driver_agreed
+
+    @classmethod
+    def from_policy(cls, policy: 'models.policy.Policy', default_grace_period_mins: int = 0) -> 'PolicyLifecycle':
+        """Build the lifecycle state from a policy model.
+
+        Args:
+            policy (Policy): the policy.
+            default_grace_period_mins (int, optional): grace period used when the policy does not set one,
+                eg. `PolicyOrgConfig.duration_grace_period_mins`. Defaults to 0.
+
+        Returns:
+            PolicyLifecycle: the lifecycle state.
+        """
+        duration = policy.duration
+        # an explicit grace period of 0 does not fall back to the default
+        grace_mins = duration.grace_period_mins if "grace_period_mins" in duration.__fields_set__ else None
+        if grace_mins is None:
+            grace_mins = default_grace_period_mins or 0
+        return cls(
+            policy_id=policy.id,
+            start=to_timestamp(duration.start),
+            end=to_timestamp(duration.end),
+            grace_period_secs=grace_mins * 60.0,
+            is_active=policy.is_active,
+            is_approved=policy.is_approved(),
+            is_cancelled=policy.is_cancelled(),
+            is_driver_agreed=policy.is_driver_agreed()
+        )
+
+    @property
+    def is_open_ended(self) -> bool:
+        "The policy has no end date."
+        return self.end == _OPEN_ENDED
+
+    @property
+    def expires_at(self) -> float:
+        "The end of the grace period in epoch seconds (infinity if open ended)."
+        return self.end + self.grace_period_secs
+
+    @property
+    def is_eligible(self) -> bool:
+        "Active, approved, agreed and not cancelled - ie. live whenever the time is within the duration."
+        return (
+            self.is_active
+            and self.is_approved
+            and not self.is_cancelled
+            and self.is_driver_agreed
+        )
+
+    def is_live_at(self, ts: float) -> bool:
+        "Same rules as `Policy.is_live()`, evaluated at `ts` (epoch seconds)."
+        return self.is_eligible and self.start <= ts <= self.expires_at
+
+    def is_in_grace_at(self, ts: float) -> bool:
+        "The policy has ended but is still inside its grace period at `ts`."
+        return self.is_eligible and self.end < ts <= self.expires_at
+
+    def __repr__(self) -> str:
+        return f"PolicyLifecycle({self.policy_id}, start={self.start}, end={self.end})"
+
+
+class _SortedKeys:
+    """
+    Float keys and policy IDs, sorted by key.
+
+    The pairs are kept in blocks of up to `2 * BLOCK` keys, so an insert or remove moves at most one block
+    and finding a position is a bisect over the block maxima, then over a block.
+    """
+    __slots__ = ("_keys", "_ids", "_maxes", "_len")
+
+    BLOCK = 512
+
+    def __init__(self) -> None:
+        self._keys: List[array] = []
+        self._ids: List[List[str]] = []
+        # the last key of each block
+        self._maxes: List[float] = []
+        self._len = 0
+
+    def build(self, pairs: List[Tuple[float, str]]) -> None:
+        pairs.sort()
+        size = self.BLOCK
+        self._keys = [array("d", (k for k, _ in pairs[i:i + size])) for i in range(0, len(pairs), size)]
+        self._ids = [[pid for _, pid in pairs[i:i + size]] for i in range(0, len(pairs), size)]
+        self._maxes = [keys[-1] for keys in self._keys]
+        self._len = len(pairs)
+
+    def insert(self, key: float, policy_id: str) -> None:
+        if not self._keys:
+            self.build([(key, policy_id)])
+            return
+        block = min(bisect_right(self._maxes, key), len(self._keys) - 1)
+        keys, ids = self._keys[block], self._ids[block]
+        pos = bisect_right(keys, key)
+        keys.insert(pos, key)
+        ids.insert(pos, policy_id)
+        self._maxes[block] = keys[-1]
+        self._len += 1
+        if len(keys) > 2 * self.BLOCK:
+            # split the block in half
+            self._keys[block + 1:block + 1] = [keys[self.BLOCK:]]
+            self._ids[block + 1:block + 1] = [ids[self.BLOCK:]]
+            self._maxes.insert(block + 1, keys[-1])
+            del keys[self.BLOCK:]
+            del ids[self.BLOCK:]
+            self._maxes[block] = keys[-1]
+
+    def remove(self, key: float, policy_id: str) -> None:
+        # equal keys may span blocks
+        for block in range(bisect_left(self._maxes, key), len(self._keys)):
+            keys, ids = self._keys[block], self._ids[block]
+            end = bisect_right(keys, key)
+            for pos in range(bisect_left(keys, key), end):
+                if ids[pos] == policy_id:
+                    del keys[pos]
+                    del ids[pos]
+                    self._len -= 1
+                    if keys:
+                        self._maxes[block] = keys[-1]
+                    else:
+                        del self._keys[block]
+                        del self._ids[block]
+                        del self._maxes[block]
+                    return
+            if end < len(keys):
+                return
+
+    def _position(self, block: int, pos: int) -> int:
+        return sum(len(keys) for keys in self._keys[:block]) + pos
+
+    def bisect_left(self, key: float) -> int:
+        "The number of keys lower than `key`."
+        block = bisect_left(self._maxes, key)
+        if block == len(self._keys):
+            return self._len
+        return self._position(block, bisect_left(self._keys[block], key))
+
+    def bisect_right(self, key: float) -> int:
+        "The number of keys lower than or equal to `key`."
+        block = bisect_right(self._maxes, key)
+        if block == len(self._keys):
+            return self._len
+        return self._position(block, bisect_right(self._keys[block], key))
+
+    def ids(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        "The policy IDs from position `start` up to `stop`, in key order."
+        stop = self._len if stop is None else stop
+        res: List[str] = []
+        offset = 0
+        for ids in self._ids:
+            if offset >= stop:
+                break
+            if offset + len(ids) > start:
+                res.extend(ids[max(start - offset, 0):stop - offset])
+            offset += len(ids)
+        return res
+
+    def __len__(self) -> int:
+        return self._len
+
+
+class PolicyLifecycleIndex:
+    """
+    In-memory index of policy lifecycles.
+
+    Only eligible policies (active, approved, agreed and not cancelled) are kept in the time indexes.
+    Time queries are a binary search followed by a scan of the matching range, and counts are O(log n + n / 512).
+    Adding or removing one policy moves at most one block of 1024 keys per time index.
+
+    Args:
+        default_grace_period_mins (int, optional): grace period for policies without one. Defaults to 0.
+    """
+
+    def __init__(self, default_grace_period_mins: int = 0) -> None:
+        self.default_grace_period_mins = default_grace_period_mins
+
+        self._entries: Dict[str, PolicyLifecycle] = {}
+        # eligible policies sorted by start
+        self._starts = _SortedKeys()
+        # eligible policies with an end, sorted by expiry (end + grace)
+        self._expiries = _SortedKeys()
+        # eligible open ended policies sorted by start, these are live from their start
+        self._open_starts = _SortedKeys()
+        self._max_grace_secs = 0.0
+
+        # state sets, for lookups that are not time based
+        self._cancelled: Set[str] = set()
+        self._unapproved: Set[str] = set()
+
+        # set when entries were added in bulk and the time indexes must be rebuilt
+        self._dirty = False
+
+        # notified of every add/remove (eg. the ExpiryScheduler)
+        self._listeners: List['ExpiryScheduler'] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, policy_id: str) -> bool:
+        return policy_id in self._entries
+
+    def __iter__(self) -> Iterator[PolicyLifecycle]:
+        return iter(self._entries.values())
+
+    def get(self, policy_id: str) -> Optional[PolicyLifecycle]:
+        "Get the lifecycle state of a policy."
+        return self._entries.get(policy_id)
+
+    def _to_entry(self, policy: Union[PolicyLifecycle, 'models.policy.Policy']) -> PolicyLifecycle:
+        if isinstance(policy, PolicyLifecycle):
+            return policy
+        return PolicyLifecycle.from_policy(policy, self.default_grace_period_mins)
+
+    @staticmethod
+    def _is_timed(entry: PolicyLifecycle) -> bool:
+        # policies that end before they start are never live
+        return entry.is_eligible and entry.expires_at >= entry.start
+
+    def _index_state(self, entry: PolicyLifecycle) -> None:
+        if entry.is_cancelled:
+            self._cancelled.add(entry.policy_id)
+        if not entry.is_approved:
+            self._unapproved.add(entry.policy_id)
+        if entry.grace_period_secs > self._max_grace_secs:
+            self._max_grace_secs = entry.grace_period_secs
+
+    def add(self, policy: Union[PolicyLifecycle, 'models.policy.Policy']) -> PolicyLifecycle:
+        """Add or replace a policy in the index.
+
+        Args:
+            policy (Union[PolicyLifecycle, Policy]): the policy or its lifecycle state.
+
+        Returns:
+            PolicyLifecycle: the indexed lifecycle state.
+        """
+        entry = self._to_entry(policy)
+        if entry.policy_id in self._entries:
+            self.remove(entry.policy_id)
+
+        self._entries[entry.policy_id] = entry
+        self._index_state(entry)
+
+        if not self._dirty and self._is_timed(entry):
+            self._starts.insert(entry.start, entry.policy_id)
+            if entry.is_open_ended:
+                self._open_starts.insert(entry.start, entry.policy_id)
+            else:
+                self._expiries.insert(entry.expires_at, entry.policy_id)
+
+        for listener in self._listeners:
+            listener.schedule(entry)
+        return entry
+
+    def extend(self, policies: Iterable[Union[PolicyLifecycle, 'models.policy.Policy']]) -> int:
+        """Add many policies. The time indexes are rebuilt once, on the next query.
+
+        Args:
+            policies (Iterable[Union[PolicyLifecycle, Policy]]): the policies.
+
+        Returns:
+            int: the number of policies added.
+        """
+        count = 0
+        for policy in policies:
+            entry = self._to_entry(policy)
+            if entry.policy_id in self._entries:
+                self._discard_state(entry.policy_id)
+            self._entries[entry.policy_id] = entry
+            self._index_state(entry)
+            for listener in self._listeners:
+                listener.schedule(entry)
+            count += 1
+        if count:
+            self._dirty = True
+        return count
+
+    def _discard_state(self, policy_id: str) -> None:
+        self._cancelled.discard(policy_id)
+        self._unapproved.discard(policy_id)
+
+    def remove(self, policy_id: str) -> Optional[PolicyLifecycle]:
+        """Remove a policy from the index.
+
+        Args:
+            policy_id (str): the policy ID.
+
+        Returns:
+            Optional[PolicyLifecycle]: the removed state, None if it was not indexed.
+        """
+        entry = self._entries.pop(policy_id, None)
+        if entry is None:
+            return None
+        self._discard_state(policy_id)
+        if not self._dirty and self._is_timed(entry):
+            self._starts.remove(entry.start, policy_id)
+            if entry.is_open_ended:
+                self._open_starts.remove(entry.start, policy_id)
+            else:
+                self._expiries.remove(entry.expires_at, policy_id)
+        for listener in self._listeners:
+            listener.unschedule(policy_id)
+        return entry
+
+    def _build(self) -> None:
+        if not self._dirty:
+            return
+        timed = [e for e in self._entries.values() if self._is_timed(e)]
+        self._starts.build([(e.start, e.policy_id) for e in timed])
+        self._expiries.build([(e.expires_at, e.policy_id) for e in timed if not e.is_open_ended])
+        self._open_starts.build([(e.start, e.policy_id) for e in timed if e.is_open_ended])
+        self._max_grace_secs = max((e.grace_period_secs for e in self._entries.values()), default=0.0)
+        self._dirty = False
+
+    # * queries
+
+    def live_at(self, at: Optional[Union[datetime, float]] = None) -> Iterator[str]:
+        """Policy IDs that are live at a point in time.
+
+        Open ended policies come straight from the start index. For policies with an end, the start and expiry indexes
+        are both bisected and the smaller side (started, or not yet expired) is scanned, so the cost is
+        O(log n + live + min(started, not expired)) rather than O(started).
+
+        Args:
+            at (Union[datetime, float], optional): the time, naive datetimes are UTC. Defaults to now.
+
+        Yields:
+            str: policy IDs.
+        """
+        self._build()
+        ts = time.time() if at is None else to_timestamp(at)
+        started = self._starts.bisect_right(ts)
+        open_started = self._open_starts.bisect_right(ts)
+        not_expired = self._expiries.bisect_left(ts)
+        entries = self._entries
+
+        yield from self._open_starts.ids(0, open_started)
+        if started - open_started <= len(self._expiries) - not_expired:
+            for policy_id in self._starts.ids(0, started):
+                entry = entries[policy_id]
+                if not entry.is_open_ended and entry.expires_at >= ts:
+                    yield policy_id
+        else:
+            for policy_id in self._expiries.ids(not_expired):
+                if entries[policy_id].start <= ts:
+                    yield policy_id
+
+    def count_live_at(self, at: Optional[Union[datetime, float]] = None) -> int:
+        """Count the policies that are live at a point in time without scanning them.
+
+        Args:
+            at (Union[datetime, float], optional): the time, naive datetimes are UTC. Defaults to now.
+
+        Returns:
+            int: the number of live policies.
+        """
+        self._build()
+        ts = time.time() if at is None else to_timestamp(at)
+        started = self._starts.bisect_right(ts)
+        expired = self._expiries.bisect_left(ts)
+        return started - expired
+
+    def expiring_between(self,
+                         start: Union[datetime, float],
+                         end: Union[datetime, float]) -> List[str]:
+        """Policy IDs whose grace period ends in `[start, end)`.
+
+        Args:
+            start (Union[datetime, float]): window start.
+            end (Union[datetime, float]): window end.
+
+        Returns:
+            List[str]: policy IDs, ordered by expiry.
+        """
+        self._build()
+        lo = self._expiries.bisect_left(to_timestamp(start))
+        hi = self._expiries.bisect_left(to_timestamp(end))
+        return self._expiries.ids(lo, hi)
+
+    def in_grace_at(self, at: Optional[Union[datetime, float]] = None) -> List[str]:
+        """Policy IDs that have ended but are still inside their grace period.
+
+        Args:
+            at (Union[datetime, float], optional): the time, naive datetimes are UTC. Defaults to now.
+
+        Returns:
+            List[str]: policy IDs.
+        """
+        self._build()
+        ts = time.time() if at is None else to_timestamp(at)
+        lo = self._expiries.bisect_left(ts)
+        hi = self._expiries.bisect_right(ts + self._max_grace_secs)
+        entries = self._entries
+        return [
+            policy_id for policy_id in self._expiries.ids(lo, hi)
+            if entries[policy_id].end < ts
+        ]
+
+    def cancelled(self) -> Set[str]:
+        "Policy IDs that are cancelled."
+        return set(self._cancelled)
+
+    def pending_approval(self) -> Set[str]:
+        "Policy IDs that are not approved."
+        return set(self._unapproved)
+
+
+ExpiryCallback = Callable[[PolicyLifecycle], None]
+
+
+class ExpiryScheduler:
+    """
+    Fires callbacks when policies enter their grace period or expire.
+
+    Events are kept in a heap, so scheduling is O(log n) and only due events are touched when advancing.
+    Rescheduled or removed policies are invalidated lazily, and the heap is compacted once most of it is stale.
+
+    Args:
+        index (PolicyLifecycleIndex): the index to follow. Existing eligible policies are scheduled.
+    """
+
+    def __init__(self, index: PolicyLifecycleIndex) -> None:
+        self.index = index
+
+        self._heap: List[Tuple[float, int, str, str, int]] = []
+        # (version, events left) of the scheduled policies, the version is the `_seq` of the scheduling
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        # the events left of all policies, the heap also holds stale events
+        self._live = 0
+        self._seq = 0
+
+        self._grace_callbacks: List[ExpiryCallback] = []
+        self._expire_callbacks: List[ExpiryCallback] = []
+
+        self._running = False
+
+        index._listeners.append(self)
+        for entry in index:
+            self.schedule(entry)
+
+    def on_grace(self, callback: ExpiryCallback) -> ExpiryCallback:
+        """Register a callback for policies entering their grace period. Can be used as a decorator.
+
+        The callback receives the `PolicyLifecycle` and may be a coroutine function.
+        """
+        self._grace_callbacks.append(callback)
+        return callback
+
+    def on_expire(self, callback: ExpiryCallback) -> ExpiryCallback:
+        """Register a callback for expired policies (end of the grace period). Can be used as a decorator.
+
+        The callback receives the `PolicyLifecycle` and may be a coroutine function.
+        """
+        self._expire_callbacks.append(callback)
+        return callback
+
+    def _push(self, when: float, policy_id: str, kind: str, version: int) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (when, self._seq, policy_id, kind, version))
+
+    def schedule(self, entry: PolicyLifecycle) -> None:
+        "(Re)schedule the events for a policy. Ineligible and open ended policies have no events."
+        self.unschedule(entry.policy_id)
+        if not entry.is_eligible or entry.is_open_ended:
+            return
+        self._seq += 1
+        version = self._seq
+        events = 1
+        if entry.grace_period_secs > 0:
+            self._push(entry.end, entry.policy_id, GRACE, version)
+            events += 1
+        self._push(entry.expires_at, entry.policy_id, EXPIRED, version)
+        self._pending[entry.policy_id] = (version, events)
+        self._live += events
+
+    def unschedule(self, policy_id: str) -> None:
+        "Cancel any pending events for a policy."
+        pending = self._pending.pop(policy_id, None)
+        if pending is None:
+            return
+        self._live -= pending[1]
+        if len(self._heap) > 2 * self._live + 64:
+            self._compact()
+
+    def _is_pending(self, event: Tuple[float, int, str, str, int]) -> bool:
+        pending = self._pending.get(event[2])
+        return pending is not None and pending[0] == event[4]
+
+    def _compact(self) -> None:
+        # in place, `advance()` holds the heap while callbacks run
+        self._heap[:] = [event for event in self._heap if self._is_pending(event)]
+        heapq.heapify(self._heap)
+
+    def _prune(self) -> None:
+        heap = self._heap
+        while heap and not self._is_pending(heap[0]):
+            heapq.heappop(heap)
+
+    def next_deadline(self) -> Optional[float]:
+        "Epoch seconds of the next pending event, None if nothing is scheduled."
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        "The number of pending events."
+        return self._live
+
+    async def advance(self, now: Optional[float] = None) -> int:
+        """Fire the callbacks for every event that is due.
+
+        Args:
+            now (float, optional): epoch seconds to advance to. Defaults to now.
+
+        Returns:
+            int: the number of events fired.
+        """
+        now = time.time() if now is None else now
+        fired = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            event = heapq.heappop(heap)
+            if not self._is_pending(event):
+                continue
+            _, _, policy_id, kind, version = event
+            events = self._pending[policy_id][1] - 1
+            if events:
+                self._pending[policy_id] = (version, events)
+            else:
+                del self._pending[policy_id]
+            self._live -= 1
+            entry = self.index.get(policy_id)
+            if entry is None:
+                continue
+            callbacks = self._grace_callbacks if kind == GRACE else self._expire_callbacks
+            for callback in callbacks:
+                res = callback(entry)
+                if asyncio.iscoroutine(res):
+                    await res
+            fired += 1
+        return fired
+
+    async def run(self, max_sleep: float = 60.0) -> None:
+        """Fire events as they become due until `stop()` is called.
+
+        Args:
+            max_sleep (float, optional): maximum seconds to sleep between checks,
+                so newly scheduled earlier events are picked up. Defaults to 60.0.
+        """
+        self._running = True
+        while self._running:
+            await self.advance()
+            deadline = self.next_deadline()
+            delay = max_sleep if deadline is None else min(max(deadline - time.time(), 0.0), max_sleep)
+            await asyncio.sleep(delay)
+
+    def stop(self) -> None:
+        "Stop the `run()` loop."
+        self._running = False
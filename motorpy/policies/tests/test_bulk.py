@@ -0,0 +1,135 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from motorpy.api.exceptions import APIError
+from motorpy.models.bulk import BulkStatus, run_bulk
+from motorpy.models.policy import Policy
+from motorpy.models.policy.enums import PolicyGroup
+from motorpy.tests.fakes import FakeAPI
+from ..core import Policies, PolicyTarget
+
+
+class PoliciesAPI(FakeAPI):
+
+    def __init__(self, failures=None):
+        super().__init__()
+        # policy id -> status codes of the failures before the request succeeds
+        self.failures = {k: list(v) for k, v in (failures or {}).items()}
+
+    def respond(self, call):
+        failures = self.failures.get(call.endpoint.rsplit("/", 1)[-1])
+        if failures:
+            status = failures.pop(0)
+            raise APIError(f"API responded with {status}", status, call.endpoint)
+        if call.method == "POST":
+            return {**call.data, "id": "policy-" + "-".join(call.params.values())}
+        return {"id": call.endpoint.rsplit("/", 1)[-1], **call.data}
+
+
+class TestBulkPolicies:
+
+    def test_bulk_approve(self):
+        api = PoliciesAPI()
+        ids = [f"p-{n}" for n in range(20)]
+        result = asyncio.run(Policies(api).bulk_approve(ids + ["p-0"], approved_by_id="u-1", concurrency=4))
+
+        assert [i.key for i in result.items] == ids
+        assert result.ok and result.counts()["ok"] == 20
+        assert api.max_running <= 4
+        # no refreshes, every policy gets the same body
+        assert set(api.log("method")) == {"PATCH"}
+        bodies = api.log("data")
+        assert all(b is bodies[0] for b in bodies)
+        assert bodies[0]["approval"]["approvedBy"] == "u-1"
+        assert isinstance(bodies[0]["approval"]["approvedAt"], str)
+
+    def test_transient_failures_retried(self, monkeypatch):
+        sleep = asyncio.sleep
+
+        async def no_delay(delay):
+            await sleep(0)
+
+        monkeypatch.setattr(asyncio, "sleep", no_delay)
+        api = PoliciesAPI(failures={"p-1": [503, 429], "p-2": [404], "p-3": [500] * 5})
+        policies = Policies(api)
+        result = asyncio.run(policies.bulk_cancel(["p-0", "p-1", "p-2", "p-3"], message="renewal"))
+
+        items = {i.key: i for i in result.items}
+        assert items["p-0"].status == BulkStatus.ok and items["p-0"].attempts == 1
+        assert items["p-1"].status == BulkStatus.ok and items["p-1"].attempts == 3
+        # not transient
+        assert items["p-2"].status == BulkStatus.error and items["p-2"].attempts == 1
+        assert items["p-2"].status_code == 404
+        # retries exhausted
+        assert items["p-3"].status == BulkStatus.error and items["p-3"].attempts == 4
+        assert items["p-1"].result["cancellation"]["message"] == "renewal"
+
+    def test_bulk_driver_approve(self):
+        api = PoliciesAPI()
+        result = asyncio.run(Policies(api).bulk_driver_approve(["p-1"]))
+        assert result.ok
+        assert api.log("method", "endpoint")[0] == ("PATCH", "/policy/p-1")
+        assert "agreedAt" in api.calls[0].data["driver"]
+
+    def test_connection_errors_retried(self):
+        errors = [aiohttp.ServerDisconnectedError(), aiohttp.ServerTimeoutError(), ValueError("invalid")]
+
+        async def call():
+            raise errors.pop(0)
+
+        result = asyncio.run(run_bulk([("a", None, call)], retries=3, retry_delay=0))
+        # the aiohttp errors are retried, the last is not transient
+        assert result.failed[0].attempts == 3
+        assert "invalid" in result.failed[0].error
+
+    def test_run_bulk_without_retries(self):
+        async def fail():
+            raise APIError("Unavailable", 503)
+
+        result = asyncio.run(run_bulk([("a", None, fail)]))
+        assert result.failed[0].attempts == 1
+
+
+class TestBulkCreate:
+
+    def make_template(self, group):
+        return Policy(policy_group=group, sum_insured=1000.0)
+
+    def test_creates_per_target(self):
+        api = PoliciesAPI()
+        targets = [("f-1", "d-1"), PolicyTarget("f-1", "d-2"), ("f-1", None), ("f-1", "d-1")]
+        result = asyncio.run(Policies(api).bulk_create(self.make_template(PolicyGroup.FD), targets, concurrency=2))
+
+        assert [i.key for i in result.items] == ["f-1/d-1/", "f-1/d-2/", "f-1//"]
+        assert result.counts() == {"ok": 2, "error": 1, "skipped": 0}
+        assert "driver_id must be supplied" in result.failed[0].error
+        assert api.log("params") == [{"driverId": "d-1"}, {"driverId": "d-2"}]
+        assert set(api.log("endpoint")) == {"policy/f-1"}
+
+        # the template is exported once, JSON ready
+        bodies = api.log("data")
+        assert bodies[0] is bodies[1]
+        assert type(bodies[0]["policyGroup"]) is str
+        assert bodies[0] == {"policyGroup": "fd", "sumInsured": 1000.0}
+
+        created = result.succeeded[0].result
+        assert isinstance(created, Policy)
+        assert {i.result.id for i in result.succeeded} == {"policy-d-1", "policy-d-2"}
+        assert created.sum_insured == 1000.0
+
+    def test_idempotency_keys(self):
+        api = PoliciesAPI()
+        policies = Policies(api)
+        template = self.make_template(PolicyGroup.FRV)
+        targets = [PolicyTarget("f-1", vehicle_id="v-1")]
+
+        first = asyncio.run(policies.bulk_create(template, targets, idempotency_prefix="renewal-2022"))
+        again = asyncio.run(policies.bulk_create(template, targets, idempotency_prefix="renewal-2022"))
+        assert len(api.calls) == 1
+        assert first.items[0].result.id == again.items[0].result.id
+
+    def test_fleet_groups_only(self):
+        with pytest.raises(ValueError):
+            asyncio.run(Policies(PoliciesAPI()).bulk_create(self.make_template(PolicyGroup.D), [("d-1",)]))
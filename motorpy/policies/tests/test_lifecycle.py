@@ -0,0 +1,173 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from motorpy.models.policy import Policy
+from ..lifecycle import PolicyLifecycle, PolicyLifecycleIndex, ExpiryScheduler, to_timestamp, _SortedKeys
+
+NOW = datetime(2022, 6, 1, 12, 0, 0)
+
+
+def make_policy(policy_id: str, start: datetime, end: datetime = None, grace_mins: int = 0, **kwargs) -> Policy:
+    data = {
+        "id": policy_id,
+        "approval": {"approvedAt": start},
+        "driver": {"agreedAt": start},
+        "duration": {"start": start, "end": end, "gracePeriodMins": grace_mins},
+    }
+    data.update(kwargs)
+    return Policy(**data)
+
+
+class TestPolicyLifecycleIndex:
+
+    def test_from_policy_matches_is_live(self):
+        p = make_policy("p1", NOW - timedelta(days=1), datetime.utcnow() + timedelta(days=1))
+        entry = PolicyLifecycle.from_policy(p)
+        assert p.is_live() is True
+        assert entry.is_live_at(to_timestamp(datetime.utcnow())) is True
+
+        p.cancellation.cancellation_at = NOW.date()
+        assert PolicyLifecycle.from_policy(p).is_eligible is False
+
+    def test_live_at(self):
+        index = PolicyLifecycleIndex()
+        index.add(make_policy("past", NOW - timedelta(days=10), NOW - timedelta(days=5)))
+        index.add(make_policy("current", NOW - timedelta(days=1), NOW + timedelta(days=1)))
+        index.add(make_policy("open", NOW - timedelta(days=1)))
+        index.add(make_policy("future", NOW + timedelta(days=1), NOW + timedelta(days=2)))
+        index.add(make_policy("grace", NOW - timedelta(days=2), NOW - timedelta(minutes=30), grace_mins=60))
+        index.add(make_policy("cancelled", NOW - timedelta(days=1), NOW + timedelta(days=1),
+                              cancellation={"cancelledAt": NOW.date()}))
+
+        assert set(index.live_at(NOW)) == {"current", "open", "grace"}
+        assert index.count_live_at(NOW) == 3
+        assert index.in_grace_at(NOW) == ["grace"]
+        assert index.cancelled() == {"cancelled"}
+
+        index.remove("open")
+        assert set(index.live_at(NOW)) == {"current", "grace"}
+        assert index.count_live_at(NOW) == 2
+
+    def test_live_at_scans_smaller_side(self):
+        index = PolicyLifecycleIndex()
+        # many expired policies, few not expired: the expiry side is scanned
+        index.extend(make_policy(f"old{i}", NOW - timedelta(days=30), NOW - timedelta(days=i + 1)) for i in range(20))
+        index.add(make_policy("current", NOW - timedelta(days=1), NOW + timedelta(days=1)))
+        index.add(make_policy("open", NOW - timedelta(days=1)))
+        assert set(index.live_at(NOW)) == {"current", "open"}
+
+        # many future policies, few started: the start side is scanned
+        index.extend(make_policy(f"new{i}", NOW + timedelta(days=i + 1), NOW + timedelta(days=60)) for i in range(40))
+        assert set(index.live_at(NOW)) == {"current", "open"}
+        assert index.count_live_at(NOW) == 2
+
+    def test_explicit_zero_grace_period(self):
+        end = NOW - timedelta(minutes=30)
+        explicit = make_policy("p1", NOW - timedelta(days=1), end, grace_mins=0)
+        unset = Policy(**{
+            "id": "p2",
+            "approval": {"approvedAt": NOW},
+            "driver": {"agreedAt": NOW},
+            "duration": {"start": NOW - timedelta(days=1), "end": end},
+        })
+        assert PolicyLifecycle.from_policy(explicit, default_grace_period_mins=60).grace_period_secs == 0
+        assert PolicyLifecycle.from_policy(unset, default_grace_period_mins=60).grace_period_secs == 3600
+
+    def test_extend_rebuilds(self):
+        index = PolicyLifecycleIndex()
+        index.extend(
+            make_policy(f"p{i}", NOW - timedelta(days=i), NOW + timedelta(days=1) - timedelta(days=i))
+            for i in range(5)
+        )
+        assert len(index) == 5
+        assert set(index.live_at(NOW)) == {"p0", "p1"}
+        assert index.count_live_at(NOW) == 2
+        assert index.expiring_between(NOW - timedelta(days=2), NOW) == ["p3", "p2"]
+
+    def test_replace(self):
+        index = PolicyLifecycleIndex()
+        index.add(make_policy("p1", NOW - timedelta(days=1), NOW + timedelta(days=1)))
+        index.add(make_policy("p1", NOW - timedelta(days=3), NOW - timedelta(days=2)))
+        assert len(index) == 1
+        assert list(index.live_at(NOW)) == []
+
+    def test_sorted_keys_blocks(self, monkeypatch):
+        monkeypatch.setattr(_SortedKeys, "BLOCK", 4)
+        rng = random.Random(1)
+        keys = _SortedKeys()
+        expected = []
+        for i in range(200):
+            pair = (float(rng.randint(0, 20)), f"p{i}")
+            keys.insert(*pair)
+            expected.append(pair)
+        for pair in rng.sample(expected, 150):
+            keys.remove(*pair)
+            expected.remove(pair)
+        expected.sort(key=lambda p: p[0])
+
+        assert len(keys) == len(expected)
+        assert sorted(keys.ids()) == sorted(i for _, i in expected)
+        for key in range(-1, 22):
+            assert keys.bisect_left(key) == sum(k < key for k, _ in expected)
+            assert keys.bisect_right(key) == sum(k <= key for k, _ in expected)
+        lo, hi = keys.bisect_left(5), keys.bisect_right(10)
+        assert sorted(keys.ids(lo, hi)) == sorted(i for k, i in expected if 5 <= k <= 10)
+
+
+class TestExpiryScheduler:
+
+    def test_fires_grace_and_expiry(self):
+        index = PolicyLifecycleIndex()
+        index.add(make_policy("p1", NOW - timedelta(days=1), NOW, grace_mins=10))
+        scheduler = ExpiryScheduler(index)
+        index.add(make_policy("p2", NOW - timedelta(days=1), NOW + timedelta(minutes=5)))
+
+        graced, expired = [], []
+        scheduler.on_grace(lambda e: graced.append(e.policy_id))
+
+        @scheduler.on_expire
+        async def _expired(entry):
+            expired.append(entry.policy_id)
+
+        now = to_timestamp(NOW)
+        assert scheduler.next_deadline() == now
+        assert asyncio.run(scheduler.advance(now)) == 1
+        assert graced == ["p1"]
+
+        assert asyncio.run(scheduler.advance(now + 10 * 60)) == 2
+        assert expired == ["p2", "p1"]
+        assert scheduler.next_deadline() is None
+
+    def test_removed_policies_do_not_fire(self):
+        index = PolicyLifecycleIndex()
+        scheduler = ExpiryScheduler(index)
+        index.add(make_policy("p1", NOW - timedelta(days=1), NOW))
+        index.remove("p1")
+
+        fired = []
+        scheduler.on_expire(lambda e: fired.append(e))
+        assert asyncio.run(scheduler.advance(to_timestamp(NOW) + 1)) == 0
+        assert fired == []
+
+    def test_pending_count(self):
+        index = PolicyLifecycleIndex()
+        scheduler = ExpiryScheduler(index)
+        for i in range(100):
+            index.add(make_policy(f"p{i}", NOW - timedelta(days=1), NOW, grace_mins=10))
+        assert len(scheduler) == 200
+
+        # rescheduled and removed policies leave stale events in the heap, they are not counted
+        for i in range(100):
+            index.add(make_policy(f"p{i}", NOW - timedelta(days=1), NOW, grace_mins=10))
+        for i in range(50):
+            index.remove(f"p{i}")
+        assert len(scheduler) == 100
+        assert len(scheduler._heap) < 300
+
+        now = to_timestamp(NOW)
+        assert asyncio.run(scheduler.advance(now)) == 50
+        assert len(scheduler) == 50
+        assert asyncio.run(scheduler.advance(now + 10 * 60)) == 50
+        assert len(scheduler) == 0
+        assert scheduler._pending == {}
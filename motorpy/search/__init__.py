@@ -1,6 +1,10 @@
 "Advanced Search"
-from typing import Any, Set
+from enum import Enum
+from typing import Any, Dict, Pattern, Set, Tuple
 import datetime
+import re
+
+from pydantic.datetime_parse import parse_date, parse_datetime
 
 OPS = {
     "eq",
@@ -41,5 +45,96 @@ class Search:
     
     def __repr__(self) -> str:
         return f"Search({self.value}, {self.operator})"
+
+    def matches(self, value: Any) -> bool:
+        """Evaluate the search against a local value, eg. a model field.
+
+        `like` and `ilike` use `%` (or `*`) as a wildcard for any characters and `_` for a single character.
+        Strings are parsed when compared to dates and datetimes, naive datetimes are treated as UTC.
+        A missing (None) value only matches `eq` None and `ne` anything else.
+
+        Args:
+            value (Any): the value to test.
+
+        Returns:
+            bool: whether the value matches.
+        """
+        if value is None or self.value is None:
+            if self.operator == "eq":
+                return value is self.value
+            return self.operator == "ne" and value is not self.value
+        if self.operator in ("like", "ilike"):
+            return self.pattern().match(str(value)) is not None
+
+        target = coerce(self.value, value)
+        value = normalize(value)
+        try:
+            if self.operator == "eq":
+                return value == target
+            if self.operator == "ne":
+                return value != target
+            if self.operator == "gt":
+                return value > target
+            if self.operator == "gte":
+                return value >= target
+            if self.operator == "lt":
+                return value < target
+            return value <= target
+        except TypeError:
+            # not comparable, eg. a str and an int
+            return False
+
+    def pattern(self) -> Pattern:
+        "The compiled regex of a like/ilike search."
+        pattern = _PATTERNS.get((self.operator, self.value))
+        if pattern is None:
+            regex = "".join(
+                ".*" if c in "%*" else "." if c == "_" else re.escape(c)
+                for c in str(self.value)
+            )
+            pattern = re.compile(f"^{regex}$", re.IGNORECASE | re.DOTALL if self.operator == "ilike" else re.DOTALL)
+            if len(_PATTERNS) >= 1024:
+                _PATTERNS.clear()
+            _PATTERNS[(self.operator, self.value)] = pattern
+        return pattern
+
+
+# compiled like/ilike patterns
+_PATTERNS: Dict[Tuple[str, Any], Pattern] = {}
+
+
+def normalize(value: Any) -> Any:
+    "Make datetimes comparable, naive datetimes are treated as UTC."
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def coerce(value: Any, like: Any) -> Any:
+    """Convert a search value to the type of a local value it is compared to.
+
+    Args:
+        value (Any): the search value.
+        like (Any): the local value.
+
+    Returns:
+        Any: the converted (and normalized) search value.
+    """
+    if isinstance(like, datetime.datetime):
+        if isinstance(value, str):
+            value = parse_datetime(value)
+        elif isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+            value = datetime.datetime(value.year, value.month, value.day)
+    elif isinstance(like, datetime.date):
+        if isinstance(value, str):
+            value = parse_date(value)
+        elif isinstance(value, datetime.datetime):
+            value = value.date()
+    elif isinstance(like, Enum) and not isinstance(value, Enum):
+        try:
+            value = type(like)(value)
+        except ValueError:
+            pass
+    return normalize(value)
     
     
\ No newline at end of file
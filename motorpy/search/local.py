@@ -0,0 +1,310 @@
+"""
+Local queries.
+
+`LocalCollection` evaluates `Search` objects against an in-memory collection of models (or records, see `motorpy.models.records`).
+Indexes are built on demand the first time a field is queried:
+
+- hash indexes answer `eq` searches (and plain values)
+- sorted indexes answer `eq`, `gt`, `gte`, `lt` and `lte` searches
+
+Other searches (`ne`, `like`, `ilike`) and fields without an index are evaluated by scanning the candidates.
+When several fields are queried, the most selective index is used and the other criteria are checked per candidate.
+
+```python
+drivers = LocalCollection([d async for d in motor.list_drivers()])
+drivers.filter(email="joe@example.com")
+drivers.filter(date_of_birth=Search(date(1990, 1, 1), "gte"), last_name=Search("ad%", "ilike"))
+```
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Dict, Generic, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from . import Search, coerce, normalize
+
+
+T = TypeVar("T")
+
+# default indexes by model name, using field names
+HASH_INDEXES: Dict[str, Tuple[str, ...]] = {
+    "Driver": ("email", "external_id"),
+    "Vehicle": ("reg_plate", "vin"),
+}
+SORTED_INDEXES: Dict[str, Tuple[str, ...]] = {
+    "Driver": ("date_of_birth", "created_at"),
+    "Vehicle": ("created_at",),
+}
+
+_RANGE_OPS = {"eq", "gt", "gte", "lt", "lte"}
+
+
+class _HashIndex:
+    __slots__ = ("positions",)
+
+    def __init__(self, values: Iterable[Tuple[int, Any]]) -> None:
+        self.positions: Dict[Any, List[int]] = {}
+        for i, value in values:
+            self.add(i, value)
+
+    def add(self, position: int, value: Any) -> None:
+        self.positions.setdefault(normalize(value), []).append(position)
+
+    def lookup(self, value: Any) -> List[int]:
+        return self.positions.get(value, [])
+
+
+def _rank(value: Any) -> str:
+    "The group of a value, values of the same group can be ordered."
+    if isinstance(value, (bool, int, float)):
+        return "number"
+    if isinstance(value, str):
+        # str enums included
+        return "str"
+    if isinstance(value, datetime):
+        return "datetime"
+    return type(value).__name__
+
+
+class _RankKeys:
+    "Sorted keys of one rank with the positions of their items."
+    __slots__ = ("keys", "positions")
+
+    def __init__(self, pairs: List[Tuple[Any, int]]) -> None:
+        pairs.sort(key=lambda p: p[0])
+        self.keys = [k for k, _ in pairs]
+        self.positions = [i for _, i in pairs]
+
+    def insert(self, key: Any, position: int) -> None:
+        at = bisect_right(self.keys, key)
+        self.keys.insert(at, key)
+        self.positions.insert(at, position)
+
+
+class _SortedIndex:
+    "Sorted keys grouped by rank, so a field with mixed types (eg. str and int) can still be indexed."
+    __slots__ = ("ranks",)
+
+    def __init__(self, values: Iterable[Tuple[int, Any]]) -> None:
+        grouped: Dict[str, List[Tuple[Any, int]]] = {}
+        for i, v in values:
+            # missing values are never in a range
+            if v is not None:
+                v = normalize(v)
+                grouped.setdefault(_rank(v), []).append((v, i))
+        self.ranks: Dict[str, _RankKeys] = {}
+        for rank, pairs in grouped.items():
+            try:
+                self.ranks[rank] = _RankKeys(pairs)
+            except TypeError:
+                # values of this type cannot be ordered, eg. dicts
+                pass
+
+    def add(self, position: int, value: Any) -> None:
+        if value is None:
+            return
+        value = normalize(value)
+        rank = _rank(value)
+        group = self.ranks.get(rank)
+        try:
+            if group is None:
+                self.ranks[rank] = _RankKeys([(value, position)])
+            else:
+                group.insert(value, position)
+        except TypeError:
+            pass
+
+    def range(self, search: Search) -> List[int]:
+        if search.value is None:
+            return []
+        op = search.operator
+        positions: List[int] = []
+        for rank, group in self.ranks.items():
+            try:
+                target = coerce(search.value, group.keys[0])
+            except (TypeError, ValueError):
+                continue
+            if _rank(target) != rank:
+                # not comparable, eg. a str and a date
+                continue
+            keys = group.keys
+            lo, hi = 0, len(keys)
+            try:
+                if op in ("eq", "gte"):
+                    lo = bisect_left(keys, target)
+                elif op == "gt":
+                    lo = bisect_right(keys, target)
+                if op in ("eq", "lte"):
+                    hi = bisect_right(keys, target)
+                elif op == "lt":
+                    hi = bisect_left(keys, target)
+            except TypeError:
+                continue
+            positions.extend(group.positions[lo:hi])
+        return positions
+
+
+class LocalCollection(Generic[T]):
+    "An in-memory collection of models that can be filtered with `Search` objects."
+
+    def __init__(self,
+                 items: Iterable[T] = (),
+                 hash_fields: Optional[Sequence[str]] = None,
+                 sorted_fields: Optional[Sequence[str]] = None) -> None:
+        """
+        Args:
+            items (Iterable[T], optional): the models or records. Defaults to ().
+            hash_fields (Optional[Sequence[str]], optional): fields with a hash index.
+                Defaults to `HASH_INDEXES` for the model of the first item.
+            sorted_fields (Optional[Sequence[str]], optional): fields with a sorted index.
+                Defaults to `SORTED_INDEXES` for the model of the first item.
+        """
+        self.items: List[T] = list(items)
+        self._hash_fields = set(hash_fields) if hash_fields is not None else None
+        self._sorted_fields = set(sorted_fields) if sorted_fields is not None else None
+        self._hash: Dict[str, _HashIndex] = {}
+        self._sorted: Dict[str, _SortedIndex] = {}
+        # model field aliases -> field names
+        self._aliases: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def _model_name(self) -> str:
+        if not self.items:
+            return ""
+        name = type(self.items[0]).__name__
+        # records are named after their model, eg. DriverRecord
+        return name[:-len("Record")] if name.endswith("Record") else name
+
+    @property
+    def hash_fields(self) -> Set[str]:
+        "The fields with a hash index."
+        if self._hash_fields is None:
+            return set(HASH_INDEXES.get(self._model_name(), ()))
+        return self._hash_fields
+
+    @property
+    def sorted_fields(self) -> Set[str]:
+        "The fields with a sorted index."
+        if self._sorted_fields is None:
+            return set(SORTED_INDEXES.get(self._model_name(), ()))
+        return self._sorted_fields
+
+    def _field(self, name: str) -> str:
+        "Resolve an API alias (eg. regPlate) to the field name."
+        if not self._aliases and self.items:
+            fields = getattr(type(self.items[0]), "__fields__", None)
+            if fields is None:
+                # records keep the model fields
+                fields = getattr(getattr(type(self.items[0]), "_model", None), "__fields__", {})
+            self._aliases = {f.alias: n for n, f in fields.items() if f.alias}
+        return self._aliases.get(name, name)
+
+    def _values(self, field: str) -> Iterable[Tuple[int, Any]]:
+        return ((i, getattr(item, field, None)) for i, item in enumerate(self.items))
+
+    def add(self, item: T) -> None:
+        """Add an item, the indexes are updated.
+
+        Args:
+            item (T): the model or record.
+        """
+        self.items.append(item)
+        position = len(self.items) - 1
+        for field, hash_index in self._hash.items():
+            hash_index.add(position, getattr(item, field, None))
+        for field, sorted_index in self._sorted.items():
+            sorted_index.add(position, getattr(item, field, None))
+
+    def extend(self, items: Iterable[T]) -> None:
+        """Add multiple items, hash indexes are updated and sorted indexes rebuilt once, on their next use.
+
+        Args:
+            items (Iterable[T]): the models or records.
+        """
+        start = len(self.items)
+        self.items.extend(items)
+        for field, index in self._hash.items():
+            for position in range(start, len(self.items)):
+                index.add(position, getattr(self.items[position], field, None))
+        if len(self.items) > start:
+            self._sorted.clear()
+
+    def invalidate(self) -> None:
+        "Drop all indexes, eg. after the items were modified in place."
+        self._hash.clear()
+        self._sorted.clear()
+
+    def _candidates(self, field: str, search: Search) -> Optional[List[int]]:
+        "Positions matching a search using an index, None if no index applies."
+        if search.operator == "eq" and field in self.hash_fields:
+            hash_index = self._hash.get(field)
+            if hash_index is None:
+                hash_index = self._hash[field] = _HashIndex(self._values(field))
+            sample = next((k for k in hash_index.positions if k is not None), None)
+            return hash_index.lookup(coerce(search.value, sample))
+        if search.operator in _RANGE_OPS and field in self.sorted_fields:
+            sorted_index = self._sorted.get(field)
+            if sorted_index is None:
+                sorted_index = self._sorted[field] = _SortedIndex(self._values(field))
+            return sorted_index.range(search)
+        return None
+
+    def filter(self, **criteria: Any) -> List[T]:
+        """Get the items matching all criteria.
+
+        Args:
+            **criteria: field name (or API alias) to a `Search` or a value (an `eq` search).
+
+        Returns:
+            List[T]: the matching items, in collection order.
+        """
+        searches = [
+            (self._field(name), value if isinstance(value, Search) else Search(value))
+            for name, value in criteria.items()
+        ]
+        if not searches:
+            return list(self.items)
+
+        # use the most selective index
+        best: Optional[List[int]] = None
+        best_at = -1
+        for n, (field, search) in enumerate(searches):
+            positions = self._candidates(field, search)
+            if positions is not None and (best is None or len(positions) < len(best)):
+                best, best_at = positions, n
+                if not best:
+                    return []
+
+        rest = [s for n, s in enumerate(searches) if n != best_at]
+        candidates = sorted(best) if best is not None else range(len(self.items))
+        return [
+            self.items[i] for i in candidates
+            if all(search.matches(getattr(self.items[i], field, None)) for field, search in rest)
+        ]
+
+    def first(self, **criteria: Any) -> Optional[T]:
+        """Get the first item matching all criteria.
+
+        Args:
+            **criteria: field name (or API alias) to a `Search` or a value.
+
+        Returns:
+            Optional[T]: the item, None if nothing matches.
+        """
+        matches = self.filter(**criteria)
+        return matches[0] if matches else None
+
+    def count(self, **criteria: Any) -> int:
+        """Count the items matching all criteria.
+
+        Args:
+            **criteria: field name (or API alias) to a `Search` or a value.
+
+        Returns:
+            int: the number of matching items.
+        """
+        return len(self.filter(**criteria))
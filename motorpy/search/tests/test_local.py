@@ -0,0 +1,100 @@
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+from motorpy.models import Driver, Vehicle
+from motorpy.models.records import record_type
+from .. import Search
+from ..local import LocalCollection
+
+
+def make_drivers():
+    return [
+        Driver(id="d-1", firstName="Joe", lastName="Adams", email="joe@example.com", externalId="e-1",
+               dob=date(1990, 2, 1), createdAt="2022-01-01T00:00:00Z"),
+        Driver(id="d-2", firstName="Ann", lastName="Adler", email="ann@example.com",
+               dob=date(1985, 5, 5), createdAt=datetime(2022, 3, 1)),
+        Driver(id="d-3", firstName="Tom", lastName="Brown", email="tom@example.com", externalId="e-3",
+               createdAt="2022-02-01T00:00:00Z"),
+    ]
+
+
+def ids(items):
+    return [i.id for i in items]
+
+
+class TestSearchMatches:
+
+    def test_operators(self):
+        assert Search(1, "gt").matches(2)
+        assert not Search(1, "gte").matches(0)
+        assert Search("a", "ne").matches("b")
+        assert Search("ad%", "ilike").matches("Adams")
+        assert not Search("ad%", "like").matches("Adams")
+        assert Search("A_ler", "like").matches("Adler")
+        assert not Search(1, "gt").matches(None)
+        assert Search(1, "ne").matches(None)
+
+    def test_coercion(self):
+        assert Search("1990-01-01", "gt").matches(date(1990, 2, 1))
+        assert Search(date(2022, 1, 2), "lt").matches(datetime(2022, 1, 1, tzinfo=timezone.utc))
+        assert Search(datetime(2022, 1, 1), "eq").matches(datetime(2022, 1, 1, tzinfo=timezone.utc))
+        assert not Search("x", "gt").matches(1)
+
+
+class TestLocalCollection:
+
+    def test_hash_index(self):
+        drivers = LocalCollection(make_drivers())
+        assert drivers.hash_fields == {"email", "external_id"}
+        assert ids(drivers.filter(email="ann@example.com")) == ["d-2"]
+        assert ids(drivers.filter(externalId="e-3")) == ["d-3"]
+        assert ids(drivers.filter(external_id=None)) == ["d-2"]
+        assert "email" in drivers._hash
+
+    def test_sorted_index(self):
+        drivers = LocalCollection(make_drivers())
+        assert ids(drivers.filter(date_of_birth=Search(date(1986, 1, 1), "gte"))) == ["d-1"]
+        assert ids(drivers.filter(created_at=Search("2022-01-15T00:00:00", "gt"))) == ["d-2", "d-3"]
+        assert ids(drivers.filter(created_at=Search(date(2022, 2, 1), "lte"))) == ["d-1", "d-3"]
+        assert "created_at" in drivers._sorted
+
+    def test_combined_and_scans(self):
+        drivers = LocalCollection(make_drivers())
+        found = drivers.filter(last_name=Search("ad%", "ilike"), created_at=Search("2022-02-01T00:00:00Z", "gte"))
+        assert ids(found) == ["d-2"]
+        assert ids(drivers.filter(first_name=Search("Joe", "ne"))) == ["d-2", "d-3"]
+        assert drivers.count(email="nobody@example.com", first_name="Joe") == 0
+        assert drivers.first(first_name="Tom").id == "d-3"
+
+    def test_add_updates_indexes(self):
+        drivers = LocalCollection(make_drivers())
+        assert drivers.count(email="new@example.com") == 0
+        assert drivers.count(created_at=Search("2022-12-01T00:00:00Z", "gt")) == 0
+        index = drivers._sorted["created_at"]
+        drivers.add(Driver(id="d-4", firstName="New", lastName="One", email="new@example.com",
+                           createdAt="2023-01-01T00:00:00Z"))
+        assert ids(drivers.filter(email="new@example.com")) == ["d-4"]
+        assert ids(drivers.filter(created_at=Search("2022-12-01T00:00:00Z", "gt"))) == ["d-4"]
+        # updated in place, not rebuilt
+        assert drivers._sorted["created_at"] is index
+
+        drivers.extend([Driver(id="d-5", createdAt="2023-02-01T00:00:00Z")])
+        assert ids(drivers.filter(created_at=Search("2022-12-01T00:00:00Z", "gt"))) == ["d-4", "d-5"]
+
+    def test_sorted_index_mixed_types(self):
+        items = [SimpleNamespace(id=n, value=v) for n, v in enumerate([3, "b", None, 1.5, "a", {"x": 1}, 7])]
+        collection = LocalCollection(items, sorted_fields=["value"])
+        assert ids(collection.filter(value=Search(2, "gt"))) == [0, 6]
+        assert ids(collection.filter(value=Search("a", "gte"))) == [1, 4]
+        assert ids(collection.filter(value=Search(1.5, "eq"))) == [3]
+        collection.add(SimpleNamespace(id=7, value="c"))
+        assert ids(collection.filter(value=Search("b", "gt"))) == [7]
+
+    def test_records(self):
+        Record = record_type(Vehicle)
+        vehicles = LocalCollection([
+            Record.from_api({"id": "v-1", "regPlate": "ABC", "vin": "V1"}),
+            Record.from_api({"id": "v-2", "regPlate": "XYZ"}),
+        ])
+        assert vehicles.hash_fields == {"reg_plate", "vin"}
+        assert ids(vehicles.filter(regPlate="XYZ")) == ["v-2"]
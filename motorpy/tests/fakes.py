@@ -0,0 +1,112 @@
+"""
+Test doubles shared by the test modules.
+
+`FakeAPI` stands in for `motorpy.api.APIHandler`: it records each call and answers it from memory.
+Pass the responders a test needs, or subclass it for an API with state:
+
+```python
+api = FakeAPI(respond=lambda call: {"id": call.endpoint.rsplit("/", 1)[-1]}, fail={"drivers/d-2"}, delay=0.001)
+```
+"""
+import asyncio
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Union
+
+from motorpy.api.exceptions import APIError
+
+
+class Call(NamedTuple):
+    "A call made to the fake API, listings have the method \"LIST\"."
+    method: str
+    endpoint: str
+    params: Optional[dict] = None
+    data: Any = None
+    headers: Optional[dict] = None
+
+
+class FakeAPI:
+    """
+    An API handler that answers from memory and records the calls.
+    """
+    trusted = False
+
+    def __init__(self,
+                 respond: Callable[[Call], Any] = None,
+                 pages: Callable[[Call, int], Iterable[List[dict]]] = None,
+                 fail: Iterable[str] = (),
+                 fail_status: int = 500,
+                 delay: Union[float, Callable[[Call], float]] = 0.0,
+                 **attrs) -> None:
+        """
+        Args:
+            respond (Callable[[Call], Any], optional): returns the response of a request, it may raise `APIError`.
+                Defaults to the `respond` method, which returns the sent data.
+            pages (Callable[[Call, int], Iterable[List[dict]]], optional): returns the pages of a listing for a call
+                and a page size. Defaults to the `pages` method, which returns no pages.
+            fail (Iterable[str], optional): the endpoints that requests fail on with `fail_status`. Defaults to ().
+            fail_status (int, optional): the status code of the failures. Defaults to 500.
+            delay (Union[float, Callable[[Call], float]], optional): the seconds each call takes. Defaults to 0.0.
+            **attrs: other attributes of the API handler, eg. `org_data` or `trusted`.
+        """
+        if respond is not None:
+            self.respond = respond
+        if pages is not None:
+            self.pages = pages
+        self.fail = set(fail)
+        self.fail_status = fail_status
+        self.delay = delay
+        for name, value in attrs.items():
+            setattr(self, name, value)
+
+        self.calls: List[Call] = []
+        # the calls in flight
+        self.running = 0
+        self.max_running = 0
+
+    def respond(self, call: Call) -> Any:
+        return call.data
+
+    def pages(self, call: Call, limit: int) -> Iterable[List[dict]]:
+        return ()
+
+    def log(self, *fields: str) -> list:
+        """The calls made so far, eg. `api.log("method", "endpoint")`.
+
+        Args:
+            *fields (str): the `Call` fields to include.
+
+        Returns:
+            list: a tuple of the fields per call, or the field value when one field is given.
+        """
+        if len(fields) == 1:
+            return [getattr(call, fields[0]) for call in self.calls]
+        return [tuple(getattr(call, f) for f in fields) for call in self.calls]
+
+    async def _call(self, call: Call) -> None:
+        self.calls.append(call)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay(call) if callable(self.delay) else self.delay)
+        finally:
+            self.running -= 1
+
+    async def request(self, method, endpoint, params=None, data=None, headers=None, **kwargs) -> Any:
+        call = Call(method, endpoint, None if params is None else dict(params), data, headers)
+        await self._call(call)
+        if endpoint in self.fail:
+            raise APIError(f"API responded with {self.fail_status}", status_code=self.fail_status)
+        return self.respond(call)
+
+    async def batch_fetch_pages(self, endpoint, params=None, limit=50):
+        call = Call("LIST", endpoint, None if params is None else dict(params))
+        await self._call(call)
+        for page in self.pages(call, limit):
+            yield page
+
+    async def batch_fetch(self, endpoint, params=None, limit=50):
+        async for page in self.batch_fetch_pages(endpoint, params=params, limit=limit):
+            for record in page:
+                yield record
+
+    async def close_session(self) -> None:
+        pass
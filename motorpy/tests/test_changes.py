@@ -0,0 +1,92 @@
+import asyncio
+
+from ..models import Driver, Policy
+from ..models.policy.tests.const import FULL
+from .fakes import FakeAPI
+
+
+def make_api(record=None):
+    "GETs respond with the record."
+    return FakeAPI(respond=lambda call: dict(record or {}) if call.method == "GET" else call.data)
+
+
+def patches(api):
+    return [(c.endpoint, c.data) for c in api.calls if c.method == "PATCH"]
+
+
+DRIVER = {"id": "d-1", "firstName": "Ann", "lastName": "One", "email": "ann@example.com", "telE164": "+44"}
+
+
+class TestChanges:
+
+    def test_only_changed_fields_are_sent(self):
+        api = make_api(DRIVER)
+        driver = Driver.from_api(api, DRIVER)
+
+        asyncio.run(driver.save())
+        assert patches(api) == []
+
+        asyncio.run(driver.update(first_name="Anne", last_name="One"))
+        assert driver.get_changes() == {"firstName": "Anne"}
+        asyncio.run(driver.save())
+        assert patches(api) == [("/drivers/d-1", {"firstName": "Anne"})]
+
+        # the saved state is the new baseline
+        asyncio.run(driver.save())
+        assert len(patches(api)) == 1
+
+    def test_state_computed_when_needed(self):
+        api = make_api()
+        policy = Policy.from_api(api, FULL)
+        # the response is the loaded state until the changes are needed
+        assert policy._loaded is None
+        policy.rates.rates_value = 0.75
+        policy.sum_insured = 200.0
+        assert policy.get_changes() == {"rates": {"value": 0.75}, "sumInsured": 200.0}
+        assert policy._loaded is not None
+
+    def test_in_place_changes(self):
+        for trusted in (False, True):
+            api = make_api()
+            api.trusted = trusted
+            driver = Driver.from_api(api, {**DRIVER, "occupation": {"title": "dev"}})
+            driver.occupation["title"] = "ops"
+            assert driver.get_changes() == {"occupation": {"title": "ops"}}
+            asyncio.run(driver.save())
+            assert patches(api) == [("/drivers/d-1", {"occupation": {"title": "ops"}})]
+
+    def test_refresh_snapshots(self):
+        api = make_api(DRIVER)
+        driver = Driver(id="d-1", api=api)
+        assert driver.get_changes() is None
+
+        asyncio.run(driver.refresh())
+        asyncio.run(driver.update(persist=True, phone="+45"))
+        assert patches(api) == [("/drivers/d-1", {"telE164": "+45"})]
+
+    def test_not_loaded_sends_set_fields(self):
+        api = make_api()
+        driver = Driver(id="d-1", first_name="Ann", api=api)
+        asyncio.run(driver.save())
+        assert patches(api) == [("/drivers/d-1", {"firstName": "Ann"})]
+
+    def test_nested_policy_sections(self):
+        api = make_api()
+        policy = Policy.from_api(api, FULL)
+        policy.rates.rates_value = 0.75
+        policy.premium.base_premium_value = policy.premium.base_premium_value
+        assert policy.get_changes() == {"rates": {"value": 0.75}}
+
+        asyncio.run(policy.save())
+        assert patches(api) == [("/policy/DRV-123", {"rates": {"value": 0.75}})]
+
+    def test_lazy_policy_sections(self):
+        api = make_api()
+        policy = Policy.parse_lazy(api=api, **FULL)
+        assert policy.get_changes() == {}
+        assert "rates" in policy._lazy_sections
+
+        policy.rates.rates_value = 0.75
+        assert policy.get_changes() == {"rates": {"value": 0.75}}
+        # the other sections are still pending
+        assert "premium" in policy._lazy_sections
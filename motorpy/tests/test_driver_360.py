@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+
+from ..base import Motor
+from ..api.exceptions import APIError
+from ..models.drivers.aggregate import PartStatus
+from .fakes import FakeAPI
+
+
+def part(call):
+    "The part of the driver 360 a call fetches."
+    parts = call.endpoint.strip("/").split("/")
+    if call.method == "LIST":
+        return "policies" if call.endpoint == "policy" else "charges"
+    if parts[0] == "fleets":
+        return "fleets"
+    if len(parts) == 2:
+        return "driver"
+    return parts[2].replace("-", "_")
+
+
+def make_motor(delays=None, errors=()):
+    delays = delays or {}
+
+    def respond(call):
+        name = part(call)
+        if name in errors:
+            raise APIError("API responded with 500", status_code=500)
+        if name == "fleets":
+            return {"id": call.endpoint.strip("/").split("/")[1], "display": "Fleet"}
+        if name == "driver":
+            return {"id": call.endpoint.strip("/").split("/")[1], "firstName": "Joe", "lastName": "Adams", "fleets": [{"id": "f-1"}]}
+        if name == "vehicles":
+            return [{"id": "drv-1", "registeredVehicle": {"id": "v-1"}}]
+        if name == "billing_accounts":
+            return [{"id": "ba-1"}]
+        raise AssertionError(call.endpoint)
+
+    def pages(call, limit):
+        if part(call) in errors:
+            raise APIError("API responded with 500", status_code=500)
+        if part(call) == "policies":
+            return [[{"id": "p-1", "policyGroupId": "g"}]]
+        return [[{"id": f"c-{i}", "amount": 100} for i in range(30)]]
+
+    motor = Motor("org", region="eu-1")
+    motor.api = FakeAPI(respond=respond, pages=pages, delay=lambda call: delays.get(part(call), 0.01))
+    return motor
+
+
+class TestDriver360:
+
+    def test_all_parts(self):
+        motor = make_motor()
+        result = asyncio.run(motor.get_driver_360("d-1", max_charges=5))
+        assert result.complete
+        assert result.driver.full_name == "Joe Adams"
+        assert [v.id for v in result.vehicles] == ["drv-1"]
+        assert [f.id for f in result.fleets] == ["f-1"]
+        assert [p.id for p in result.policies] == ["p-1"]
+        assert [a.id for a in result.billing_accounts] == ["ba-1"]
+        assert len(result.charges) == 5
+        # the driver and the other parts run at once
+        assert motor.api.max_running >= 5
+        # attached to the driver
+        assert asyncio.run(result.driver.list_vehicles()) is result.vehicles
+
+    def test_partial_results(self):
+        motor = make_motor(delays={"policies": 1.0}, errors={"billing_accounts"})
+        result = asyncio.run(motor.get_driver_360("d-1", timeouts={"policies": 0.05}))
+        assert not result.complete
+        assert result.parts["policies"].status == PartStatus.timeout
+        assert result.parts["billing_accounts"].status == PartStatus.error
+        assert sorted(result.failed_parts()) == ["billing_accounts", "policies"]
+        assert result.policies == [] and result.billing_accounts == []
+        assert [v.id for v in result.vehicles] == ["drv-1"]
+        assert result.seconds < 1.0
+
+    def test_selected_parts(self):
+        motor = make_motor()
+        result = asyncio.run(motor.get_driver_360("d-1", parts=["vehicles"]))
+        assert result.parts["vehicles"].status == PartStatus.ok
+        assert result.parts["charges"].status == PartStatus.skipped
+        assert result.complete
+        with pytest.raises(ValueError):
+            asyncio.run(motor.get_driver_360("d-1", parts=["claims"]))
+
+    def test_driver_error(self):
+        motor = make_motor(errors={"driver"})
+        with pytest.raises(APIError):
+            asyncio.run(motor.get_driver_360("d-1"))
@@ -0,0 +1,62 @@
+from itertools import product
+
+from pydantic import BaseModel
+
+from ..models import Driver, Vehicle, Policy
+from ..models.custom import Exporter, _get_export_plan
+from ..models.policy.tests.const import FULL
+from .test_trusted import DRIVER
+
+
+def reference_dict(model, exclude=None, include=None, by_alias=False, exclude_unset=False, exclude_defaults=False):
+    "The original uncompiled export, kept to check the output is unchanged."
+    exclude = exclude or set()
+    include = include or set()
+    result = {}
+    for key, value in model.__dict__.items():
+        if key in exclude:
+            continue
+        if key in include:
+            result[key] = value
+            continue
+        if key.startswith("_"):
+            continue
+        if key not in model.__fields_set__ and exclude_unset:
+            continue
+        if key in {"api", "api_path"}:
+            continue
+        key = model.__fields__[key].alias if by_alias and model.__fields__[key].alias else key
+        if isinstance(value, Exporter):
+            result[key] = reference_dict(value, exclude, include, by_alias, exclude_unset, exclude_defaults)
+        elif isinstance(value, BaseModel):
+            result[key] = value.dict(exclude=exclude, include=include, exclude_unset=exclude_unset,
+                                     exclude_defaults=exclude_defaults, by_alias=by_alias)
+        else:
+            result[key] = value
+    return result
+
+
+class TestExport:
+
+    def test_matches_reference(self):
+        models = [
+            Driver(**DRIVER),
+            Vehicle(id="v-1", regPlate="ABC", vehicle={"id": "t-1", "brand": "Audi"}),
+            Policy(**FULL),
+        ]
+        options = [
+            {"exclude": {"api", "id", "created_at"}},
+            {"include": {"api"}},
+            {},
+        ]
+        for model, opts, by_alias, exclude_unset in product(models, options, (True, False), (True, False)):
+            expected = reference_dict(model, by_alias=by_alias, exclude_unset=exclude_unset, **opts)
+            result = model.dict(by_alias=by_alias, exclude_unset=exclude_unset, **opts)
+            assert result == expected
+            assert list(result) == list(expected)
+
+    def test_plan_cached(self):
+        plan = _get_export_plan(Driver)
+        assert plan is _get_export_plan(Driver)
+        assert "api" not in plan.names
+        assert plan.aliases["first_name"] == "firstName"
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from ..api.exceptions import APIError
+from ..api.idempotency import IDEMPOTENCY_HEADER, IdempotencyJournal, derive_key, new_key
+from ..base import Motor
+from ..models import Driver, Fleet
+from .fakes import FakeAPI
+
+
+class CreateAPI(FakeAPI):
+    "Creates records, the first `timeouts` calls time out."
+
+    def __init__(self, timeouts=0):
+        super().__init__(delay=0.001)
+        self.timeouts = timeouts
+
+    def respond(self, call):
+        if self.timeouts:
+            self.timeouts -= 1
+            raise APIError("API responded with 504", status_code=504)
+        return {**(call.data or {}), "id": f"id-{len(self.calls)}"}
+
+    def keys(self):
+        "The method, endpoint and idempotency key of each call."
+        return [(c.method, c.endpoint, (c.headers or {}).get(IDEMPOTENCY_HEADER)) for c in self.calls]
+
+
+def make_motor(**kwargs):
+    motor = Motor("org", region="eu-1", **kwargs)
+    api = CreateAPI()
+    api.idempotency_journal = motor.api.idempotency_journal
+    motor.api = api
+    return motor
+
+
+class TestIdempotency:
+
+    def test_keys(self):
+        assert derive_key("drivers", "a@b.com") == derive_key("drivers", "a@b.com")
+        assert derive_key("drivers", "a@b.com") != derive_key("drivers", "b@b.com")
+        assert new_key() != new_key()
+        with pytest.raises(ValueError):
+            derive_key()
+
+    def test_retry_after_failure(self):
+        motor = make_motor()
+        motor.api.timeouts = 1
+        driver = Driver(first_name="Ann", last_name="One", email="a@b.com")
+
+        async def main():
+            with pytest.raises(APIError):
+                await motor.create_driver(driver, password="pw", idempotency_key="k-1")
+            first = await motor.create_driver(driver, password="pw", idempotency_key="k-1")
+            again = await motor.create_driver(driver, password="pw", idempotency_key="k-1")
+            return first, again
+
+        first, again = asyncio.run(main())
+        assert first.id == again.id == "id-2"
+        assert motor.api.keys() == [("POST", "drivers", "k-1"), ("POST", "drivers", "k-1")]
+
+    def test_concurrent_calls_share_a_request(self):
+        motor = make_motor()
+
+        async def main():
+            return await asyncio.gather(*(motor.create_fleet(Fleet(display="F"), idempotency_key="k") for _ in range(3)))
+
+        fleets = asyncio.run(main())
+        assert {f.id for f in fleets} == {"id-1"}
+        assert len(motor.api.calls) == 1
+
+    def test_key_bound_to_request(self):
+        motor = make_motor()
+        driver = Driver(id="d-1", api=motor.api)
+
+        async def main():
+            await driver.charge(100, idempotency_key="k")
+            with pytest.raises(ValueError):
+                await motor.create_driver(Driver(first_name="Ann", last_name="One", email="a@b.com"),
+                                          password="pw", idempotency_key="k")
+            # concurrent calls
+            with pytest.raises(ValueError):
+                await asyncio.gather(motor.create_fleet(Fleet(display="F"), idempotency_key="k-2"),
+                                     driver.charge(100, idempotency_key="k-2"))
+
+        asyncio.run(main())
+        assert [c.method for c in motor.api.calls] == ["POST", "POST"]
+
+    def test_without_key(self):
+        motor = make_motor()
+        for _ in range(2):
+            asyncio.run(motor.create_fleet(Fleet(display="F")))
+        assert motor.api.keys() == [("POST", "fleets", None), ("POST", "fleets", None)]
+        assert motor.api.idempotency_journal is None
+
+    def test_journal_file(self, tmp_path):
+        path = str(tmp_path / "journal.db")
+        motor = make_motor(idempotency_journal=path)
+        driver = Driver(id="d-1", api=motor.api)
+        event = asyncio.run(driver.charge(100, idempotency_key="charge-1"))
+        motor.api.idempotency_journal.close()
+
+        # a resumed run with the same journal does not charge again
+        resumed = make_motor(idempotency_journal=IdempotencyJournal(path))
+        driver = Driver(id="d-1", api=resumed.api)
+        again = asyncio.run(driver.charge(100, idempotency_key="charge-1"))
+        assert resumed.api.calls == []
+        assert again.id == event.id
+        assert len(resumed.api.idempotency_journal) == 1
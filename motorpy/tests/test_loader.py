@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+
+from ..base import Motor
+from ..api.exceptions import APIError
+from ..api.loader import BatchLoader
+from .fakes import FakeAPI
+
+
+def make_api(records, max_page_size=None):
+    def respond(call):
+        record_id = call.endpoint.rsplit("/", 1)[-1]
+        if record_id not in records:
+            raise APIError("API responded with 404", status_code=404)
+        return records[record_id]
+
+    def pages(call, limit):
+        # the API may cap the page size
+        yield [records[i] for i in call.params["ids"].split(",") if i in records][:max_page_size]
+
+    return FakeAPI(respond=respond, pages=pages)
+
+
+def make_motor(id_filters=None, **kwargs):
+    motor = Motor("org", region="eu-1", id_filters=id_filters, **kwargs)
+    motor.api = make_api({f"d-{i}": {"id": f"d-{i}", "firstName": "Joe", "lastName": "Adams", "email": "x"}
+                          for i in range(3)})
+    return motor
+
+
+class TestBatchLoader:
+
+    def test_batches_one_tick(self):
+        calls = []
+
+        async def fetch(keys):
+            calls.append(keys)
+            return {k: k.upper() for k in keys if k != "missing"}
+
+        async def main():
+            loader = BatchLoader(fetch, max_batch_size=2)
+            values = await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"), loader.load("missing"))
+            assert values == ["A", "B", "A", None]
+            # cached
+            assert await loader.load("b") == "B"
+            loader.prime("c", "C!")
+            assert await loader.load_many(["c", "a"]) == ["C!", "A"]
+
+        asyncio.run(main())
+        assert calls == [["a", "b"], ["missing"]]
+
+    def test_errors_not_cached(self):
+        attempts = []
+
+        async def fetch(keys):
+            attempts.append(keys)
+            if len(attempts) == 1:
+                raise RuntimeError("down")
+            return {k: k for k in keys}
+
+        async def main():
+            loader = BatchLoader(fetch)
+            with pytest.raises(RuntimeError):
+                await loader.load("a")
+            assert await loader.load("a") == "a"
+
+        asyncio.run(main())
+
+    def test_cancelled_batch_not_stuck(self):
+        attempts = []
+
+        async def fetch(keys):
+            attempts.append(keys)
+            if len(attempts) == 1:
+                raise asyncio.CancelledError()
+            return {k: k for k in keys}
+
+        async def main():
+            loader = BatchLoader(fetch)
+            with pytest.raises(asyncio.CancelledError):
+                await loader.load("a")
+            assert loader._futures == {}
+            assert await asyncio.wait_for(loader.load("a"), timeout=1) == "a"
+
+        asyncio.run(main())
+
+
+class TestMotorLoaders:
+
+    def test_individual_requests(self):
+        motor = make_motor()
+
+        async def main():
+            return await asyncio.gather(motor.load_driver("d-1"), motor.load_driver("d-2"), motor.load_driver("d-1"),
+                                        return_exceptions=True)
+
+        d1, d2, again = asyncio.run(main())
+        assert d1.id == "d-1" and d2.id == "d-2" and again is d1
+        assert len(motor.api.calls) == 2
+
+    def test_id_filter(self):
+        motor = make_motor({"drivers": "ids"})
+
+        async def main():
+            return await asyncio.gather(*(motor.load_driver(f"d-{i}") for i in range(4)))
+
+        drivers = asyncio.run(main())
+        assert [d.id if d else None for d in drivers] == ["d-0", "d-1", "d-2", None]
+        # the missing driver is asked for again
+        assert motor.api.log("method", "endpoint", "params") == [
+            ("LIST", "drivers", {"ids": "d-0,d-1,d-2,d-3"}), ("LIST", "drivers", {"ids": "d-3"})
+        ]
+        assert drivers[0].api is motor.api
+
+    def test_id_filter_pages(self):
+        motor = make_motor({"drivers": "ids"})
+        motor.api = make_api({f"d-{i}": {"id": f"d-{i}"} for i in range(120)}, max_page_size=20)
+
+        async def main():
+            return await asyncio.gather(*(motor.load_driver(f"d-{i}") for i in range(120)))
+
+        drivers = asyncio.run(main())
+        assert [d.id for d in drivers] == [f"d-{i}" for i in range(120)]
+        assert max(len(p["ids"].split(",")) for p in motor.api.log("params")) == 50
+
+    def test_cache(self):
+        for cache_loads, requests in ((False, 2), (True, 1)):
+            motor = make_motor(cache_loads=cache_loads)
+
+            async def main():
+                await motor.load_driver("d-1")
+                await motor.load_driver("d-1")
+
+            asyncio.run(main())
+            assert len(motor.api.calls) == requests
+
+    def test_invalid_filters(self):
+        with pytest.raises(ValueError):
+            Motor("org", region="eu-1", id_filters={"trips": "ids"})
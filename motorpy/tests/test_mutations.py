@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from ..api.exceptions import APIError
+from ..models import Driver, Policy
+from ..models.billing import BillingAccount
+from ..util.retry import backoff_delays, poll_until
+from .fakes import FakeAPI
+
+
+class RecordAPI(FakeAPI):
+
+    def __init__(self, response=None, missing_reads=0):
+        super().__init__()
+        # the PATCH/POST response: None, the sent data merged into RECORD, or a fixed body
+        self.response = response
+        self.missing_reads = missing_reads
+
+    def respond(self, call):
+        if call.method == "GET":
+            if self.missing_reads:
+                self.missing_reads -= 1
+                raise APIError("Not found", 404, call.endpoint)
+            return dict(RECORD, id=call.endpoint.rsplit("/", 1)[-1])
+        if self.response == "merge":
+            return {**RECORD, **call.data}
+        return self.response
+
+
+RECORD = {"id": "p-1", "createdAt": "2020-01-01T00:00:00Z", "isActivePolicy": True}
+
+
+class TestPolicyMutations:
+
+    def test_updated_from_response(self):
+        api = RecordAPI("merge")
+        policy = Policy.from_api(api, RECORD)
+
+        asyncio.run(policy.internal_approve(approved_by_id="6f1c5a2e-3d4b-4c8e-9a7f-2b1d0e9c8a76"))
+        assert api.log("method") == ["PATCH"]
+        assert api.calls[0].endpoint == "/policy/p-1"
+        assert policy.is_approved()
+        assert policy.get_changes() == {}
+
+    def test_refresh_without_response(self):
+        api = RecordAPI()
+        policy = Policy.from_api(api, RECORD)
+
+        asyncio.run(policy.driver_approve())
+        assert api.log("method") == ["PATCH", "GET"]
+
+    def test_applied_locally_without_refresh(self):
+        api = RecordAPI()
+        policy = Policy.from_api(api, RECORD)
+        policy.cancellation.cancellation_message = "not sent"
+
+        asyncio.run(policy.cancel(refresh=False))
+        assert api.log("method") == ["PATCH"]
+        assert policy.is_cancelled()
+        # the local change that was not sent is still pending
+        assert policy.get_changes() == {"cancellation": {"message": "not sent"}}
+
+        asyncio.run(policy.cancel(refresh=False, message="fraud"))
+        assert policy.cancellation.cancellation_message == "fraud"
+        assert policy.get_changes() == {}
+
+
+class TestBillingAccount:
+
+    def test_from_response(self):
+        api = RecordAPI({"id": "ba-1", "createdAt": "2020-01-01T00:00:00Z"})
+        driver = Driver(id="d-1", api=api)
+
+        account = asyncio.run(driver.create_billing_account(BillingAccount()))
+        assert account.id == "ba-1"
+        assert api.log("method") == ["POST"]
+
+    def test_polls_until_readable(self):
+        api = RecordAPI({"id": "ba-1"}, missing_reads=2)
+        driver = Driver(id="d-1", api=api)
+
+        account = asyncio.run(driver.create_billing_account(BillingAccount()))
+        assert account.id == "ba-1"
+        assert api.log("method") == ["POST", "GET", "GET", "GET"]
+
+
+class TestPollUntil:
+
+    def test_backoff_delays(self):
+        delays = backoff_delays(0.5, max_delay=3.0)
+        assert [next(delays) for _ in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+    def test_ready(self):
+        results = iter(["pending", "pending", "done"])
+
+        async def fetch():
+            return next(results)
+
+        assert asyncio.run(poll_until(fetch, ready=lambda r: r == "done", initial_delay=0.01)) == "done"
+
+    def test_timeout(self):
+        async def fetch():
+            return "pending"
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(poll_until(fetch, ready=lambda r: r == "done", timeout=0.05, initial_delay=0.01))
+
+    def test_errors(self):
+        async def missing():
+            raise APIError("Not found", 404)
+
+        async def failing():
+            raise APIError("Server error", 500)
+
+        with pytest.raises(APIError) as e:
+            asyncio.run(poll_until(missing, timeout=0.05, initial_delay=0.01))
+        assert e.value.status_code == 404
+
+        attempts = []
+
+        async def counted():
+            attempts.append(1)
+            return await failing()
+
+        with pytest.raises(APIError):
+            asyncio.run(poll_until(counted, initial_delay=0.01))
+        assert len(attempts) == 1
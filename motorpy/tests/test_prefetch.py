@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+
+from ..base import Motor
+from ..models import Fleet, FleetDriverVehicleAssignment
+from ..util.concurrency import gather_limited
+from .fakes import FakeAPI
+
+
+class DriversAPI(FakeAPI):
+
+    def __init__(self, drivers, page_size=2):
+        super().__init__(delay=0.001)
+        self.drivers = drivers
+        self.page_size = page_size
+
+    def respond(self, call):
+        parts = call.endpoint.strip("/").split("/")
+        if parts[0] == "drivers" and len(parts) == 3:
+            return [{"id": f"{parts[1]}-v", "registeredVehicle": {"id": "v-1"}}]
+        if parts[0] == "drivers":
+            return {"id": parts[1], "fleets": [{"id": "f-1"}, {"id": f"f-{parts[1]}"}]}
+        if parts[0] == "fleets":
+            return {"id": parts[1], "display": "Fleet"}
+        raise AssertionError(call.endpoint)
+
+    def pages(self, call, limit):
+        endpoint = call.endpoint
+        if endpoint == "drivers":
+            return [self.drivers[i:i + self.page_size] for i in range(0, len(self.drivers), self.page_size)]
+        if endpoint.endswith("/drivers"):
+            return [[{"id": "f-1", "driver": d} for d in self.drivers]]
+        if endpoint == "policy":
+            return [[{"id": f"p-{call.params.get('driverIds')}", "policyGroupId": "g"}]]
+        if "/vehicles" in endpoint:
+            return [[{"driver": {"id": endpoint.split("/")[-2]}, "registeredVehicle": {"id": "v-1"}}]]
+        raise AssertionError(endpoint)
+
+
+def make_motor(count=5):
+    motor = Motor("org", region="eu-1")
+    motor.api = DriversAPI([{"id": f"d-{i}", "firstName": "Joe", "lastName": "Adams"} for i in range(count)])
+    return motor
+
+
+async def collect(gen):
+    return [x async for x in gen]
+
+
+class TestPrefetch:
+
+    def test_gather_limited(self):
+        running = []
+
+        async def work(i):
+            running.append(i)
+            assert len(running) <= 2
+            await asyncio.sleep(0.001)
+            running.remove(i)
+            return i
+
+        assert asyncio.run(gather_limited((work(i) for i in range(5)), limit=2)) == [0, 1, 2, 3, 4]
+
+    def test_drivers(self):
+        motor = make_motor()
+
+        async def main():
+            drivers = await collect(motor.list_drivers(prefetch=["vehicles", "policies", "fleets"], concurrency=3))
+            motor.api.calls.clear()
+            for d in drivers:
+                vehicles = await d.list_vehicles()
+                assert [v.id for v in vehicles] == [f"{d.id}-v"]
+                assert [p.id for p in await collect(d.list_policies())] == [f"p-{d.id}"]
+                assert [f.id for f in await d.list_fleets()] == ["f-1", f"f-{d.id}"]
+            # everything was prefetched
+            assert motor.api.calls == []
+            return drivers
+
+        drivers = asyncio.run(main())
+        assert len(drivers) == 5
+        assert motor.api.max_running <= 3
+        # the shared fleet is fetched once
+        assert len({id(d.get_prefetched("fleets")[0]) for d in drivers}) == 1
+
+    def test_max_records(self):
+        motor = make_motor()
+        drivers = asyncio.run(collect(motor.list_drivers(prefetch=["vehicles"], max_records=3)))
+        assert [d.id for d in drivers] == ["d-0", "d-1", "d-2"]
+        assert sum(1 for r in motor.api.calls if r.endpoint.endswith("/vehicles")) == 3
+
+    def test_policy_filters_bypass_prefetch(self):
+        motor = make_motor(1)
+
+        async def main():
+            driver, = await collect(motor.list_drivers(prefetch=["policies"]))
+            motor.api.calls.clear()
+            await collect(driver.list_policies(is_active_policy=True))
+            return motor.api.calls
+
+        assert len(asyncio.run(main())) == 1
+
+    def test_fleet_drivers(self):
+        motor = make_motor(3)
+        fleet = Fleet(id="f-1", display="Fleet", api=motor.api)
+        fleet_drivers = asyncio.run(collect(fleet.list_drivers(prefetch=["assignments"])))
+        assert [fd.id for fd in fleet_drivers] == ["d-0", "d-1", "d-2"]
+        for fd in fleet_drivers:
+            assignments = fd.get_prefetched("assignments")
+            assert isinstance(assignments[0], FleetDriverVehicleAssignment)
+            assert assignments[0].driver.id == fd.id
+
+    def test_invalid_relation(self):
+        motor = make_motor()
+        with pytest.raises(ValueError):
+            asyncio.run(collect(motor.list_drivers(prefetch=["claims"])))
+        with pytest.raises(ValueError):
+            asyncio.run(collect(motor.list_drivers(prefetch=["vehicles"], records=True)))
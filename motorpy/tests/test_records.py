@@ -0,0 +1,45 @@
+import pytest
+from datetime import date, datetime
+
+from ..models import Driver, Vehicle
+from ..models.records import Record, record_type
+from .test_trusted import DRIVER, TrustedAPI
+
+
+class TestRecords:
+
+    def test_fields(self):
+        record = record_type(Driver).from_api(DRIVER)
+        assert isinstance(record, Record)
+        assert not hasattr(record, "__dict__")
+        assert record.first_name == "Joe"
+        assert record.date_of_birth == date(1990, 2, 1)
+        assert isinstance(record.created_at, datetime)
+        assert record.risk.dynamic.weighting == 0.5
+        assert record.middle_name is None
+        assert record.vehicle_count == 0
+
+    def test_read_only(self):
+        record = record_type(Driver).from_api(DRIVER)
+        with pytest.raises(AttributeError):
+            record.first_name = "Jane"
+        with pytest.raises(AttributeError):
+            del record.first_name
+
+    def test_to_model(self):
+        api = TrustedAPI()
+        api.trusted = False
+        data = {"id": "v-1", "regPlate": "ABC", "vehicle": {"id": "t-1", "brand": "Audi"}}
+        record = record_type(Vehicle).from_api(data, api=api)
+        assert record.vehicle_type.brand == "Audi"
+
+        model = record.to_model()
+        assert isinstance(model, Vehicle)
+        assert model.api is api
+        assert model == Vehicle(api=api, **data)
+        assert record.to_dict(by_alias=True)["vehicle"]["brand"] == "Audi"
+
+    def test_type_cached(self):
+        assert record_type(Driver) is record_type(Driver)
+        assert record_type(Driver).__name__ == "DriverRecord"
+        assert record_type(Driver).from_api(DRIVER) == record_type(Driver).from_api(DRIVER)
@@ -0,0 +1,91 @@
+import asyncio
+
+from ..api.org import OrgSettings
+from ..models import Driver, Fleet
+from .fakes import FakeAPI
+
+
+def respond(call):
+    parts = call.endpoint.strip("/").split("/")
+    if len(parts) == 2:
+        return {"id": parts[1], "display": "Fleet"}
+    # fleet driver
+    return {"id": parts[1], "sourceId": f"fd-{parts[1]}", "driver": {"id": parts[3]}}
+
+
+def pages(call, limit):
+    fleet_id = call.endpoint.strip("/").split("/")[1]
+    yield [
+        {"assigned": True, "isActive": True, "sourceId": f"fdrv-{fleet_id}", "driver": {"id": "d-1", "sourceId": f"fdrv-{fleet_id}"}},
+        {"assigned": False, "isActive": True, "sourceId": f"frv-{fleet_id}"}
+    ]
+
+
+def make_api(source_id_type):
+    return FakeAPI(respond=respond, pages=pages, delay=0.001, org_data=OrgSettings(sourceIdType=source_id_type))
+
+
+def make_driver(api, fleets=6):
+    return Driver(id="d-1", api=api, fleets=[{"id": f"f-{i}"} for i in range(fleets)])
+
+
+class TestTrackable:
+
+    def test_fleet_drivers_concurrent(self):
+        api = make_api("fd")
+        driver = make_driver(api)
+
+        async def main():
+            assets = await driver.list_trackable_models(concurrency=3)
+            assert await driver.tracking_id == "fd-f-0"
+            return assets
+
+        assets = asyncio.run(main())
+        assert [a.source_id for a in assets] == [f"fd-f-{i}" for i in range(6)]
+        # 6 fleets and 6 fleet drivers, memoized for tracking_id
+        assert len(api.calls) == 12
+        assert 1 < api.max_running <= 3
+
+    def test_assignments(self):
+        api = make_api("fdrv")
+        driver = make_driver(api, fleets=3)
+        assets = asyncio.run(driver.list_trackable_models(fleet_id="f-1"))
+        assert [a.source_id for a in assets] == ["fdrv-f-1"]
+
+        api.org_data = OrgSettings(sourceIdType="frv")
+        assets = asyncio.run(driver.list_trackable_models())
+        assert [a.source_id for a in assets] == ["frv-f-0", "frv-f-1", "frv-f-2"]
+
+    def test_invalidation(self):
+        api = make_api("fd")
+        driver = make_driver(api, fleets=2)
+
+        async def main():
+            await driver.list_trackable_models()
+            api.calls.clear()
+            await driver.list_trackable_models()
+            assert api.calls == []
+            driver.invalidate_trackable_models()
+            await driver.list_trackable_models()
+            # the fleets are not cached between calls, they are fetched fresh with the fleet drivers
+            assert sorted(api.log("endpoint")) == [
+                "/fleets/f-0/drivers/d-1", "/fleets/f-1/drivers/d-1", "fleets/f-0", "fleets/f-1"
+            ]
+
+        asyncio.run(main())
+
+    def test_roster_change(self):
+        api = make_api("fd")
+        driver = make_driver(api, fleets=2)
+
+        async def main():
+            await driver.list_trackable_models()
+            await Fleet(id="f-1", display="Fleet", api=api).remove_driver("d-2")
+            api.calls.clear()
+            await driver.list_trackable_models()
+            assert len(api.calls) == 4
+            api.calls.clear()
+            await driver.list_trackable_models()
+            assert api.calls == []
+
+        asyncio.run(main())
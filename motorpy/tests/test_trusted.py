@@ -0,0 +1,67 @@
+from datetime import datetime, date
+
+from ..models import Driver, Vehicle, Policy
+from ..models.billing import BillingEvent
+from ..models.billing.events import BillingEventStatus
+from ..models.policy.enums import PolicyGroup
+from ..models.policy.tests.const import FULL
+from ..models.trusted import construct_trusted, get_plan
+
+
+class TrustedAPI:
+    trusted = True
+
+
+DRIVER = {
+    "id": "d-1",
+    "firstName": "Joe",
+    "lastName": "Adams",
+    "email": "joe@example.com",
+    "dob": "1990-02-01",
+    "createdAt": "2022-01-01T10:00:00Z",
+    "isActive": True,
+    "risk": {"dynamic": {"apply": True, "process": "std", "weighting": 0.5}},
+    "vehiclesRaw": [],
+}
+
+
+class TestTrusted:
+
+    def test_matches_validated(self):
+        trusted = construct_trusted(Driver, DRIVER)
+        validated = Driver(**DRIVER)
+
+        assert trusted.date_of_birth == date(1990, 2, 1)
+        assert isinstance(trusted.created_at, datetime)
+        assert trusted.created_at == validated.created_at
+        assert trusted.risk == validated.risk
+        assert trusted.__fields_set__ == validated.__fields_set__
+        assert trusted.dict() == validated.dict()
+
+    def test_enums_and_defaults(self):
+        event = construct_trusted(BillingEvent, {"id": "b-1", "status": "paid"})
+        assert event.status is BillingEventStatus.paid
+        assert event.amount == 0
+        assert event.__fields_set__ == {"id", "status"}
+
+    def test_nested_policy(self):
+        trusted = construct_trusted(Policy, {**FULL, "policyGroup": "drv"})
+        validated = Policy(**{**FULL, "policyGroup": "drv"})
+        assert trusted.policy_group is PolicyGroup.DRV
+        assert trusted.duration.start == validated.duration.start
+        assert trusted.is_live() == validated.is_live()
+
+    def test_from_api(self):
+        api = TrustedAPI()
+        v = Vehicle.from_api(api, {"id": "v-1", "regPlate": "ABC", "vehicle": {"id": "t-1", "brand": "Audi"}})
+        assert v.api is api
+        assert v.vehicle_type.brand == "Audi"
+        assert "api" in v.__fields_set__
+
+        # validation is kept when the api is not trusted
+        api.trusted = False
+        v = Vehicle.from_api(api, {"id": "v-1", "regPlate": " ABC "})
+        assert v.reg_plate == "ABC"
+
+    def test_plan_cached(self):
+        assert get_plan(Driver) is get_plan(Driver)
@@ -0,0 +1,27 @@
+import asyncio
+from typing import Any, Awaitable, Iterable, List
+
+# the default maximum number of concurrent requests of a fan out
+DEFAULT_CONCURRENCY = 10
+
+
+async def gather_limited(aws: Iterable[Awaitable], limit: int = DEFAULT_CONCURRENCY, return_exceptions: bool = False) -> List[Any]:
+    """Run awaitables concurrently, with at most `limit` running at once.
+
+    Args:
+        aws (Iterable[Awaitable]): the coroutines or futures.
+        limit (int, optional): the maximum number running at once. Defaults to 10.
+        return_exceptions (bool, optional): whether to return exceptions as results instead of raising the first one. Defaults to False.
+
+    Returns:
+        List[Any]: the results, in the same order.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw: Awaitable) -> Any:
+        async with semaphore:
+            return await aw
+
+    return list(await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=return_exceptions))
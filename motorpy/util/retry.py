@@ -0,0 +1,91 @@
+import asyncio
+from typing import Awaitable, Callable, Collection, Iterator, Optional, TypeVar
+
+import aiohttp
+
+from motorpy.api.exceptions import APIError
+
+T = TypeVar("T")
+
+# API status codes of failures that may succeed when the request is made again
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed request may succeed when it is made again, eg. a timeout or a 503.
+
+    Args:
+        error (BaseException): the error of the request.
+
+    Returns:
+        bool: True for timeouts, connection errors (including aiohttp's) and API errors with a transient status code.
+    """
+    if isinstance(error, APIError):
+        return error.status_code in TRANSIENT_STATUSES
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError,
+                              aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError))
+
+
+def backoff_delays(initial: float = 0.1, factor: float = 2.0, max_delay: float = 2.0) -> Iterator[float]:
+    """Exponential backoff delays, eg. 0.1, 0.2, 0.4, ... up to `max_delay`.
+
+    Args:
+        initial (float, optional): the first delay in seconds. Defaults to 0.1.
+        factor (float, optional): the delay is multiplied by this after each attempt. Defaults to 2.0.
+        max_delay (float, optional): the maximum delay in seconds. Defaults to 2.0.
+
+    Yields:
+        float: the next delay in seconds.
+    """
+    delay = initial
+    while True:
+        yield min(delay, max_delay)
+        delay *= factor
+
+
+async def poll_until(fetch: Callable[[], Awaitable[T]],
+                     ready: Optional[Callable[[T], bool]] = None,
+                     timeout: float = 10.0,
+                     initial_delay: float = 0.1,
+                     max_delay: float = 2.0,
+                     retry_statuses: Collection[int] = (404,)) -> T:
+    """Poll until a record written to the API is readable, backing off between attempts.
+
+    Use this instead of a fixed sleep when the API makes writes visible eventually:
+    the first attempt is made at once, and the wait is bounded by `timeout`.
+
+    Args:
+        fetch (Callable[[], Awaitable[T]]): makes the read, eg. `lambda: driver.get_billing_account(account_id)`.
+        ready (Optional[Callable[[T], bool]], optional): whether a result is final, any result is if None. Defaults to None.
+        timeout (float, optional): the maximum seconds to poll for. Defaults to 10.0.
+        initial_delay (float, optional): the first delay in seconds, doubled after each attempt. Defaults to 0.1.
+        max_delay (float, optional): the maximum delay in seconds. Defaults to 2.0.
+        retry_statuses (Collection[int], optional): API error status codes that mean "not yet". Defaults to (404,).
+
+    Raises:
+        APIError: an API error with another status code, or the last API error when the timeout is reached.
+        asyncio.TimeoutError: the result was not ready when the timeout was reached.
+
+    Returns:
+        T: the first ready result.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    for delay in backoff_delays(initial_delay, max_delay=max_delay):
+        error: Optional[APIError] = None
+        try:
+            result = await fetch()
+        except APIError as e:
+            if e.status_code not in retry_statuses:
+                raise
+            error = e
+        else:
+            if ready is None or ready(result):
+                return result
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            if error is not None:
+                raise error
+            raise asyncio.TimeoutError(f"Not ready after {timeout} seconds")
+        await asyncio.sleep(min(delay, remaining))
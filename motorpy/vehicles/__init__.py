@@ -1 +1,2 @@
-from .core import Vehicles
\ No newline at end of file
+from .core import Vehicles
+from .provisioning import Provision, ProvisionResult, ProvisionStatus, ProvisionSummary, provision_vehicles
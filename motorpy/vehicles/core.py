@@ -1,8 +1,15 @@
 import motorpy.models as models
 from motorpy.api import APIHandler
-from typing import Generator
+from typing import Generator, Iterable, List, Union
 
+from motorpy.models.records import record_type
+from motorpy.export import export_listing
+from motorpy.models.prefetch import DEFAULT_CONCURRENCY, iter_prefetched
 from motorpy.search import Search
+from motorpy.api.idempotency import forget_key, idempotent_request
+from .provisioning import Provision, ProvisionSummary, provision_vehicles
+
+VehicleRecord = record_type(models.Vehicle)
 
 
 class Vehicles:
@@ -32,7 +39,7 @@ class Vehicles:
         params['distance3m'] = 't' if include_distance else 'f'
         params['totalDrvCount'] = 't' if include_drv_count else 'f'
 
-        return models.Vehicle(api=self.api, **(await self.api.request("GET", f"registered-vehicles/{vehicle_id}", params=params)))
+        return models.Vehicle(api=self.api, **(await self.api.request("GET", f"registered-vehicles/{vehicle_id}", params=params))).snapshot()
 
     async def list_vehicles(self,
                             reg_plate: Search = None,
@@ -40,7 +47,10 @@ class Vehicles:
                             is_active: bool = None,
                             is_approved: bool = None,
                             full_response: bool = True,
-                            max_records: int = None) -> Generator[models.Vehicle, None, None]:
+                            max_records: int = None,
+                            records: bool = False,
+                            prefetch: List[str] = None,
+                            concurrency: int = DEFAULT_CONCURRENCY) -> Generator[Union[models.Vehicle, VehicleRecord], None, None]:
         """Search for registered vehicles.
 
         Args:
@@ -49,10 +59,17 @@ class Vehicles:
             is_active (bool, optional): whether to search for active vehicles. Defaults to None.
             is_approved (bool, optional): whether to search for approved vehicles. Defaults to None.
             full_response (bool, optional): whether to return full response. Defaults to True.
+            records (bool, optional): whether to yield compact read-only records instead of models, see `motorpy.models.records`. Defaults to False.
+            prefetch (List[str], optional): related collections to fetch per page and attach to the vehicles,
+                only "policies", see `motorpy.models.prefetch`. Defaults to None.
+            concurrency (int, optional): the maximum number of prefetch requests at once. Defaults to 10.
 
         Returns:
             dict: the vehicle record.
         """
+        if prefetch and records:
+            raise ValueError("prefetch is not supported with records")
+
         params = {}
 
         if reg_plate:
@@ -66,20 +83,52 @@ class Vehicles:
 
         params['full'] = 't' if full_response else 'f'
 
+        if prefetch:
+            async for vehicle in iter_prefetched(self.api, "registered-vehicles", models.Vehicle, prefetch, params=params,
+                                                 max_records=max_records, concurrency=concurrency):
+                yield vehicle
+            return
+
         count = 0
         async for vehicle in self.api.batch_fetch("registered-vehicles", params=params):
             if max_records is not None:
                 if count >= max_records:
                     break
-            model: models.Vehicle = models.Vehicle(**vehicle, api=self.api)
-            yield model
+            if records:
+                yield VehicleRecord.from_api(vehicle, api=self.api)
+            else:
+                yield models.Vehicle.from_api(self.api, vehicle)
             count += 1
 
+    async def export_vehicles(self,
+                              path: str,
+                              format: str = "parquet",
+                              params: dict = None,
+                              page_size: int = 500,
+                              max_records: int = None) -> int:
+        """Export registered vehicles to a columnar file, see `motorpy.export.columnar`.
+        Pages are written as they are fetched, without creating models.
+
+        Args:
+            path (str): the file path.
+            format (str, optional): one of "parquet", "arrow" or "npz". Defaults to "parquet".
+            params (dict, optional): API query parameters, eg. `{"isActive": "t"}`. Defaults to None.
+            page_size (int, optional): records per request and per batch written. Defaults to 500.
+            max_records (int, optional): the maximum number of vehicles to write. Defaults to None.
+
+        Returns:
+            int: the number of vehicles written.
+        """
+        return await export_listing(self.api, "registered-vehicles", models.Vehicle, path, format=format,
+                                    params={"full": "t", **(params or {})}, page_size=page_size,
+                                    max_records=max_records)
+
     async def create_vehicle(self,
                              vehicle: models.Vehicle,
                              driver_id: str = None,
                              drv: models.DriverVehicle = None,
-                             send_webhook: bool = True) -> models.Vehicle:
+                             send_webhook: bool = True,
+                             idempotency_key: str = None) -> models.Vehicle:
         """Create a new vehicle.
 
         Args:
@@ -87,6 +136,8 @@ class Vehicles:
             driver_id (str, optional): the driver ID, this will assign this vehicle to the driver as an owner (DRV). Defaults to None.
             drv (models.DriverVehicle, optional): the driver vehicle model to overwrite the auto generated DRV if a driver ID is supplied. Defaults to None.
             send_webhook (bool, optional): whether to send a webhook. Defaults to True.
+            idempotency_key (str, optional): retries with the same key return the vehicle created by the first call,
+                see `motorpy.api.idempotency`. Defaults to None.
 
         Returns:
             models.Vehicle: the created vehicle model.
@@ -101,17 +152,19 @@ class Vehicles:
             raise ValueError("Vehicle type ID is required")
 
         # Create the registered vehicle
-        raw = await self.api.request("POST",
-                                     "registered-vehicles",
-                                     data={
-                                         **vehicle.dict(exclude_unset=True),
-                                         "vehicleId": vehicle.vehicle_type.id,
-                                     },
-                                     params={
-                                         "webhook": "t" if send_webhook else "f"
-                                     })
-
-        rv: models.Vehicle = models.Vehicle(**raw, api=self.api)
+        raw = await idempotent_request(self.api,
+                                       "POST",
+                                       "registered-vehicles",
+                                       key=idempotency_key,
+                                       data={
+                                           **vehicle.dict(exclude_unset=True),
+                                           "vehicleId": vehicle.vehicle_type.id,
+                                       },
+                                       params={
+                                           "webhook": "t" if send_webhook else "f"
+                                       })
+
+        rv: models.Vehicle = models.Vehicle(**raw, api=self.api).snapshot()
 
         # create a DRV (optional assignment to driver)
         try:
@@ -123,10 +176,31 @@ class Vehicles:
         except Exception as e:
             # rollback
             await self.api.request("DELETE", f"registered-vehicles/{rv.id}")
+            forget_key(self.api, idempotency_key)
             raise e
 
         return rv
 
+    async def provision_vehicles(self,
+                                 provisions: Iterable[Provision],
+                                 concurrency: int = DEFAULT_CONCURRENCY,
+                                 send_webhook: bool = True,
+                                 rollback: bool = True) -> ProvisionSummary:
+        """Create many vehicles concurrently, each with its DRV and fleet assignment, see `motorpy.vehicles.provisioning`.
+        The completed steps of vehicles that fail are undone in batches once all vehicles are done.
+
+        Args:
+            provisions (Iterable[Provision]): the vehicles, with their driver and fleet.
+            concurrency (int, optional): the maximum number of vehicles provisioned at once. Defaults to 10.
+            send_webhook (bool, optional): whether to send a webhook for each vehicle. Defaults to True.
+            rollback (bool, optional): whether to undo the completed steps of failed vehicles. Defaults to True.
+
+        Returns:
+            ProvisionSummary: the result of each vehicle.
+        """
+        return await provision_vehicles(self.api, provisions, concurrency=concurrency,
+                                        send_webhook=send_webhook, rollback=rollback)
+
     async def list_vehicle_types(self,
                                  brand: Search = None,
                                  model: Search = None,
@@ -165,7 +239,7 @@ class Vehicles:
             if max_records is not None:
                 if count >= max_records:
                     break
-            model: models.VehicleType = models.VehicleType(**vehicle_type, api=self.api)
+            model: models.VehicleType = models.VehicleType.from_api(self.api, vehicle_type)
             yield model
             count += 1
 
@@ -188,7 +262,7 @@ class Vehicles:
                                          "webhook": "t" if send_webhook else "f"
                                      })
 
-        return models.VehicleType(**raw, api=self.api)
+        return models.VehicleType(**raw, api=self.api).snapshot()
     
     async def get_vehicle_type(self, vehicle_type_id: str) -> models.VehicleType:
         """Get a vehicle type.
@@ -200,4 +274,4 @@ class Vehicles:
             models.VehicleType: the vehicle type.
         """
         raw = await self.api.request("GET", f"vehicles/{vehicle_type_id}")
-        return models.VehicleType(**raw, api=self.api)
\ No newline at end of file
+        return models.VehicleType(**raw, api=self.api).snapshot()
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+Bulk vehicle provisioning.
+
+`provision_vehicles` provisions many vehicles concurrently. Each vehicle is an independent saga of up to four steps:
+
+1. `vehicle`: create the registered vehicle
+2. `drv`: add the driver to the vehicle (DRV), if a driver is given
+3. `fleet_vehicle`: add the vehicle to the fleet, if a fleet is given
+4. `assignment`: assign the driver to the vehicle in the fleet, if both are given
+
+When a step fails, the steps that succeeded are undone (compensated) in reverse order.
+Compensations are not run one saga at a time: once all sagas have finished, the compensations of the failed sagas
+are run in batches, one concurrent batch per step, latest step first.
+
+```python
+summary = await motor.provision_vehicles([
+    Provision(vehicle, driver_id="driver-1", fleet_id="fleet-1"),
+    ...
+], concurrency=20)
+print(summary.counts())
+```
+
+A `Provision` with a `key` creates its records with idempotency keys derived from it (see `motorpy.api.idempotency`),
+so a provisioning job can be run again after a crash without creating the same vehicles twice.
+"""
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+import motorpy.models as models
+from motorpy.api.exceptions import APIError
+from motorpy.api.idempotency import derive_key, forget_key, idempotent_request
+from motorpy.util.concurrency import DEFAULT_CONCURRENCY, gather_limited
+
+
+PROVISION_STEPS = ("vehicle", "drv", "fleet_vehicle", "assignment")
+
+
+class Provision(NamedTuple):
+    "A vehicle to provision."
+    vehicle: models.Vehicle
+    driver_id: Optional[str] = None
+    # overrides the default DRV, where the driver is the owner and primary driver
+    drv: Optional[models.DriverVehicle] = None
+    fleet_id: Optional[str] = None
+    key: Optional[str] = None
+
+
+class ProvisionStatus(str, Enum):
+    provisioned = "provisioned"
+    # a step failed and the completed steps were not undone (rollback=False)
+    failed = "failed"
+    rolled_back = "rolled_back"
+    rollback_failed = "rollback_failed"
+
+
+class ProvisionResult(BaseModel):
+    "The result of one provisioning saga."
+    index: int = Field(
+        description="The position of the vehicle in the request."
+    )
+    key: Optional[str] = None
+    status: ProvisionStatus = ProvisionStatus.provisioned
+    vehicle: Any = Field(
+        default=None,
+        description="The created vehicle, it is deleted again if the saga was rolled back."
+    )
+    drv: Any = Field(
+        default=None,
+        description="The created driver vehicle (DRV)."
+    )
+    completed: List[str] = Field(
+        default_factory=list,
+        description="The steps that succeeded."
+    )
+    failed_step: Optional[str] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = Field(
+        default=None,
+        description="The API status code, for API errors."
+    )
+    rollback_errors: Dict[str, str] = Field(
+        default_factory=dict,
+        description="The errors of the compensations that failed, by step."
+    )
+
+
+class ProvisionSummary(BaseModel):
+    "The results of a provisioning job."
+    items: List[ProvisionResult] = Field(default_factory=list)
+    seconds: float = 0.0
+    rollback_seconds: float = Field(
+        default=0.0,
+        description="The time taken by the compensations."
+    )
+
+    @property
+    def provisioned(self) -> List[ProvisionResult]:
+        "The sagas that succeeded."
+        return [i for i in self.items if i.status == ProvisionStatus.provisioned]
+
+    @property
+    def failed(self) -> List[ProvisionResult]:
+        "The sagas that did not succeed."
+        return [i for i in self.items if i.status != ProvisionStatus.provisioned]
+
+    @property
+    def ok(self) -> bool:
+        "Whether every saga succeeded."
+        return not self.failed
+
+    def counts(self) -> Dict[str, int]:
+        """Count the sagas by status.
+
+        Returns:
+            Dict[str, int]: the number of sagas by status.
+        """
+        counts = {s.value: 0 for s in ProvisionStatus}
+        for item in self.items:
+            counts[item.status.value] += 1
+        return counts
+
+
+# step, undo call
+Compensation = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+def _step_key(key: Optional[str], step: str) -> Optional[str]:
+    return None if key is None else derive_key("provision", key, step)
+
+
+async def _undo(api: Any, endpoint: str, key: Optional[str]) -> None:
+    try:
+        await api.request("DELETE", endpoint)
+    except APIError as e:
+        # already gone
+        if e.status_code != 404:
+            raise
+    # a new run with the same key creates the record again
+    forget_key(api, key)
+
+
+async def _provision(api: Any,
+                     index: int,
+                     provision: Provision,
+                     send_webhook: bool) -> Tuple[ProvisionResult, List[Compensation]]:
+    "Run the steps of one saga, stopping at the first failure."
+    vehicle, driver_id, fleet_id = provision.vehicle, provision.driver_id, provision.fleet_id
+    result = ProvisionResult(index=index, key=provision.key)
+    compensations: List[Compensation] = []
+    step = "vehicle"
+    try:
+        if not driver_id and provision.drv:
+            raise ValueError("DRV cannot be supplied without a driver ID")
+        if not vehicle.vehicle_type or not vehicle.vehicle_type.id:
+            raise ValueError("Vehicle type ID is required")
+
+        key = _step_key(provision.key, step)
+        raw = await idempotent_request(api, "POST", "registered-vehicles", key=key, data={
+            **vehicle.dict(exclude_unset=True),
+            "vehicleId": vehicle.vehicle_type.id,
+        }, params={"webhook": "t" if send_webhook else "f"})
+        rv = result.vehicle = models.Vehicle(**raw, api=api).snapshot()
+        compensations.append((step, lambda key=key: _undo(api, f"registered-vehicles/{rv.id}", key)))
+        result.completed.append(step)
+
+        if driver_id:
+            step = "drv"
+            drv = provision.drv or models.DriverVehicle(
+                display_name=rv.get_display(),
+                is_owner=True,
+                is_primary_driver=True
+            )
+            key = _step_key(provision.key, step)
+            raw = await idempotent_request(api, "POST", f"drivers/{driver_id}/vehicles", key=key, data={
+                **drv.dict(by_alias=True, exclude_unset=True),
+                "registeredVehicleId": rv.id,
+            })
+            created = result.drv = models.DriverVehicle(**raw, api=api, driver_id=driver_id).snapshot()
+            compensations.append((step, lambda key=key: _undo(api, f"drivers/{driver_id}/vehicles/{created.id}", key)))
+            result.completed.append(step)
+
+        if fleet_id:
+            step = "fleet_vehicle"
+            key = _step_key(provision.key, step)
+            await idempotent_request(api, "POST", f"fleets/{fleet_id}/vehicles", key=key, data={
+                "isActive": True,
+                "isOpenToAll": True,
+                "registeredVehicleId": rv.id
+            })
+            compensations.append((step, lambda key=key: _undo(api, f"fleets/{fleet_id}/vehicles/{rv.id}", key)))
+            result.completed.append(step)
+
+            if driver_id:
+                step = "assignment"
+                key = _step_key(provision.key, step)
+                await idempotent_request(api, "POST", f"fleets/{fleet_id}/drivers/{driver_id}/vehicles", key=key, data={
+                    "expiresAt": None,
+                    "isActive": True,
+                    "registeredVehicleId": rv.id
+                })
+                compensations.append((step, lambda key=key: _undo(
+                    api, f"fleets/{fleet_id}/drivers/{driver_id}/vehicles/{rv.id}", key)))
+                result.completed.append(step)
+    except Exception as e:
+        result.status = ProvisionStatus.failed
+        result.failed_step = step
+        result.error = str(e) or e.__class__.__name__
+        result.status_code = e.status_code if isinstance(e, APIError) else None
+        return result, compensations
+    return result, []
+
+
+async def _compensate(sagas: List[Tuple[ProvisionResult, List[Compensation]]], concurrency: int) -> None:
+    "Undo the completed steps of failed sagas, one concurrent batch per step, latest step first."
+    for step in reversed(PROVISION_STEPS):
+        batch = [(result, call) for result, compensations in sagas for s, call in compensations if s == step]
+
+        async def run(result: ProvisionResult, call: Callable[[], Awaitable[Any]]) -> None:
+            try:
+                await call()
+            except Exception as e:
+                result.rollback_errors[step] = str(e) or e.__class__.__name__
+
+        await gather_limited((run(r, c) for r, c in batch), limit=concurrency)
+
+    for result, _ in sagas:
+        result.status = ProvisionStatus.rollback_failed if result.rollback_errors else ProvisionStatus.rolled_back
+
+
+async def provision_vehicles(api: Any,
+                             provisions: Iterable[Provision],
+                             concurrency: int = DEFAULT_CONCURRENCY,
+                             send_webhook: bool = True,
+                             rollback: bool = True) -> ProvisionSummary:
+    """Provision vehicles concurrently, each vehicle with its DRV and fleet assignment.
+
+    Args:
+        api (APIHandler): the API handler.
+        provisions (Iterable[Provision]): the vehicles to provision.
+        concurrency (int, optional): the maximum number of sagas (and compensations) at once. Defaults to 10.
+        send_webhook (bool, optional): whether to send a webhook for each vehicle. Defaults to True.
+        rollback (bool, optional): whether to undo the completed steps of failed sagas. Defaults to True.
+
+    Returns:
+        ProvisionSummary: the result of each saga, in the order of the provisions.
+    """
+    summary = ProvisionSummary()
+    started = time.perf_counter()
+    sagas = await gather_limited(
+        (_provision(api, n, p, send_webhook) for n, p in enumerate(provisions)),
+        limit=concurrency
+    )
+    summary.items = [result for result, _ in sagas]
+    summary.seconds = time.perf_counter() - started
+
+    failed = [(result, compensations) for result, compensations in sagas if result.status == ProvisionStatus.failed]
+    if rollback and failed:
+        rollback_started = time.perf_counter()
+        await _compensate(failed, concurrency)
+        summary.rollback_seconds = time.perf_counter() - rollback_started
+        summary.seconds += summary.rollback_seconds
+    return summary
@@ -0,0 +1,109 @@
+import asyncio
+
+from ...api.exceptions import APIError
+from ...base import Motor
+from ...models import DriverVehicle, Vehicle, VehicleType
+from ...tests.fakes import FakeAPI
+from ..provisioning import Provision, ProvisionStatus
+
+
+class RecordsAPI(FakeAPI):
+    "Stores the created records, the POSTs to the endpoints in `fail` are rejected."
+
+    def __init__(self, fail=(), fail_delete=()):
+        super().__init__(fail=fail, fail_status=400)
+        self.fail_delete = set(fail_delete)
+        self.records = {}
+        self.count = 0
+
+    def respond(self, call):
+        endpoint, data = call.endpoint, call.data
+        if call.method == "DELETE":
+            if endpoint in self.fail_delete:
+                raise APIError("API responded with 500", status_code=500)
+            if endpoint not in self.records:
+                raise APIError("API responded with 404", status_code=404)
+            del self.records[endpoint]
+            return None
+        self.count += 1
+        if endpoint == "registered-vehicles":
+            record_id = f"v-{self.count}"
+            self.records[f"registered-vehicles/{record_id}"] = data
+        elif endpoint.startswith("drivers/"):
+            record_id = f"drv-{self.count}"
+            self.records[f"{endpoint}/{record_id}"] = data
+        else:
+            record_id = data["registeredVehicleId"]
+            self.records[f"{endpoint}/{record_id}"] = data
+        return {**data, "id": record_id}
+
+
+def vehicle(plate):
+    return Vehicle(vehicle_type=VehicleType(id="vt-1"), reg_plate=plate)
+
+
+def provision(provisions, **kwargs):
+    motor = Motor("org", region="eu-1")
+    motor.api = RecordsAPI(**kwargs)
+    return asyncio.run(motor.provision_vehicles(provisions, concurrency=3)), motor.api
+
+
+class TestProvisioning:
+
+    def test_provision(self):
+        summary, api = provision([
+            Provision(vehicle("A"), driver_id="d-1", fleet_id="f-1"),
+            Provision(vehicle("B")),
+            Provision(vehicle("C"), driver_id="d-2", drv=DriverVehicle(display_name="Van", is_owner=False)),
+        ])
+        assert summary.ok
+        first, second, third = summary.items
+        assert first.completed == ["vehicle", "drv", "fleet_vehicle", "assignment"]
+        assert second.completed == ["vehicle"]
+        assert third.drv.driver_id == "d-2"
+        assert api.records[f"drivers/d-2/vehicles/{third.drv.id}"]["displayName"] == "Van"
+        assert f"fleets/f-1/drivers/d-1/vehicles/{first.vehicle.id}" in api.records
+        assert summary.counts()["provisioned"] == 3
+
+    def test_rollback(self):
+        summary, api = provision([
+            Provision(vehicle("A"), driver_id="d-1", fleet_id="f-1"),
+            Provision(vehicle("B"), driver_id="d-2", fleet_id="f-1"),
+            Provision(vehicle("C"), fleet_id="f-1"),
+            Provision(Vehicle(reg_plate="D")),
+        ], fail={"fleets/f-1/drivers/d-2/vehicles"})
+        ok, failed, also_ok, invalid = summary.items
+        assert ok.status == also_ok.status == ProvisionStatus.provisioned
+        assert failed.status == ProvisionStatus.rolled_back
+        assert (failed.failed_step, failed.status_code) == ("assignment", 400)
+        assert invalid.status == ProvisionStatus.rolled_back
+        assert (invalid.failed_step, invalid.error) == ("vehicle", "Vehicle type ID is required")
+        # only the records of the provisioned vehicles are left
+        assert not any(failed.vehicle.id in r for r in api.records)
+        assert len(api.records) == 6
+
+        # compensations run in batches by step, latest step first
+        deletes = [c.endpoint for c in api.calls if c.method == "DELETE"]
+        assert deletes == [
+            f"fleets/f-1/vehicles/{failed.vehicle.id}",
+            f"drivers/d-2/vehicles/{failed.drv.id}",
+            f"registered-vehicles/{failed.vehicle.id}",
+        ]
+
+    def test_rollback_errors(self):
+        summary, api = provision(
+            [Provision(vehicle("A"), driver_id="d-1", fleet_id="f-1")],
+            fail={"fleets/f-1/vehicles"},
+            fail_delete={"registered-vehicles/v-1"}
+        )
+        result = summary.items[0]
+        assert result.status == ProvisionStatus.rollback_failed
+        assert list(result.rollback_errors) == ["vehicle"]
+        assert "drivers/d-1/vehicles/drv-2" not in api.records
+
+    def test_without_rollback(self):
+        motor = Motor("org", region="eu-1")
+        motor.api = RecordsAPI(fail={"drivers/d-1/vehicles"})
+        summary = asyncio.run(motor.provision_vehicles([Provision(vehicle("A"), driver_id="d-1")], rollback=False))
+        assert summary.items[0].status == ProvisionStatus.failed
+        assert "registered-vehicles/v-1" in motor.api.records
@@ -42,6 +42,10 @@ setup(
     entry_points={
         "console_scripts": ["motorpy = motorpy.__main__:main"]
     },
-    extras_require={"test": read_requirements("requirements-test.txt")},
+    extras_require={
+        "test": read_requirements("requirements-test.txt"),
+        "columnar": ["pyarrow", "numpy"],
+        "msgpack": ["msgpack"],
+    },
     python_requires=">=3.7"
 )